@@ -0,0 +1,46 @@
+import random
+from enum import IntEnum
+
+
+class TurnPosition(IntEnum):
+    FIRST = 0,
+    SECOND = 1,
+    THIRD = 2
+
+    def next(self):
+        if self == TurnPosition.FIRST:
+            return TurnPosition.SECOND
+        if self == TurnPosition.SECOND:
+            return TurnPosition.THIRD
+        if self == TurnPosition.THIRD:
+            return TurnPosition.FIRST
+
+    def previous(self):
+        return self.next().next()
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return self.name + ' Player'
+
+class Player:
+    def __init__(self, name):
+        self.name = name
+
+    # returns None for pass, otherwise returns a SpecificMove
+    def make_move(self, game):
+        pass
+
+    def get_name(self):
+        return self.name
+
+
+class RandomPlayer(Player):
+    def make_move(self, game, debug=False):
+        legal_moves = game.get_legal_moves()
+        return random.choice(legal_moves)
+
+class NoBetPlayer(Player):
+    def make_move(self, game, debug=False):
+        return None
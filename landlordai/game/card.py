@@ -38,6 +38,9 @@ class Card(Enum):
     def get_shorthand(self):
         return self.shorthand
 
+    def get_index(self):
+        return self.card_index
+
     def next(self):
         return NEXT_MAP[self]
 
@@ -56,6 +59,10 @@ def string_to_card(str_to_card):
             return card
     raise ValueError
 
+# slot of each card in the 15-wide count vectors used by hands and features
+for _index, _card in enumerate(Card):
+    _card.card_index = _index
+
 NEXT_MAP = {
     Card.THREE: Card.FOUR,
     Card.FOUR: Card.FIVE,
@@ -1,18 +1,47 @@
 import random
-from collections import Counter
+
+import numpy as np
 
 from landlordai.game.card import Card
+from landlordai.game.hand import Hand, CARDS, SLOT_UNITS, NUM_CARD_TYPES
 from landlordai.game.move import SpecificMove, RankedMoveType, MoveType
 
+_ACE_INDEX = Card.ACE.card_index
+_LITTLE_JOKER_INDEX = Card.LITTLE_JOKER.card_index
+_BIG_JOKER_INDEX = Card.BIG_JOKER.card_index
+
+_TRIPLE_TYPES = [MoveType.TRIPLE, MoveType.TRIPLE_SINGLE_KICKER, MoveType.TRIPLE_PAIR_KICKER]
+_TRIPLE_KICKERS = dict((move_type, kicker_n) for kicker_n, move_type in enumerate(_TRIPLE_TYPES))
+_AIRPLANE_KICKERS = {MoveType.AIRPLANE_SINGLE_KICKER: 1, MoveType.AIRPLANE_PAIR_KICKER: 2}
+# chain move type -> (length, cards per rank)
+_CHAIN_SHAPES = dict((MoveType.get_straight_of_length(length, num_cards), (length, num_cards))
+                     for num_cards, min_length in [(1, 5), (2, 3), (3, 3)]
+                     for length in range(min_length, 13)
+                     if MoveType.get_straight_of_length(length, num_cards) is not None)
+
+# packed cards -> catalog move, filled in by the move catalog so generated moves are shared flyweights
+_interned_moves = {}
+
+
+def intern_moves(moves):
+    for move in moves:
+        _interned_moves[move.cards.get_packed()] = move
+
+
+def _make_move(move_type, rank_card, packed, size):
+    move = _interned_moves.get(packed)
+    if move is None:
+        move = SpecificMove(RankedMoveType(move_type, rank_card), Hand(packed, size))
+    return move
+
 
 class CardSet:
-    def __init__(self, cards: Counter):
-        self._cards = cards
+    def __init__(self, cards):
+        self._cards = Hand.coerce(cards)
+        self._counts = self._cards.counts()
 
-    def remove(self, cards: Counter):
-        copy_self = self._cards.copy()
-        copy_self.subtract(cards)
-        return CardSet(copy_self)
+    def remove(self, cards):
+        return CardSet(self._cards.remove(Hand.coerce(cards)))
 
     def get_all_moves(self):
         moves = []
@@ -25,71 +54,112 @@ class CardSet:
         moves.extend(self._get_special_moves())
         return moves
 
-    def _get_single_moves(self):
+    # yields only the moves that beat a play of ranked_move_type: the same type at a higher rank, then bombs
+    def get_moves_beating(self, ranked_move_type: RankedMoveType):
+        move_type = ranked_move_type.move_type
+        min_index = ranked_move_type.rank_card.card_index + 1
+        if move_type == MoveType.BOMB:
+            yield from self._get_quad_bombs(min_index)
+            if min_index <= _BIG_JOKER_INDEX:
+                yield from self._get_special_moves()
+            return
+
+        if move_type == MoveType.SINGLE:
+            yield from self._get_single_moves(min_index)
+        elif move_type == MoveType.PAIR:
+            yield from self._get_pair_moves(min_index)
+        elif move_type in _TRIPLE_KICKERS:
+            yield from self._get_triples(_TRIPLE_KICKERS[move_type], min_index)
+        elif move_type == MoveType.QUAD_SINGLE_KICKERS:
+            yield from self._get_quad_kicker_moves(min_index)
+        elif move_type in _CHAIN_SHAPES:
+            length, num_cards = _CHAIN_SHAPES[move_type]
+            yield from self._get_chains(length, num_cards, min_index)
+        elif move_type in _AIRPLANE_KICKERS:
+            yield from self._get_airplanes(_AIRPLANE_KICKERS[move_type], min_index)
+        yield from self._get_quad_bombs()
+        yield from self._get_special_moves()
+
+    def _get_single_moves(self, min_index=0):
         moves = []
-        for card in self._cards:
-            moves.append(SpecificMove(RankedMoveType(MoveType.SINGLE, card), Counter({card: 1})))
+        for i in range(min_index, NUM_CARD_TYPES):
+            if self._counts[i] >= 1:
+                moves.append(_make_move(MoveType.SINGLE, CARDS[i], SLOT_UNITS[i], 1))
         return moves
 
     def _get_cards_of_count(self, count):
-        cards = []
-        for card in self._cards:
-            if self._cards[card] >= count:
-                cards.append(card)
-        return cards
+        return [CARDS[i] for i, card_count in enumerate(self._counts) if card_count >= count]
 
-    def _get_pair_moves(self):
+    def _get_pair_moves(self, min_index=0):
         moves = []
-        for card in self._cards:
-            if self._cards[card] >= 2:
-                moves.append(SpecificMove(RankedMoveType(MoveType.PAIR, card), Counter({card: 2})))
+        for i in range(min_index, NUM_CARD_TYPES):
+            if self._counts[i] >= 2:
+                moves.append(_make_move(MoveType.PAIR, CARDS[i], SLOT_UNITS[i] * 2, 2))
         return moves
 
     def _get_triple_moves(self):
         moves = []
-        for core_card in self._cards:
-            if self._cards[core_card] >= 3:
-                hand_without_triple = self.remove(Counter({core_card: 3}))
-                # no kickers
-                moves.append(SpecificMove(RankedMoveType(MoveType.TRIPLE, core_card), Counter({core_card: 3})))
-                # look for single kickers
-                for move in hand_without_triple._get_single_moves():
-                    # kicker isn't the same as the core
-                    kicker = move.rank()
-                    if kicker != core_card:
-                        moves.append(SpecificMove(RankedMoveType(MoveType.TRIPLE_SINGLE_KICKER, core_card),
-                                                  Counter({core_card: 3, kicker: 1})))
-                for move in hand_without_triple._get_pair_moves():
-                    kicker = move.rank()
-                    if kicker != core_card:
-                        moves.append(SpecificMove(RankedMoveType(MoveType.TRIPLE_PAIR_KICKER, core_card),
-                                                  Counter({core_card: 3, kicker: 2})))
+        for kicker_n in range(3):
+            moves.extend(self._get_triples(kicker_n))
+        return moves
+
+    # kicker_n=0 for a bare triple, 1 for a single kicker, 2 for a pair kicker
+    def _get_triples(self, kicker_n, min_index=0):
+        moves = []
+        counts = self._counts
+        move_type = _TRIPLE_TYPES[kicker_n]
+        for i in range(min_index, NUM_CARD_TYPES):
+            if counts[i] >= 3:
+                core_card = CARDS[i]
+                core = SLOT_UNITS[i] * 3
+                if kicker_n == 0:
+                    moves.append(_make_move(move_type, core_card, core, 3))
+                    continue
+                # kicker isn't the same as the core
+                for j, kicker_count in enumerate(counts):
+                    if j != i and kicker_count >= kicker_n:
+                        moves.append(_make_move(move_type, core_card, core + SLOT_UNITS[j] * kicker_n, 3 + kicker_n))
         return moves
 
     # kicker_n=2 means pair kickers
     def _get_two_kickers(self, kicker_n=1):
+        return CardSet._two_kicker_slots(self._counts, kicker_n)
 
-        kickers = set()
-        for kicker_1 in self._get_cards_of_count(kicker_n):
-            use_a_kicker = self.remove(Counter({kicker_1: kicker_n}))
-            for kicker_2 in use_a_kicker._get_cards_of_count(kicker_n):
-                if kicker_1 != kicker_2 and sorted([kicker_1, kicker_2]) != [Card.LITTLE_JOKER, Card.BIG_JOKER]:
-                    kickers.add(tuple(sorted([kicker_1, kicker_2])))
+    # pairs of distinct card slots that each have kicker_n cards available, excluding the rocket
+    @classmethod
+    def _two_kicker_slots(cls, counts, kicker_n):
+        available = [i for i, count in enumerate(counts) if count >= kicker_n]
+        kickers = []
+        for a in range(len(available)):
+            for b in range(a + 1, len(available)):
+                if available[a] != _LITTLE_JOKER_INDEX or available[b] != _BIG_JOKER_INDEX:
+                    kickers.append((available[a], available[b]))
         return kickers
 
     def _get_quad_moves(self):
+        return self._get_quad_bombs() + self._get_quad_kicker_moves()
+
+    def _get_quad_bombs(self, min_index=0):
+        moves = []
+        for i in range(min_index, NUM_CARD_TYPES):
+            if self._counts[i] == 4:
+                moves.append(_make_move(MoveType.BOMB, CARDS[i], SLOT_UNITS[i] * 4, 4))
+        return moves
+
+    def _get_quad_kicker_moves(self, min_index=0):
         moves = []
-        for core_card in self._cards:
-            if self._cards[core_card] == 4:
-                hand_without_core = self.remove(Counter({core_card: 4}))
-                # just as bomb
-                moves.append(SpecificMove(RankedMoveType(MoveType.BOMB, core_card), Counter({core_card: 4})))
+        for i in range(min_index, NUM_CARD_TYPES):
+            if self._counts[i] == 4:
+                core_card = CARDS[i]
+                core = SLOT_UNITS[i] * 4
+                counts_without_core = self._counts[:i] + (0,) + self._counts[i + 1:]
                 # two single kickers
-                for kicker1, kicker2 in hand_without_core._get_two_kickers():
-                    moves.append(SpecificMove(RankedMoveType(MoveType.QUAD_SINGLE_KICKERS, core_card), Counter({core_card: 4, kicker1: 1, kicker2: 1})))
-                for kicker1, kicker2 in hand_without_core._get_two_kickers(kicker_n=2):
-                    moves.append(SpecificMove(RankedMoveType(MoveType.QUAD_SINGLE_KICKERS, core_card),
-                                              Counter({core_card: 4, kicker1: 2, kicker2: 2})))
+                for kicker1, kicker2 in CardSet._two_kicker_slots(counts_without_core, 1):
+                    moves.append(_make_move(MoveType.QUAD_SINGLE_KICKERS, core_card,
+                                            core + SLOT_UNITS[kicker1] + SLOT_UNITS[kicker2], 6))
+                for kicker1, kicker2 in CardSet._two_kicker_slots(counts_without_core, 2):
+                    moves.append(_make_move(MoveType.QUAD_SINGLE_KICKERS, core_card,
+                                            core + 2 * (SLOT_UNITS[kicker1] + SLOT_UNITS[kicker2]), 8))
         return moves
 
     # use num_cards=2 for pairs, num_cards=3 for triples, etc.
@@ -97,50 +167,70 @@ class CardSet:
         consecutives_required = 5 if num_cards == 1 else 3
         moves = []
         consecutive = 1
-        cards_included = Counter({card: num_cards})
+        cards_included = SLOT_UNITS[card.card_index] * num_cards
         while card.next() is not None:
-            if self._cards[card.next()] >= num_cards:
+            next_card = card.next()
+            if self._counts[next_card.card_index] >= num_cards:
                 consecutive += 1
-                cards_included[card.next()] = num_cards
-                card = card.next()
+                cards_included += SLOT_UNITS[next_card.card_index] * num_cards
+                card = next_card
             else:
                 break
             if consecutive >= consecutives_required:
-                assert(len(cards_included) == consecutive)
-                moves.append(SpecificMove(RankedMoveType(MoveType.get_straight_of_length(consecutive, num_cards), card), cards_included.copy()))
+                move_type = MoveType.get_straight_of_length(consecutive, num_cards)
+                # chains longer than any move type only happen with more cards than a hand can hold
+                if move_type is None:
+                    break
+                moves.append(_make_move(move_type, card, cards_included, consecutive * num_cards))
         return moves
 
     def _get_straights(self):
         moves = []
-        for i, card in enumerate(LandlordDeck.NORMAL_CARD_TYPES):
+        for card in LandlordDeck.NORMAL_CARD_TYPES:
             # search for chains up to triples
-            for j in range(min(self._cards[card], 3)):
+            for j in range(min(self._counts[card.card_index], 3)):
                 moves.extend(self._get_straights_from(card, j + 1))
         return moves
 
-    def _get_airplanes(self):
+    # chains of exactly the given length whose top card is at or above min_index
+    def _get_chains(self, length, num_cards, min_index=0):
+        moves = []
+        counts = self._counts
+        move_type = MoveType.get_straight_of_length(length, num_cards)
+        for top in range(max(min_index, length - 1), _ACE_INDEX + 1):
+            bottom = top - length + 1
+            if all(counts[i] >= num_cards for i in range(bottom, top + 1)):
+                cards_included = sum(SLOT_UNITS[bottom:top + 1]) * num_cards
+                moves.append(_make_move(move_type, CARDS[top], cards_included, length * num_cards))
+        return moves
+
+    # kicker_n=1 for single kickers, 2 for pair kickers; None for both
+    def _get_airplanes(self, kicker_n=None, min_index=0):
         # checking only 2-consecutive
         moves = []
-        for i, card in enumerate(LandlordDeck.NORMAL_CARD_TYPES):
-            if self._cards[card] >= 3 and card.next() is not None and self._cards[card.next()] >= 3:
-                airplane_cards = Counter({card: 3, card.next(): 3})
-                hand_without_core = self.remove(airplane_cards)
-                for kicker1, kicker2 in hand_without_core._get_two_kickers():
-                    specific_cards = airplane_cards + Counter({kicker1: 1, kicker2: 1})
-                    moves.append(
-                        SpecificMove(RankedMoveType(MoveType.AIRPLANE_SINGLE_KICKER, card.next()), specific_cards))
-
-                for kicker1, kicker2 in hand_without_core._get_two_kickers(kicker_n=2):
-                    specific_cards = airplane_cards + Counter({kicker1: 2, kicker2: 2})
-                    moves.append(
-                        SpecificMove(RankedMoveType(MoveType.AIRPLANE_PAIR_KICKER, card.next()), specific_cards))
+        counts = self._counts
+        for i in range(max(min_index - 1, 0), _ACE_INDEX):
+            if counts[i] >= 3 and counts[i + 1] >= 3:
+                top_card = CARDS[i + 1]
+                airplane_cards = SLOT_UNITS[i] * 3 + SLOT_UNITS[i + 1] * 3
+                counts_without_core = counts[:i] + (counts[i] - 3, counts[i + 1] - 3) + counts[i + 2:]
+                if kicker_n is None or kicker_n == 1:
+                    for kicker1, kicker2 in CardSet._two_kicker_slots(counts_without_core, 1):
+                        moves.append(_make_move(MoveType.AIRPLANE_SINGLE_KICKER, top_card,
+                                                airplane_cards + SLOT_UNITS[kicker1] + SLOT_UNITS[kicker2], 8))
+
+                if kicker_n is None or kicker_n == 2:
+                    for kicker1, kicker2 in CardSet._two_kicker_slots(counts_without_core, 2):
+                        moves.append(_make_move(MoveType.AIRPLANE_PAIR_KICKER, top_card,
+                                                airplane_cards + 2 * (SLOT_UNITS[kicker1] + SLOT_UNITS[kicker2]), 10))
         return moves
 
     def _get_special_moves(self):
         # rocket
         moves = []
-        if self._cards[Card.LITTLE_JOKER] == 1 and self._cards[Card.BIG_JOKER] == 1:
-            moves.append(SpecificMove(RankedMoveType(MoveType.BOMB, Card.BIG_JOKER), Counter({Card.LITTLE_JOKER: 1, Card.BIG_JOKER: 1})))
+        if self._counts[_LITTLE_JOKER_INDEX] == 1 and self._counts[_BIG_JOKER_INDEX] == 1:
+            moves.append(_make_move(MoveType.BOMB, Card.BIG_JOKER,
+                                    SLOT_UNITS[_LITTLE_JOKER_INDEX] + SLOT_UNITS[_BIG_JOKER_INDEX], 2))
         return moves
 
 
@@ -169,3 +259,41 @@ class LandlordDeck:
         self.cards = self.cards[num_cards:]
         return sorted(drawn)
 
+
+
+class BulkDealer:
+    # deals many shuffled decks at once with numpy; the same seed always reproduces the same sequence of deals
+    def __init__(self, seed=None, batch_size=1024, num_players=3, kitty_size=3, deal_size=17):
+        assert kitty_size + num_players * deal_size == LandlordDeck.NUM_CARDS
+        self._rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.num_players = num_players
+        # slot of each card in a full deck, and which pile (kitty, then each player) each dealt position goes to
+        self._deck_slots = np.array([card.card_index for card in LandlordDeck.NORMAL_CARD_TYPES for _ in range(4)] +
+                                    [card.card_index for card in LandlordDeck.EXTRA_CARD_TYPES], dtype=np.int64)
+        self._piles = np.array([0] * kitty_size + [pile for pile in range(1, num_players + 1) for _ in range(deal_size)])
+        self._kitty_counts = None
+        self._hand_counts = None
+        self._first_positions = None
+        self._next = 0
+
+    # returns (kitty counts (n, 15), hand counts (n, num_players, 15), first position (n,))
+    def deal_counts(self, n):
+        shuffled = self._rng.permuted(np.tile(self._deck_slots, (n, 1)), axis=1)
+        num_piles = self.num_players + 1
+        flat_index = (np.arange(n)[:, None] * num_piles + self._piles[None, :]) * NUM_CARD_TYPES + shuffled
+        counts = np.bincount(flat_index.ravel(), minlength=n * num_piles * NUM_CARD_TYPES)
+        counts = counts.reshape(n, num_piles, NUM_CARD_TYPES).astype(np.uint8)
+        first_positions = self._rng.integers(0, self.num_players, n)
+        return counts[:, 0], counts[:, 1:], first_positions
+
+    # returns (kitty as a list of cards, list of Hands in seat order, index of the seat that bets first)
+    def next_deal(self):
+        if self._hand_counts is None or self._next >= len(self._hand_counts):
+            self._kitty_counts, self._hand_counts, self._first_positions = self.deal_counts(self.batch_size)
+            self._next = 0
+        i = self._next
+        self._next += 1
+        kitty = Hand.from_counts(self._kitty_counts[i]).to_list()
+        hands = [Hand.from_counts(counts) for counts in self._hand_counts[i]]
+        return kitty, hands, int(self._first_positions[i])
@@ -0,0 +1,229 @@
+import numpy as np
+
+from landlordai.game.base_player import TurnPosition
+from landlordai.game.card import Card
+from landlordai.game.deck import CardSet
+from landlordai.game.hand import NUM_CARD_TYPES
+from landlordai.game.hand_sampler import HandSampler
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.move_cache import MoveCache
+from landlordai.game.move_catalog import get_move_catalog
+
+
+# random keys for Zobrist hashing, fixed so that hashes are the same in every process
+_key_rng = np.random.default_rng(20200413)
+
+
+def _keys(*shape):
+    return _key_rng.integers(0, 2 ** 63, size=shape, dtype=np.int64).tolist()
+
+
+# (seat, card type, count held)
+HAND_KEYS = _keys(len(TurnPosition), NUM_CARD_TYPES, 5)
+MOVER_KEYS = _keys(len(TurnPosition))
+LANDLORD_KEYS = _keys(len(TurnPosition))
+CONTROL_KEYS = _keys(len(TurnPosition))
+# the move to beat, by catalog id
+LAST_MOVE_KEYS = _keys(len(get_move_catalog()))
+# a deck holds 13 quads and the rocket
+MAX_BOMBS = 14
+# a bet amount is the bet made, doubled once per bomb; keyed by its odd part and how many times that was doubled,
+# which a bet of 2 can be once more than there are bombs
+BET_KEYS = _keys(LandlordGame.MAX_BET + 1, MAX_BOMBS + 2)
+_NEXT = [position.next() for position in TurnPosition]
+
+
+def bet_key(bet_amount):
+    if bet_amount == 0:
+        return BET_KEYS[0][0]
+    doublings = (bet_amount & -bet_amount).bit_length() - 1
+    return BET_KEYS[bet_amount >> doublings][doublings]
+
+
+def hand_key(position: TurnPosition, hand):
+    key = 0
+    for i, count in enumerate(hand.to_bytes()):
+        key ^= HAND_KEYS[position][i][count]
+    return key
+
+
+# whether a round ending now would sweep the peasants, as LandlordGame scores it: neither has played a card
+def _peasants_swept(hands, landlord):
+    return all([len(hands[position]) == LandlordGame.DEAL_SIZE for position in TurnPosition
+                if position != landlord])
+
+
+class EndgameOutOfNodes(Exception):
+    pass
+
+
+class EndgameSolver:
+    # exact alpha-beta over the card play once the hands are known, with a Zobrist keyed transposition table
+    # values are from the landlord's side, given by value(landlord_won, bet_amount) at the end of the round
+    PERFECT_INFORMATION = 'perfect_information'
+    DETERMINIZED = 'determinized'
+
+    # bounds on an entry's value
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, value, max_nodes=200000, max_table_size=1000000):
+        self.value = value
+        # a solve visiting more positions than this gives up
+        self.max_nodes = max_nodes
+        self.max_table_size = max_table_size
+        self.move_cache = MoveCache()
+        self.catalog = get_move_catalog()
+        # zobrist key -> (flag, value)
+        self.table = {}
+        # (packed hand, catalog id of the move to beat or -1 in control) -> ordered legal moves
+        self._moves = {}
+        # (position, packed hand) -> zobrist key of the hand
+        self._hand_keys = {}
+        self.nodes = 0
+        self.table_hits = 0
+
+    def _legal_moves(self, hand, in_control, last_move):
+        key = (hand.get_packed(), -1 if in_control else self.catalog.get_id(last_move))
+        moves = self._moves.get(key)
+        if moves is not None:
+            return moves
+        if in_control:
+            moves = list(self.move_cache.get_all_moves(hand))
+        else:
+            moves = list(CardSet(hand).get_moves_beating(last_move.ranked_move_type))
+        # moves that empty the hand first, then the ones shedding the most cards
+        moves.sort(key=lambda move: -len(move.cards))
+        if not in_control:
+            moves.append(None)
+        if len(self._moves) >= self.max_table_size:
+            self._moves.clear()
+        self._moves[key] = moves
+        return moves
+
+    def _hand_key(self, position, hand):
+        key = self._hand_keys.get((position, hand.get_packed()))
+        if key is None:
+            if len(self._hand_keys) >= self.max_table_size:
+                self._hand_keys.clear()
+            key = hand_key(position, hand)
+            self._hand_keys[(position, hand.get_packed())] = key
+        return key
+
+    # the position after a move, as (hands, mover, control, last move, bet, hand keys)
+    def _play(self, state, move):
+        hands, mover, control, last_move, bet_amount, keys = state
+        if move is None:
+            return hands, _NEXT[mover], control, last_move, bet_amount, keys
+        hands = list(hands)
+        keys = list(keys)
+        hands[mover] = hands[mover].remove(move.cards)
+        keys[mover] = self._hand_key(mover, hands[mover])
+        if move.is_bomb():
+            bet_amount *= 2
+        return hands, _NEXT[mover], mover, move, bet_amount, keys
+
+    def _key(self, state, landlord):
+        hands, mover, control, last_move, bet_amount, keys = state
+        key = keys[0] ^ keys[1] ^ keys[2] ^ MOVER_KEYS[mover] ^ LANDLORD_KEYS[landlord] ^ bet_key(bet_amount)
+        if mover != control:
+            key ^= CONTROL_KEYS[control] ^ LAST_MOVE_KEYS[self.catalog.get_id(last_move)]
+        return key
+
+    def _move_value(self, state, landlord, move, alpha, beta):
+        hands, mover, _, _, bet_amount, _ = state
+        if move is not None and len(move.cards) == len(hands[mover]):
+            if move.is_bomb():
+                bet_amount *= 2
+            # a peasant going out has played, so only the landlord can sweep
+            if mover == landlord and _peasants_swept(hands, landlord):
+                bet_amount *= LandlordGame.SWEEP_MULTIPLIER
+            return self.value(mover == landlord, bet_amount)
+        return self._search(self._play(state, move), landlord, alpha, beta)
+
+    def _search(self, state, landlord, alpha, beta):
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise EndgameOutOfNodes()
+        hands, mover, control, last_move, _, _ = state
+        key = self._key(state, landlord)
+        entry = self.table.get(key)
+        if entry is not None:
+            self.table_hits += 1
+            flag, value = entry
+            if flag == EndgameSolver.EXACT:
+                return value
+            if flag == EndgameSolver.LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        original_alpha, original_beta = alpha, beta
+        maximizing = mover == landlord
+        best = None
+        for move in self._legal_moves(hands[mover], mover == control, last_move):
+            value = self._move_value(state, landlord, move, alpha, beta)
+            if maximizing:
+                best = value if best is None else max(best, value)
+                alpha = max(alpha, value)
+            else:
+                best = value if best is None else min(best, value)
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if len(self.table) >= self.max_table_size:
+            self.table.clear()
+        if best <= original_alpha:
+            self.table[key] = (EndgameSolver.UPPER, best)
+        elif best >= original_beta:
+            self.table[key] = (EndgameSolver.LOWER, best)
+        else:
+            self.table[key] = (EndgameSolver.EXACT, best)
+        return best
+
+    # the lowest and highest value the round can end with, if every bomb left in the hands goes off
+    # and, while it still can happen, the peasants are swept
+    def _value_bounds(self, hands, bet_amount, landlord):
+        num_bombs = 0
+        for hand in hands:
+            counts = hand.counts()
+            num_bombs += sum([1 for count in counts if count == 4])
+            if counts[Card.LITTLE_JOKER.card_index] > 0 and counts[Card.BIG_JOKER.card_index] > 0:
+                num_bombs += 1
+        highest_bet = bet_amount * 2 ** num_bombs
+        if _peasants_swept(hands, landlord):
+            highest_bet *= LandlordGame.SWEEP_MULTIPLIER
+        values = [self.value(landlord_won, bet) for landlord_won in (True, False)
+                  for bet in (bet_amount, highest_bet)]
+        return min(values), max(values)
+
+    # exact value of each legal move of the game's mover, with hands ({position: Hand}) in place of the game's;
+    # None if the solve needed more than max_nodes positions
+    def solve(self, game, legal_moves, hands=None):
+        if hands is None:
+            hands = dict((position, game.get_hand(position)) for position in TurnPosition)
+        hands = [hands[position] for position in TurnPosition]
+        state = (hands, game.get_current_position(), game.get_control_position(), game.get_last_played(),
+                 game.get_bet_amount(), [hand_key(position, hands[position]) for position in TurnPosition])
+        landlord = game.get_landlord_position()
+        # values can't leave these bounds, so a search over exactly this window is still exact
+        lowest, highest = self._value_bounds(hands, game.get_bet_amount(), landlord)
+        self.nodes = 0
+        try:
+            return np.array([self._move_value(state, landlord, move, lowest, highest) for move in legal_moves])
+        except EndgameOutOfNodes:
+            return None
+
+    # mean exact value of each legal move over num_samples deals of the cards the mover hasn't seen
+    def solve_determinized(self, game, legal_moves, num_samples=20, sampler=None):
+        if sampler is None:
+            sampler = HandSampler()
+        totals = np.zeros(len(legal_moves))
+        for deal in sampler.sample_counts(game, game.get_current_position(), num_samples):
+            values = self.solve(game, legal_moves, HandSampler.to_hands(deal))
+            if values is None:
+                return None
+            totals += values
+        return totals / num_samples
@@ -0,0 +1,95 @@
+import numpy as np
+
+from landlordai.game.base_player import TurnPosition
+from landlordai.game.move import BetMove
+from landlordai.game.move_catalog import get_move_catalog
+
+
+class EventLog:
+    # verbosity levels
+    OFF = 0
+    EVENTS = 1
+
+    # event kinds
+    BET = 0
+    BET_PASS = 1
+    PLAY = 2
+    PASS = 3
+    LANDLORD_WIN = 4
+    PEASANT_WIN = 5
+    SCORES = 6
+
+    # kind, position, then up to three values
+    EVENT_WIDTH = 5
+    INITIAL_CAPACITY = 128
+
+    # integer event records in a preallocated buffer; text is only built by render
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._events = np.zeros((capacity, EventLog.EVENT_WIDTH), dtype=np.int32)
+        self._size = 0
+        # moves missing from the catalog are referenced by negative ids into this list
+        self._extra_moves = []
+
+    def __len__(self):
+        return self._size
+
+    def __copy__(self):
+        result = EventLog(max(self._size, EventLog.INITIAL_CAPACITY))
+        result._events[:self._size] = self._events[:self._size]
+        result._size = self._size
+        result._extra_moves = list(self._extra_moves)
+        return result
+
+    def record(self, kind, position=0, value0=0, value1=0, value2=0):
+        if self._size == len(self._events):
+            self._events = np.concatenate([self._events, np.zeros_like(self._events)])
+        self._events[self._size] = (kind, position, value0, value1, value2)
+        self._size += 1
+
+    def record_bet(self, position, bet):
+        self.record(EventLog.BET, position, bet.get_amount())
+
+    def record_play(self, position, move):
+        try:
+            move_id = get_move_catalog().get_id(move)
+        except KeyError:
+            self._extra_moves.append(move)
+            move_id = -len(self._extra_moves)
+        self.record(EventLog.PLAY, position, move_id)
+
+    def record_scores(self, scores):
+        self.record(EventLog.SCORES, 0, *scores)
+
+    # drops every event after the first size, used to take moves back
+    def truncate(self, size):
+        self._size = min(size, self._size)
+
+    def get_events(self):
+        return self._events[:self._size]
+
+    def _get_move(self, move_id):
+        if move_id < 0:
+            return self._extra_moves[-move_id - 1]
+        return get_move_catalog().get_move(move_id)
+
+    def render_event(self, event):
+        kind, position, value0, value1, value2 = [int(x) for x in event]
+        if kind == EventLog.BET:
+            return str(TurnPosition(position)) + " bet " + str(BetMove(value0))
+        if kind == EventLog.BET_PASS:
+            return str(TurnPosition(position)) + " passed"
+        if kind == EventLog.PLAY:
+            return str(TurnPosition(position)) + " played " + str(self._get_move(value0))
+        if kind == EventLog.PASS:
+            return str(TurnPosition(position)) + " passed."
+        if kind == EventLog.LANDLORD_WIN:
+            return str(TurnPosition(position)) + " wins as Landlord!"
+        if kind == EventLog.PEASANT_WIN:
+            # position is the landlord's
+            return str([pos for pos in TurnPosition if pos != position]) + " win as Peasants!"
+        if kind == EventLog.SCORES:
+            return str([value0, value1, value2])
+        raise ValueError('Unknown event kind ' + str(kind))
+
+    def render(self):
+        return [self.render_event(event) for event in self.get_events()]
@@ -0,0 +1,126 @@
+from landlordai.game.card import Card
+
+NUM_CARD_TYPES = len(Card)
+CARDS = list(Card)
+
+# one byte per card type, in Card order; the packed integer is the little-endian reading of the count bytes
+SLOT_BITS = 8
+SLOT_UNITS = [1 << (SLOT_BITS * i) for i in range(NUM_CARD_TYPES)]
+# top bit of every slot, used to compare all slots at once
+_GUARD = int.from_bytes(bytes([0x80] * NUM_CARD_TYPES), 'little')
+
+
+class Hand:
+    # immutable multiset of cards stored as a 15 slot count array packed into a single int
+    __slots__ = ('_packed', '_size')
+
+    def __init__(self, packed=0, size=None):
+        self._packed = packed
+        if size is None:
+            size = sum(packed.to_bytes(NUM_CARD_TYPES, 'little'))
+        self._size = size
+
+    @classmethod
+    def from_cards(cls, cards):
+        packed = 0
+        for card in cards:
+            packed += SLOT_UNITS[card.card_index]
+        return cls(packed, len(cards))
+
+    @classmethod
+    def from_counts(cls, counts):
+        counts = bytes(counts)
+        assert len(counts) == NUM_CARD_TYPES
+        return cls(int.from_bytes(counts, 'little'), sum(counts))
+
+    @classmethod
+    def from_counter(cls, counter):
+        packed = 0
+        size = 0
+        for card, count in counter.items():
+            if count > 0:
+                packed += SLOT_UNITS[card.card_index] * count
+                size += count
+        return cls(packed, size)
+
+    @classmethod
+    def of(cls, card: Card, count=1):
+        return cls(SLOT_UNITS[card.card_index] * count, count)
+
+    @classmethod
+    def coerce(cls, cards):
+        # accepts a Hand, a list of cards or a Counter of cards
+        if isinstance(cards, Hand):
+            return cards
+        if isinstance(cards, dict):
+            return cls.from_counter(cards)
+        return cls.from_cards(cards)
+
+    def get_packed(self):
+        return self._packed
+
+    def to_bytes(self):
+        return self._packed.to_bytes(NUM_CARD_TYPES, 'little')
+
+    def counts(self):
+        return tuple(self.to_bytes())
+
+    def count(self, card: Card):
+        return (self._packed >> (SLOT_BITS * card.card_index)) & 0xFF
+
+    def __getitem__(self, card: Card):
+        return self.count(card)
+
+    def __contains__(self, card: Card):
+        return self.count(card) > 0
+
+    def __len__(self):
+        return self._size
+
+    def keys(self):
+        return [CARDS[i] for i, count in enumerate(self.to_bytes()) if count > 0]
+
+    def items(self):
+        return [(CARDS[i], count) for i, count in enumerate(self.to_bytes()) if count > 0]
+
+    def to_list(self):
+        cards = []
+        for i, count in enumerate(self.to_bytes()):
+            if count > 0:
+                cards.extend([CARDS[i]] * count)
+        return cards
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def contains(self, other):
+        # true if every slot of self is at least the matching slot of other
+        return ((self._packed | _GUARD) - other._packed) & _GUARD == _GUARD
+
+    def add(self, other):
+        return Hand(self._packed + other._packed, self._size + other._size)
+
+    def remove(self, other):
+        assert self.contains(other)
+        return Hand(self._packed - other._packed, self._size - other._size)
+
+    # drops the n lowest cards, used when the actual cards in a hand are unknown
+    def drop_lowest(self, n):
+        return Hand.from_cards(self.to_list()[n:])
+
+    def __eq__(self, other):
+        if type(other) != Hand:
+            return False
+        return self._packed == other._packed
+
+    def __hash__(self):
+        return hash(self._packed)
+
+    def __copy__(self):
+        return self
+
+    def __str__(self):
+        return str(self.to_list())
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,84 @@
+import numpy as np
+
+from landlordai.game.base_player import TurnPosition
+from landlordai.game.hand import Hand, NUM_CARD_TYPES
+from landlordai.game.move import SpecificMove
+
+
+# the cards the landlord must still hold: the revealed kitty minus what the landlord has played since
+def kitty_remainder(game):
+    if not game.is_betting_complete():
+        return Hand()
+    landlord = game.get_landlord_position()
+    played = np.zeros(NUM_CARD_TYPES, dtype=np.int32)
+    for position, move in game.get_move_logs():
+        if position == landlord and type(move) == SpecificMove:
+            played += move.cards.counts()
+    remainder = np.maximum(np.array(Hand.coerce(game.kitty).counts()) - played, 0)
+    return Hand.from_counts(remainder.tolist())
+
+
+class HandSampler:
+    # deals the cards a seat hasn't seen to the other two seats, many deals per call
+    # a deal is a (3, 15) array of card counts in seat order, with the observing seat's own hand in its row;
+    # every deal keeps each opponent's hand size and leaves the unplayed kitty cards with the landlord;
+    # while betting the kitty is still face down, so the unseen cards left over after dealing the hands are its
+    def __init__(self, seed=None):
+        self._rng = np.random.default_rng(seed)
+
+    # (card counts every deal starts from, the free card slots, how many of them go to the next seat and how many
+    # to the previous one)
+    def _constraints(self, game, position: TurnPosition):
+        fixed = np.zeros((len(TurnPosition), NUM_CARD_TYPES), dtype=np.int32)
+        fixed[position] = game.get_hand(position).counts()
+        unseen = game.get_unseen_cards(position)
+        landlord = game.get_landlord_position()
+        if game.is_betting_complete() and landlord != position:
+            remainder = kitty_remainder(game)
+            fixed[landlord] = remainder.counts()
+            unseen = unseen.remove(remainder)
+
+        slots = np.repeat(np.arange(NUM_CARD_TYPES), unseen.counts())
+        num_next = game.get_hand_size(position.next()) - int(fixed[position.next()].sum())
+        num_previous = game.get_hand_size(position.previous()) - int(fixed[position.previous()].sum())
+        assert 0 <= num_next and 0 <= num_previous and num_next + num_previous <= len(slots)
+        return fixed, slots, num_next, num_previous
+
+    # n deals as card counts shaped (n, 3, 15)
+    def sample_counts(self, game, position: TurnPosition, n):
+        fixed, slots, num_next, num_previous = self._constraints(game, position)
+        deals = np.tile(fixed, (n, 1, 1))
+        if len(slots) == 0:
+            return deals
+        # the first num_next shuffled cards go to the next seat, the next num_previous to the previous one,
+        # and any left over to the kitty
+        shuffled = self._rng.permuted(np.tile(slots, (n, 1)), axis=1)[:, :num_next + num_previous]
+        seats = np.where(np.arange(num_next + num_previous) < num_next, position.next(), position.previous())
+        flat_index = (np.arange(n)[:, None] * len(TurnPosition) + seats[None, :]) * NUM_CARD_TYPES + shuffled
+        counts = np.bincount(flat_index.ravel(), minlength=n * len(TurnPosition) * NUM_CARD_TYPES)
+        return deals + counts.reshape(n, len(TurnPosition), NUM_CARD_TYPES)
+
+    # n deals and their normalized weights; likelihood maps a (n, 3, 15) batch of deals to n non-negative weights,
+    # e.g. how likely the opponents were to make their logged moves holding those hands
+    def sample_weighted(self, game, position: TurnPosition, n, likelihood=None):
+        deals = self.sample_counts(game, position, n)
+        if likelihood is None:
+            return deals, np.full(n, 1. / n)
+        weights = np.asarray(likelihood(deals), dtype=np.float64)
+        assert weights.shape == (n,) and np.all(weights >= 0)
+        total = np.sum(weights)
+        if total == 0:
+            return deals, np.full(n, 1. / n)
+        return deals, weights / total
+
+    # n deals drawn from a weighted sample of num_candidates, so they can be treated as equally likely
+    def sample_resampled(self, game, position: TurnPosition, n, likelihood, num_candidates=None):
+        if num_candidates is None:
+            num_candidates = 4 * n
+        deals, weights = self.sample_weighted(game, position, num_candidates, likelihood)
+        return deals[self._rng.choice(num_candidates, size=n, p=weights)]
+
+    # {position: Hand} of one deal, as force_setup and force_hand take them
+    @staticmethod
+    def to_hands(deal):
+        return dict((position, Hand.from_counts(deal[position].tolist())) for position in TurnPosition)
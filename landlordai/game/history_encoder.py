@@ -0,0 +1,182 @@
+import weakref
+
+import numpy as np
+
+from landlordai.game.numpy_model import GRUWeights, make_gru, read_keras_h5, FLOAT32
+
+
+class _GameHistory:
+    # what has been encoded of one game: the log chain links seen, the forward state after each of them,
+    # and the moves projected for the backward direction
+    def __init__(self, landlord_position, initial_state):
+        self.landlord_position = landlord_position
+        self.links = []
+        self.forward_states = [initial_state]
+        self.backward_rows = []
+        # encoded vector for the current links
+        self.output = None
+
+    def truncate(self, num_logs):
+        if num_logs < len(self.links):
+            self.output = None
+        del self.links[num_logs:]
+        del self.forward_states[num_logs + 1:]
+        del self.backward_rows[num_logs:]
+
+
+class HistoryEncoder:
+    # the history_net GRU evaluated in numpy; for each game it keeps the forward state over the logged moves
+    # and only advances it over moves logged since the last call, matching a full pass over the padded history
+    def __init__(self, forward: GRUWeights, backward: GRUWeights = None, timesteps=100):
+        self.forward = forward
+        self.backward = backward
+        self.timesteps = timesteps
+        # the backward direction reads the padding first, so its state after k padding rows is fixed
+        self._backward_padding_states = None
+        if backward is not None:
+            state = backward.initial_state()
+            self._backward_padding_states = [state]
+            for _ in range(timesteps):
+                state = backward.step(backward.input_bias, state)
+                self._backward_padding_states.append(state)
+        self._games = weakref.WeakKeyDictionary()
+
+    def get_weights(self):
+        if self.backward is None:
+            return self.forward.get_weights()
+        return self.forward.get_weights() + self.backward.get_weights()
+
+    # the weights plus the precomputed backward padding states
+    @property
+    def nbytes(self):
+        num_bytes = self.forward.nbytes
+        if self.backward is not None:
+            num_bytes += self.backward.nbytes + sum([state.nbytes for state in self._backward_padding_states])
+        return num_bytes
+
+    def get_output_size(self):
+        if self.backward is None:
+            return self.forward.units
+        return self.forward.units + self.backward.units
+
+    # returns None unless the file is a keras h5 model whose only layer is a GRU or a bidirectional GRU
+    # with activations numpy_model implements
+    @classmethod
+    def from_h5(cls, path, timesteps=100, precision=FLOAT32):
+        model = read_keras_h5(path)
+        if model is None:
+            return None
+        model_config, layer_weights = model
+        layers = [layer for layer in model_config['config']['layers'] if layer['class_name'] != 'InputLayer']
+        if len(layers) != 1:
+            return None
+        layer = layers[0]
+        weights = layer_weights[layer['config']['name']]
+
+        try:
+            if layer['class_name'] == 'GRU':
+                return cls(make_gru(weights, layer['config'], precision=precision), timesteps=timesteps)
+            if layer['class_name'] == 'Bidirectional' and layer['config']['layer']['class_name'] == 'GRU' \
+                    and layer['config'].get('merge_mode', 'concat') == 'concat':
+                gru_config = layer['config']['layer']['config']
+                return cls(make_gru(weights, gru_config, 'forward_', precision),
+                           make_gru(weights, gru_config, 'backward_', precision), timesteps=timesteps)
+        except ValueError:
+            # an activation numpy_model doesn't implement
+            return None
+        return None
+
+    def _finish(self, forward_state, backward_rows):
+        num_logs = len(backward_rows)
+        assert num_logs <= self.timesteps
+        forward_state = self.forward.run_padding(forward_state, self.timesteps - num_logs)
+        if self.backward is None:
+            return forward_state
+        backward_state = self.backward.run(reversed(backward_rows),
+                                           self._backward_padding_states[self.timesteps - num_logs])
+        return np.concatenate([forward_state, backward_state])
+
+    # a full pass over a stack of move vectors, the same as history_net on the padded stack
+    def encode_moves(self, move_stack):
+        if len(move_stack) == 0:
+            return self._finish(self.forward.initial_state(), [])
+        forward_state = self.forward.run(self.forward.project(move_stack), self.forward.initial_state())
+        backward_rows = [None] * len(move_stack)
+        if self.backward is not None:
+            backward_rows = list(self.backward.project(move_stack))
+        return self._finish(forward_state, backward_rows)
+
+    # the padding and backward steps of several histories run together, one row per history;
+    # rows that have finished their steps are held where they are
+    def _finish_batch(self, histories):
+        num_logs = np.array([len(history.backward_rows) for history in histories])
+        assert np.all(num_logs <= self.timesteps)
+        num_padding = self.timesteps - num_logs
+        forward_states = np.array([history.forward_states[-1] for history in histories])
+        for t in range(np.max(num_padding)):
+            stepped = self.forward.step(self.forward.input_bias, forward_states)
+            forward_states = np.where((t < num_padding)[:, None], stepped, forward_states)
+        if self.backward is None:
+            return list(forward_states)
+
+        backward_states = np.array([self._backward_padding_states[n] for n in num_padding])
+        for t in range(np.max(num_logs)):
+            rows = np.array([history.backward_rows[n - 1 - t] if t < n else self.backward.input_bias
+                             for history, n in zip(histories, num_logs)])
+            stepped = self.backward.step(rows, backward_states)
+            backward_states = np.where((t < num_logs)[:, None], stepped, backward_states)
+        return list(np.concatenate([forward_states, backward_states], axis=1))
+
+    # compute_move_vector(position, landlord_position, move) gives the features of one log entry
+    def encode(self, game, compute_move_vector):
+        history = self._advance(game, compute_move_vector)
+        if history.output is None:
+            history.output = self._finish(history.forward_states[-1], history.backward_rows)
+        return history.output
+
+    # encode for several games, finishing the ones that changed as one batch
+    def encode_batch(self, games, compute_move_vector):
+        histories = [self._advance(game, compute_move_vector) for game in games]
+        unfinished = [history for history in histories if history.output is None]
+        if len(unfinished) > 0:
+            for history, output in zip(unfinished, self._finish_batch(unfinished)):
+                history.output = output
+        return [history.output for history in histories]
+
+    # brings the game's forward state up to its logged moves; output is None if they changed since the last call
+    def _advance(self, game, compute_move_vector):
+        history = self._games.get(game)
+        landlord_position = game.get_landlord_position()
+        # history features depend on who the landlord is, so start over once it's decided
+        if history is None or history.landlord_position != landlord_position:
+            history = _GameHistory(landlord_position, self.forward.initial_state())
+            self._games[game] = history
+
+        # walk back along the log chain until reaching a link that was already encoded
+        link = game.get_log_chain()
+        num_logs = game.get_num_moves()
+        new_links = []
+        while num_logs > 0 and not (num_logs <= len(history.links) and history.links[num_logs - 1] is link):
+            new_links.append(link)
+            link = link[0]
+            num_logs -= 1
+        history.truncate(num_logs)
+        if len(new_links) > 0:
+            history.output = None
+            new_links.reverse()
+            move_stack = np.array([compute_move_vector(position, landlord_position, move)
+                                   for _, (position, move), _ in new_links])
+            forward_rows = self.forward.project(move_stack)
+            state = history.forward_states[-1]
+            for forward_row in forward_rows:
+                state = self.forward.step(forward_row, state)
+                history.forward_states.append(state)
+            history.links.extend(new_links)
+            if self.backward is not None:
+                history.backward_rows.extend(self.backward.project(move_stack))
+            else:
+                history.backward_rows.extend([None] * len(new_links))
+        return history
+
+    def forget(self, game):
+        self._games.pop(game, None)
@@ -1,13 +1,19 @@
 import random
-from collections import Counter
 from copy import copy
 
 import numpy as np
 
+from landlordai.game.base_player import TurnPosition
 from landlordai.game.card import Card
 from landlordai.game.deck import LandlordDeck, CardSet
+from landlordai.game.event_log import EventLog
+from landlordai.game.hand import Hand
 from landlordai.game.move import SpecificMove, BetMove, KittyReveal
-from landlordai.game.player import TurnPosition
+from landlordai.game.move_cache import MoveCache
+from landlordai.game.move_catalog import get_move_catalog
+
+FULL_DECK = Hand.from_cards([card for card in LandlordDeck.NORMAL_CARD_TYPES for _ in range(4)] +
+                            LandlordDeck.EXTRA_CARD_TYPES)
 
 
 class LandlordGame:
@@ -18,12 +24,26 @@ class LandlordGame:
     DEAL_SIZE = 17
     # games shouldn't go this long anyway
     TURN_LIMIT = 99
+    # building the catalog interns every move, so generated moves are shared objects with integer ids
+    move_catalog = get_move_catalog()
+    # shared by every game in the process so repeated hands across turns and rollouts are enumerated once
+    move_cache = MoveCache()
     # kitty_callback should return a list of 3 cards; used if we want manual setting of cards
-    def __init__(self, players, kitty_callback=None):
+    # dealer is an optional BulkDealer; by default each round shuffles its own LandlordDeck
+    # log_level EventLog.OFF skips event logging entirely
+    def __init__(self, players, kitty_callback=None, dealer=None, log_level=EventLog.EVENTS):
         self._players = players
+        self._dealer = dealer
         self._scores = [0] * 3
-        self.string_logs = []
+        self._event_log = EventLog() if log_level != EventLog.OFF else None
         self._move_logs = []
+        # kept up to date as moves are logged so the accessors below don't scan the logs
+        self._last_played = None
+        self._played_cards = Hand()
+        # the move logs as a chain of (previous link, log entry, hash of the logs so far), shared by snapshots
+        self._log_chain = None
+        # one record per push_move, consumed by pop_move
+        self._undo_stack = []
         assert(len(self._players) == LandlordGame.NUM_PLAYERS)
         self._setup()
         self._betting_complete = False
@@ -33,13 +53,83 @@ class LandlordGame:
         cls = self.__class__
         result = cls.__new__(cls)
         result.__dict__.update(self.__dict__)
-        result._move_logs = [(copy(elem[0]), copy(elem[1])) for elem in self._move_logs]
-        result.string_logs = copy(self.string_logs)
+        # log entries and moves are never modified, so only the list itself is copied
+        result._move_logs = copy(self._move_logs)
+        if self._event_log is not None:
+            result._event_log = copy(self._event_log)
+        result._undo_stack = copy(self._undo_stack)
         result._scores = copy(self._scores)
         result._peasant_positions = copy(self._peasant_positions)
-        result._hands = dict((k, copy(v)) for (k, v) in self._hands.items())
+        # hands are immutable, so they can be shared
+        result._hands = copy(self._hands)
+        return result
+
+    # a copy without players, dealer, event log or undo records, for sending to another process;
+    # searches only play the round out, so the copy never deals again
+    def detached_copy(self):
+        result = copy(self)
+        result._players = [None] * LandlordGame.NUM_PLAYERS
+        result._dealer = None
+        result._event_log = None
+        result._undo_stack = []
         return result
 
+    def _capture_state(self):
+        return (self._current_position, self._control_position, self._landlord_position, self._bet_amount,
+                self._betting_complete, self._round_over, self._winners, tuple(self._scores),
+                tuple(self._peasant_positions), tuple(self._hands[position] for position in TurnPosition),
+                self.kitty, self._last_played, self._played_cards, self._unknown_hands)
+
+    def _restore_state(self, state):
+        (self._current_position, self._control_position, self._landlord_position, self._bet_amount,
+         self._betting_complete, self._round_over, self._winners, scores, peasant_positions, hands,
+         self.kitty, self._last_played, self._played_cards, self._unknown_hands) = state
+        self._scores = list(scores)
+        self._peasant_positions = list(peasant_positions)
+        self._hands = dict(zip(TurnPosition, hands))
+
+    # plays a move in place so that pop_move can take it back, for search without copying the game
+    def push_move(self, move, hand_known=True):
+        self._undo_stack.append((self._capture_state(), len(self._move_logs), self._num_events(), self._log_chain))
+        self.play_move(move, hand_known=hand_known)
+
+    def pop_move(self):
+        state, num_moves, num_events, log_chain = self._undo_stack.pop()
+        self._restore_state(state)
+        del self._move_logs[num_moves:]
+        self._truncate_events(num_events)
+        self._log_chain = log_chain
+
+    def snapshot(self):
+        return GameSnapshot(self._capture_state(), self._log_chain, len(self._move_logs), self._num_events())
+
+    # events can only be rewound to an earlier snapshot, they aren't restored going forward
+    def restore(self, snapshot):
+        self._restore_state(snapshot.state)
+        self._move_logs = snapshot.get_move_logs()
+        self._truncate_events(snapshot.num_events)
+        self._log_chain = snapshot.log_chain
+        self._undo_stack = []
+
+    def _num_events(self):
+        if self._event_log is None:
+            return 0
+        return len(self._event_log)
+
+    def _truncate_events(self, num_events):
+        if self._event_log is not None:
+            self._event_log.truncate(num_events)
+
+    def get_event_log(self):
+        return self._event_log
+
+    # the event log rendered as text, empty when logging is off
+    @property
+    def string_logs(self):
+        if self._event_log is None:
+            return []
+        return self._event_log.render()
+
     def play_round(self, debug=False):
         self._setup()
         self._bet_rounds(debug=debug)
@@ -51,22 +141,31 @@ class LandlordGame:
         self._landlord_position = None
         self._peasant_positions = []
         self._bet_amount = 0
-        self._current_position = random.choice(list(TurnPosition))
         self._control_position = None
         self._round_over = False
         # list of winners
         self._winners = None
+        # positions that played with hand_known=False, whose hands are placeholders
+        self._unknown_hands = frozenset()
+        if self._dealer is not None:
+            self.kitty, hands, first_position = self._dealer.next_deal()
+            self._current_position = TurnPosition(first_position)
+            self._hands = dict(zip(list(TurnPosition), hands))
+            return
+        self._current_position = random.choice(list(TurnPosition))
         deck = LandlordDeck()
         self.kitty = deck.draw(LandlordGame.KITTY_SIZE)
-        self._hands = {TurnPosition.FIRST: deck.draw(LandlordGame.DEAL_SIZE),
-                       TurnPosition.SECOND: deck.draw(LandlordGame.DEAL_SIZE),
-                       TurnPosition.THIRD: deck.draw(LandlordGame.DEAL_SIZE)}
+        self._hands = {TurnPosition.FIRST: Hand.from_cards(deck.draw(LandlordGame.DEAL_SIZE)),
+                       TurnPosition.SECOND: Hand.from_cards(deck.draw(LandlordGame.DEAL_SIZE)),
+                       TurnPosition.THIRD: Hand.from_cards(deck.draw(LandlordGame.DEAL_SIZE))}
 
 
+    # hands may be given as Hands or lists of cards
     def force_setup(self, landlord_position: TurnPosition, hands: dict, bet_amount: int):
         self._landlord_position = landlord_position
         self._current_position = self._landlord_position
-        self._hands = hands
+        self._hands = dict((position, Hand.coerce(hand)) for (position, hand) in hands.items())
+        self._unknown_hands = frozenset()
         self._bet_amount = bet_amount
         self._set_peasants()
 
@@ -77,7 +176,8 @@ class LandlordGame:
         self.kitty = kitty
 
     def force_hand(self, position: TurnPosition, hand):
-        self._hands[position] = hand
+        self._hands[position] = Hand.coerce(hand)
+        self._unknown_hands = self._unknown_hands - {position}
 
     def _reveal_kitty(self):
         if self._kitty_callback is not None:
@@ -86,9 +186,8 @@ class LandlordGame:
             assert len(self.kitty) == 3
             assert type(self.kitty[0]) == Card
         # add the kitty to the landlord's hand
-        self._hands[self._landlord_position] += self.kitty
-        self._hands[self._landlord_position] = sorted(self._hands[self._landlord_position])
-        self._move_logs.append((self._current_position, KittyReveal(self.kitty)))
+        self._hands[self._landlord_position] = self._hands[self._landlord_position].add(Hand.from_cards(self.kitty))
+        self._log_move(self._current_position, KittyReveal(self.kitty))
         assert len(self.get_hand(self._landlord_position)) == LandlordGame.KITTY_SIZE + LandlordGame.DEAL_SIZE
 
     def _bet_rounds(self, debug=False):
@@ -128,13 +227,15 @@ class LandlordGame:
 
     def _make_bet_move(self, bet):
         if bet is not None and bet.get_amount() > self._bet_amount:
-            self.string_logs.append(str(self._current_position) + " bet " + str(bet))
-            self._move_logs.append((self._current_position, bet))
+            if self._event_log is not None:
+                self._event_log.record_bet(self._current_position, bet)
+            self._log_move(self._current_position, bet)
             self._bet_amount = bet.get_amount()
             self._landlord_position = self._current_position
         else:
-            self.string_logs.append(str(self._current_position) + " passed")
-            self._move_logs.append((self._current_position, None))
+            if self._event_log is not None:
+                self._event_log.record(EventLog.BET_PASS, self._current_position)
+            self._log_move(self._current_position, None)
 
         self._current_position = self._current_position.next()
 
@@ -147,8 +248,26 @@ class LandlordGame:
 
 
 
+    def _log_move(self, position: TurnPosition, move):
+        self._move_logs.append((position, move))
+        self._log_chain = (self._log_chain, (position, move), hash((self.get_log_hash(), position, move)))
+        if move is not None:
+            self._last_played = move
+            if type(move) == SpecificMove:
+                self._played_cards = self._played_cards.add(move.cards)
+
+    # the move logs as nested (previous link, (position, move), log hash) links, shared with copies and snapshots
+    def get_log_chain(self):
+        return self._log_chain
+
+    # identifies the move logs so far, equal for games that logged the same moves
+    def get_log_hash(self):
+        if self._log_chain is None:
+            return 0
+        return self._log_chain[2]
+
     def get_num_moves(self):
-        return len(self.get_move_logs())
+        return len(self._move_logs)
 
     def _set_peasants(self):
         for position in list(TurnPosition):
@@ -175,15 +294,17 @@ class LandlordGame:
 
     def get_legal_moves(self):
         if self.is_betting_complete():
-            hand = CardSet(Counter(self.get_hand(self.get_current_position())))
-            all_moves = hand.get_all_moves()
+            hand = self.get_hand(self.get_current_position())
 
             # you can play anything if you have control
             if self._control_position == self.get_current_position():
-                return all_moves
+                return self.move_cache.get_all_moves(hand)
 
             # otherwise you have to play moves that beat it, or pass
-            return [move for move in all_moves if move.beats(self.get_last_played())] + [None]
+            last_played = self.get_last_played()
+            if type(last_played) == SpecificMove:
+                return list(CardSet(hand).get_moves_beating(last_played.ranked_move_type)) + [None]
+            return [move for move in self.move_cache.get_all_moves(hand) if move.beats(last_played)] + [None]
         else:
             return [BetMove(x) for x in range(LandlordGame.MAX_BET + 1)]
 
@@ -192,13 +313,12 @@ class LandlordGame:
 
     def play_from_hand(self, move: SpecificMove, hand_known=True):
         hand = self.get_hand(self._current_position)
-        for card, count in move.cards.items():
-            for i in range(count):
-                if hand_known:
-                    hand.remove(card)
-                else:
-                    # if we don't know the hand, then just remove one card from it
-                    self._hands[self._current_position] = self.get_hand(self._current_position)[1:]
+        if hand_known:
+            self._hands[self._current_position] = hand.remove(move.cards)
+        else:
+            # if we don't know the hand, then just remove the right number of cards from it
+            self._hands[self._current_position] = hand.drop_lowest(len(move.cards))
+            self._unknown_hands = self._unknown_hands | {self._current_position}
 
     # main play_move, triages depending on move
     def play_move(self, move, hand_known=True):
@@ -210,16 +330,18 @@ class LandlordGame:
     def _make_card_move(self, move, hand_known=True):
         if move is not None:
             assert (move.beats(self.get_last_played()) or self._current_position == self._control_position)
-            self.string_logs.append(str(self._current_position) + " played " + str(move))
+            if self._event_log is not None:
+                self._event_log.record_play(self._current_position, move)
 
             self.play_from_hand(move, hand_known=hand_known)
             if move.is_bomb():
                 self._bet_amount = self._bet_amount * 2
             self._control_position = self._current_position
         else:
-            self.string_logs.append(str(self._current_position) + " passed.")
+            if self._event_log is not None:
+                self._event_log.record(EventLog.PASS, self._current_position)
 
-        self._move_logs.append((self._current_position, move))
+        self._log_move(self._current_position, move)
         self.compute_round_over()
 
         if not self.is_round_over():
@@ -235,20 +357,23 @@ class LandlordGame:
                 self._bet_amount *= LandlordGame.SWEEP_MULTIPLIER
 
             if self._current_position == self._landlord_position:
-                self.string_logs.append(str(self._current_position) + " wins as Landlord!")
+                if self._event_log is not None:
+                    self._event_log.record(EventLog.LANDLORD_WIN, self._current_position)
                 self._winners = [self._landlord_position]
                 # landlordai gains
                 self._scores[self._current_position] += self._bet_amount * 2
                 self._scores[self._peasant_positions[0]] -= self._bet_amount
                 self._scores[self._peasant_positions[1]] -= self._bet_amount
             else:
-                self.string_logs.append(str(self._peasant_positions) + " win as Peasants!")
+                if self._event_log is not None:
+                    self._event_log.record(EventLog.PEASANT_WIN, self._landlord_position)
                 self._winners = self._peasant_positions
                 # peasants gain
                 self._scores[self._current_position] -= self._bet_amount * 2
                 self._scores[self._peasant_positions[0]] += self._bet_amount
                 self._scores[self._peasant_positions[1]] += self._bet_amount
-            self.string_logs.append(str(self._scores))
+            if self._event_log is not None:
+                self._event_log.record_scores(self._scores)
             assert (sum(self._scores) == 0)
             return True
         return False
@@ -257,7 +382,7 @@ class LandlordGame:
         player = self.get_current_position()
         if move is not None:
             if type(move) == SpecificMove:
-                return self.get_current_position() == player and move.cards == Counter(self.get_hand(player))
+                return self.get_current_position() == player and move.cards == self.get_hand(player)
             if type(move) == BetMove and move.get_amount() == 0 \
                     and self.get_num_moves() >= LandlordGame.NUM_PLAYERS - 1 and self.get_bet_amount() == 0:
                 return True
@@ -310,28 +435,44 @@ class LandlordGame:
         return copy(self._scores)
 
     def main_game(self, debug=False):
-        self._control_position = self._landlord_position
-        self._current_position = self._landlord_position
+        self.begin_main_game()
         while True:
             move = self.get_current_player().make_move(self, debug=debug)
             self.play_move(move)
             #print(self.hands)
-            if len(self.get_move_logs()) >= LandlordGame.TURN_LIMIT:
+            if self.get_num_moves() >= LandlordGame.TURN_LIMIT:
                 break
             if self.is_round_over():
                 break
 
+    # the landlord opens the card play with control
+    def begin_main_game(self):
+        self._control_position = self._landlord_position
+        self._current_position = self._landlord_position
+
     def get_bet_amount(self):
         return self._bet_amount
 
+    # the most recent move in the logs that wasn't a pass
     def get_last_played(self):
-        if len(self.get_move_logs()) == 0:
-            return None
-        for i in range(len(self.get_move_logs()) - 1, -1, -1):
-            if self.get_move_logs()[i][1] is not None:
-                return self.get_move_logs()[i][1]
+        return self._last_played
 
-        return None
+    def get_hand_size(self, position: TurnPosition):
+        return len(self._hands[position])
+
+    # every card played so far this round
+    def get_played_cards(self):
+        return self._played_cards
+
+    # False once the position has played from a hand that wasn't known
+    def is_hand_known(self, position: TurnPosition):
+        return position not in self._unknown_hands
+
+    # cards that are neither in this position's hand nor played yet, i.e. those held by the other two players
+    def get_unseen_cards(self, position: TurnPosition):
+        if not self.is_hand_known(position):
+            raise ValueError('The hand of ' + str(position) + ' is not known, so neither are the unseen cards')
+        return FULL_DECK.remove(self._played_cards).remove(self._hands[position])
 
     def get_control_position(self):
         return self._control_position
@@ -360,3 +501,30 @@ class LandlordGame:
     def get_ai_players(self):
         return self._players
 
+
+
+class GameSnapshot:
+    # immutable copy of a game's state; the move log chain is shared with the snapshots taken before it
+    __slots__ = ('state', 'log_chain', 'num_moves', 'num_events')
+
+    def __init__(self, state, log_chain, num_moves, num_events):
+        self.state = state
+        self.log_chain = log_chain
+        self.num_moves = num_moves
+        self.num_events = num_events
+
+    def get_move_logs(self):
+        logs = [None] * self.num_moves
+        link = self.log_chain
+        for i in range(self.num_moves - 1, -1, -1):
+            link, logs[i], _ = link
+        return logs
+
+    def get_current_position(self):
+        return self.state[0]
+
+    def get_hand(self, position: TurnPosition):
+        return self.state[9][position]
+
+    def is_round_over(self):
+        return self.state[5]
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+from landlordai.game.event_log import EventLog
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.player import LearningPlayer
+
+
+class LandlordGameBatch:
+    # holds independent games and advances them in lockstep, so that a player sitting in several of them
+    # evaluates all of its pending positions with one call to each network
+    # with record set, LearningPlayers record their moves as in make_move
+    def __init__(self, player_groups, dealer=None, record=False, log_level=EventLog.OFF):
+        self._games = [LandlordGame(players=players, dealer=dealer, log_level=log_level) for players in player_groups]
+        self.record = record
+
+        if record:
+            # a player's records describe a single game, so a recording player can't sit in more than one
+            num_games = {}
+            for game in self._games:
+                for player in set(game.get_ai_players()):
+                    num_games[player] = num_games.get(player, 0) + 1
+            for player, count in num_games.items():
+                if isinstance(player, LearningPlayer) and player.estimation_mode == LearningPlayer.ACTUAL_Q:
+                    assert count == 1, 'recording player ' + player.get_name() + ' sits in several games'
+
+    def __len__(self):
+        return len(self._games)
+
+    def get_games(self):
+        return self._games
+
+    @staticmethod
+    def is_game_active(game: LandlordGame):
+        return not game.is_round_over() and game.get_num_moves() < LandlordGame.TURN_LIMIT
+
+    def get_active_games(self):
+        return [game for game in self._games if self.is_game_active(game)]
+
+    def is_done(self):
+        return len(self.get_active_games()) == 0
+
+    # active games grouped by the player that has to move next
+    def collect_decisions(self):
+        decisions = OrderedDict()
+        for game in self.get_active_games():
+            decisions.setdefault(game.get_current_player(), []).append(game)
+        return decisions
+
+    def decide_moves(self, decisions, debug=False):
+        games = []
+        moves = []
+        for player, player_games in decisions.items():
+            if isinstance(player, LearningPlayer):
+                if self.record:
+                    moves.extend(player.make_moves(player_games, debug=debug))
+                else:
+                    moves.extend([move for move, _ in player.decide_best_moves(player_games, debug=debug)])
+            else:
+                moves.extend([player.make_move(game, debug=debug) for game in player_games])
+            games.extend(player_games)
+        return games, moves
+
+    def apply_moves(self, games, moves):
+        assert len(games) == len(moves)
+        for game, move in zip(games, moves):
+            betting = not game.is_betting_complete()
+            game.play_move(move)
+            if betting and game.is_betting_complete() and not game.is_round_over():
+                game.begin_main_game()
+
+    # every active game makes one move
+    def step(self, debug=False):
+        games, moves = self.decide_moves(self.collect_decisions(), debug=debug)
+        self.apply_moves(games, moves)
+        return len(games)
+
+    def play_rounds(self, debug=False):
+        while not self.is_done():
+            self.step(debug=debug)
+
+    # (winner names, loser names) for each game that ended with winners
+    def get_results(self):
+        results = []
+        for game in self._games:
+            if game.has_winners():
+                winners = tuple([player.get_name() for player in game.get_winner_ais()])
+                losers = tuple([player.get_name() for player in game.get_loser_ais()])
+                results.append((winners, losers))
+        return results
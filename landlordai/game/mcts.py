@@ -0,0 +1,197 @@
+import math
+import time
+
+import numpy as np
+
+from landlordai.game.hand_sampler import HandSampler
+from landlordai.game.montecarlo import determinize
+
+
+class MCTSNode:
+    # one public move sequence from the search root; values are from the landlord's side, like the nets' Q
+    __slots__ = ('parent', 'children', 'prior', 'q_estimate', 'visits', 'value_sum', 'virtual_visits')
+
+    def __init__(self, parent=None, prior=1., q_estimate=0.):
+        self.parent = parent
+        # move -> MCTSNode, for every move seen legal here in some determinization
+        self.children = {}
+        self.prior = prior
+        # the position net's Q for the move leading here, counted as one visit
+        self.q_estimate = q_estimate
+        self.visits = 0
+        self.value_sum = 0.
+        # simulations of the current batch passing through, not yet backed up
+        self.virtual_visits = 0
+
+    def get_value(self):
+        return (self.value_sum + self.q_estimate) / (self.visits + 1)
+
+    def size(self):
+        return 1 + sum([child.size() for child in self.children.values()])
+
+
+# +1 where the mover wants the value high, -1 where they want it low
+def _mover_sign(game):
+    if game.get_current_position() == game.get_landlord_position():
+        return 1.
+    return -1.
+
+
+# index of the move to play from the root: the most visited one, and among equally visited ones the best value
+# for the mover, since a value backed by few visits is mostly the nets' guess
+def most_visited_index(game, values, visits):
+    sign = _mover_sign(game)
+    return max(range(len(visits)), key=lambda i: (visits[i], sign * values[i]))
+
+
+class MCTSSearch:
+    # information set MCTS over the value nets: every simulation deals the unseen cards anew, descends by PUCT
+    # among the moves legal in that deal, and stops at a position not yet evaluated
+    # simulations are collected batch_size at a time under virtual loss, and their leaves are evaluated together
+    # with one batch_move_evaluation; the tree under the actual moves is kept for the next decision
+    def __init__(self, player, num_simulations=200, time_budget_ms=None, batch_size=16, c_puct=1.5,
+                 virtual_loss=1., prior_temperature=0.2, seed=None, likelihood=None):
+        self.player = player
+        # the search stops at whichever of the two budgets runs out first
+        self.num_simulations = num_simulations
+        self.time_budget_ms = time_budget_ms
+        self.batch_size = batch_size
+        self.c_puct = c_puct
+        # value a pending simulation counts as, against the side that chose each edge on its path
+        self.virtual_loss = virtual_loss
+        # softmax temperature turning the position net's Q into move priors
+        self.prior_temperature = prior_temperature
+        self.sampler = HandSampler(seed)
+        # weights the deals as in HandSampler.sample_resampled, if given
+        self.likelihood = likelihood
+        # current position -> (root, number of moves at the root, log hash at the root)
+        self._roots = {}
+        self.simulations_run = 0
+        self.reused_visits = 0
+
+    def close(self):
+        self._roots = {}
+
+    # the root for the game, continuing the tree of the previous decision from this seat when the game got here
+    # through it; the tree is only reused along moves that were searched
+    def _find_root(self, game):
+        position = game.get_current_position()
+        if position in self._roots:
+            root, num_moves, log_hash = self._roots[position]
+            if num_moves <= game.get_num_moves():
+                link = game.get_log_chain()
+                for _ in range(game.get_num_moves() - num_moves):
+                    link = link[0]
+                if (0 if link is None else link[2]) == log_hash:
+                    node = root
+                    for _, move in game.get_move_logs()[num_moves:]:
+                        node = node.children.get(move)
+                        if node is None:
+                            break
+                    if node is not None:
+                        node.parent = None
+                        self.reused_visits += node.visits
+                        return node
+        return MCTSNode()
+
+    def _select_child(self, node, game, legal_moves):
+        sign = _mover_sign(game)
+        children = [node.children[move] for move in legal_moves]
+        sqrt_total = math.sqrt(sum([child.visits + child.virtual_visits for child in children]) + 1)
+        best_index = 0
+        best_score = None
+        for i, child in enumerate(children):
+            visits = child.visits + child.virtual_visits
+            value = (child.value_sum + child.q_estimate - sign * self.virtual_loss * child.virtual_visits) \
+                / (visits + 1)
+            score = sign * value + self.c_puct * child.prior * sqrt_total / (1 + visits)
+            if best_score is None or score > best_score:
+                best_index = i
+                best_score = score
+        return legal_moves[best_index], children[best_index]
+
+    # descends from the root in the given deal; returns the path and the game at its end
+    def _simulate(self, root, game, deal):
+        sample = determinize(game, HandSampler.to_hands(deal))
+        path = [root]
+        node = root
+        while not sample.is_round_over() and sample.get_num_moves() < sample.TURN_LIMIT:
+            legal_moves = sample.get_legal_moves()
+            if len(node.children) == 0:
+                return path, sample, legal_moves
+            # moves only legal in this deal join the evaluated ones with a uniform prior and this node's value
+            for move in legal_moves:
+                if move not in node.children:
+                    node.children[move] = MCTSNode(node, 1. / len(legal_moves), node.get_value())
+            move, node = self._select_child(node, sample, legal_moves)
+            node.virtual_visits += 1
+            path.append(node)
+            sample.play_move(move)
+        return path, sample, None
+
+    def _expand(self, node, game, legal_moves, predictions):
+        sign = _mover_sign(game)
+        logits = sign * predictions / self.prior_temperature
+        priors = np.exp(logits - np.max(logits))
+        priors /= np.sum(priors)
+        for move, prior, q_estimate in zip(legal_moves, priors, predictions):
+            if move not in node.children:
+                node.children[move] = MCTSNode(node, prior, q_estimate)
+
+    def _backup(self, path, value):
+        for node in path:
+            node.visits += 1
+            node.value_sum += value
+        for node in path[1:]:
+            node.virtual_visits -= 1
+
+    # runs one batch of simulations, returns how many were run
+    def _run_batch(self, root, game, num_simulations):
+        position = game.get_current_position()
+        if self.likelihood is None:
+            deals = self.sampler.sample_counts(game, position, num_simulations)
+        else:
+            deals = self.sampler.sample_resampled(game, position, num_simulations, self.likelihood)
+        leaves = []
+        for deal in deals:
+            path, sample, legal_moves = self._simulate(root, game, deal)
+            if legal_moves is None:
+                self._backup(path, self.player.get_game_result(sample))
+            else:
+                leaves.append((path, sample, legal_moves))
+
+        if len(leaves) > 0:
+            predictions_list = self.player.batch_move_evaluation([sample for _, sample, _ in leaves],
+                                                                 [legal_moves for _, _, legal_moves in leaves])
+            for (path, sample, legal_moves), predictions in zip(leaves, predictions_list):
+                self.player._score_game_endings(sample, legal_moves, predictions)
+                self._expand(path[-1], sample, legal_moves, predictions)
+                value = predictions[self.player._best_move_index(sample, legal_moves, predictions)]
+                self._backup(path, value)
+        return num_simulations
+
+    def search(self, game):
+        deadline = None
+        if self.time_budget_ms is not None:
+            deadline = time.time() + self.time_budget_ms / 1000.
+        root = self._find_root(game)
+        # the mover's own moves don't depend on the deal, so the root is expanded on the actual game
+        legal_moves = game.get_legal_moves()
+        if any([move not in root.children for move in legal_moves]):
+            predictions = self.player.batch_move_evaluation([game], [legal_moves])[0]
+            self.player._score_game_endings(game, legal_moves, predictions)
+            self._expand(root, game, legal_moves, predictions)
+        num_done = 0
+        while num_done < self.num_simulations:
+            if deadline is not None and num_done > 0 and time.time() > deadline:
+                break
+            num_done += self._run_batch(root, game, min(self.batch_size, self.num_simulations - num_done))
+        self.simulations_run += num_done
+        self._roots[game.get_current_position()] = (root, game.get_num_moves(), game.get_log_hash())
+        return root
+
+    # value of each legal move from the search, and the visits behind it
+    def evaluate(self, game, legal_moves):
+        root = self.search(game)
+        children = [root.children[move] for move in legal_moves]
+        return np.array([child.get_value() for child in children]), np.array([child.visits for child in children])
@@ -0,0 +1,147 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+
+def load_keras_model(path):
+    import keras
+    return keras.models.load_model(path)
+
+
+# the numpy models and history encoder count the memory they hold; keras models, their weights
+def _model_bytes(model):
+    if hasattr(model, 'nbytes'):
+        return model.nbytes
+    if hasattr(model, 'get_weights'):
+        return sum([np.asarray(weights).nbytes for weights in model.get_weights()])
+    return 0
+
+
+class _RegistryEntry:
+    __slots__ = ('model', 'references', '_weight_bytes')
+
+    def __init__(self, model):
+        self.model = model
+        self.references = 0
+        # keras weights keep their size, so they are measured once rather than copied out on every check
+        self._weight_bytes = None if hasattr(model, 'nbytes') else _model_bytes(model)
+
+    # models that count their own memory are asked each time, as what they hold can change after loading
+    def get_num_bytes(self):
+        if self._weight_bytes is None:
+            return self.model.nbytes
+        return self._weight_bytes
+
+
+class ModelRegistry:
+    # loaded models shared by every player in the process, keyed by resolved path, modification time and loader
+    # so a file that is overwritten gets loaded again; entries nobody references are evicted least recently
+    # used first once the loaded models take more than max_bytes
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        # id of a model handed out -> its key, for release
+        self._keys = {}
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(path, loader=load_keras_model):
+        resolved = os.path.realpath(path)
+        return resolved, os.path.getmtime(resolved), loader
+
+    def _get_entry(self, path, loader):
+        key = ModelRegistry.make_key(path, loader)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+        else:
+            model = loader(key[0])
+            entry = _RegistryEntry(model)
+            self._entries[key] = entry
+            if model is not None:
+                self._keys[id(model)] = key
+            self.loads += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    # returns the shared model, which stays loaded until every acquire is matched by a release
+    def acquire(self, path, loader=load_keras_model):
+        entry = self._get_entry(path, loader)
+        entry.references += 1
+        self._evict()
+        return entry.model
+
+    def release(self, model):
+        if model is None:
+            return
+        key = self._keys.get(id(model))
+        if key is None or key not in self._entries:
+            return
+        entry = self._entries[key]
+        assert entry.references > 0
+        entry.references -= 1
+        self._evict()
+
+    # loads models ahead of time without holding a reference to them
+    def preload(self, paths, loader=load_keras_model):
+        for path in paths:
+            self._get_entry(path, loader)
+        self._evict()
+
+    def get_num_bytes(self):
+        return sum([entry.get_num_bytes() for entry in self._entries.values()])
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        num_bytes = self.get_num_bytes()
+        for key in list(self._entries.keys()):
+            if num_bytes <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.references == 0:
+                num_bytes -= entry.get_num_bytes()
+                self._keys.pop(id(entry.model), None)
+                del self._entries[key]
+                self.evictions += 1
+
+    # (resolved path, modification time, loader) the model was loaded under, None for models not from here
+    def get_key(self, model):
+        return self._keys.get(id(model))
+
+    def get_references(self, path, loader=load_keras_model):
+        entry = self._entries.get(ModelRegistry.make_key(path, loader))
+        if entry is None:
+            return 0
+        return entry.references
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return any(key[0] == os.path.realpath(path) for key in self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys.clear()
+
+    def get_stats(self):
+        return {'models': len(self._entries),
+                'bytes': self.get_num_bytes(),
+                'max_bytes': self.max_bytes,
+                'loads': self.loads,
+                'hits': self.hits,
+                'evictions': self.evictions}
+
+
+_registry = None
+
+
+def get_model_registry():
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,153 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from copy import copy
+
+import numpy as np
+
+from landlordai.game.hand_sampler import HandSampler
+
+
+# a copy of the game with the hands replaced, and without players or event log so it pickles cheaply
+def determinize(game, hands):
+    result = game.detached_copy()
+    for position, hand in hands.items():
+        result.force_hand(position, hand)
+    return result
+
+
+# value of each candidate move for player, found by playing every seat greedily with player's nets for
+# depth plies after it and taking the Q of the move the net would make at the leaf
+def rollout_values(player, game, candidates, depth=1):
+    values = np.zeros(len(candidates))
+    rollouts = []
+    for i, move in enumerate(candidates):
+        rollout = copy(game)
+        rollout.play_move(move)
+        if rollout.is_round_over():
+            values[i] = player.get_game_result(rollout)
+        else:
+            rollouts.append((i, rollout))
+
+    for ply in range(depth):
+        active = [(i, rollout) for i, rollout in rollouts if not rollout.is_round_over()
+                  and rollout.get_num_moves() < rollout.TURN_LIMIT]
+        if len(active) == 0:
+            break
+        games = [rollout for _, rollout in active]
+        legal_moves_list = [rollout.get_legal_moves() for rollout in games]
+        predictions_list = player.batch_move_evaluation(games, legal_moves_list)
+        for (i, rollout), legal_moves, predictions in zip(active, legal_moves_list, predictions_list):
+            player._score_game_endings(rollout, legal_moves, predictions)
+            best_move_index = player._best_move_index(rollout, legal_moves, predictions)
+            values[i] = predictions[best_move_index]
+            if ply < depth - 1:
+                rollout.play_move(legal_moves[best_move_index])
+                if rollout.is_round_over():
+                    values[i] = player.get_game_result(rollout)
+    return values
+
+
+# the player each pool worker evaluates rollouts with, loaded once per process
+_worker_player = None
+
+
+def _init_worker(player_class, net_dir, backend, weight_precision):
+    global _worker_player
+    _worker_player = player_class(name='rollout', net_dir=net_dir, epsilon=0,
+                                  estimation_mode=player_class.NO_ESTIMATION, backend=backend,
+                                  weight_precision=weight_precision)
+
+
+def _rollout_task(game, candidates, depth):
+    return rollout_values(_worker_player, game, candidates, depth)
+
+
+class MonteCarloSearch:
+    # determinized Monte Carlo: each sample deals the unseen cards consistently with the public logs and
+    # rolls every candidate forward, the values are averaged over the samples finished within the time budget
+    # num_workers > 0 runs samples on a process pool whose workers load the player's nets themselves
+    # likelihood, if given, weights the deals as in HandSampler.sample_resampled
+    def __init__(self, player, num_samples=30, depth=1, num_workers=0, time_budget=None, seed=None,
+                 likelihood=None):
+        self.player = player
+        self.num_samples = num_samples
+        self.depth = depth
+        self.num_workers = num_workers
+        # seconds per decision, None for no limit; at least one sample always finishes
+        self.time_budget = time_budget
+        self.sampler = HandSampler(seed)
+        self.likelihood = likelihood
+        self._pool = None
+        self.samples_run = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            # tensorflow doesn't survive a fork, so workers start fresh interpreters
+            self._pool = ProcessPoolExecutor(max_workers=self.num_workers,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker,
+                                             initargs=(type(self.player), self.player.net_dir,
+                                                       self.player.backend, self.player.weight_precision))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _samples(self, game):
+        position = game.get_current_position()
+        if self.likelihood is None:
+            deals = self.sampler.sample_counts(game, position, self.num_samples)
+        else:
+            deals = self.sampler.sample_resampled(game, position, self.num_samples, self.likelihood)
+        for deal in deals:
+            yield determinize(game, HandSampler.to_hands(deal))
+
+    def _out_of_time(self, deadline, num_done):
+        return deadline is not None and num_done > 0 and time.time() > deadline
+
+    # mean rollout value of each candidate and the number of samples it is over
+    def evaluate(self, game, candidates):
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.time() + self.time_budget
+
+        totals = np.zeros(len(candidates))
+        num_done = 0
+        if self.num_workers == 0:
+            for sample in self._samples(game):
+                if self._out_of_time(deadline, num_done):
+                    break
+                totals += rollout_values(self.player, sample, candidates, self.depth)
+                num_done += 1
+        else:
+            pool = self._get_pool()
+            samples = self._samples(game)
+            pending = set()
+            # keeps at most one sample per worker in flight, so running over the budget costs one rollout at most
+            for sample in samples:
+                pending.add(pool.submit(_rollout_task, sample, candidates, self.depth))
+                if len(pending) >= self.num_workers:
+                    break
+            while len(pending) > 0:
+                timeout = None
+                if deadline is not None and num_done > 0:
+                    timeout = max(deadline - time.time(), 0)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if len(done) == 0:
+                    break
+                for future in done:
+                    totals += future.result()
+                    num_done += 1
+                if not self._out_of_time(deadline, num_done):
+                    for sample in samples:
+                        pending.add(pool.submit(_rollout_task, sample, candidates, self.depth))
+                        if len(pending) >= self.num_workers:
+                            break
+            for future in pending:
+                future.cancel()
+
+        self.samples_run += num_done
+        return totals / max(num_done, 1), num_done
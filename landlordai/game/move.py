@@ -1,8 +1,7 @@
-from collections import Counter
 from enum import Enum, auto
-from copy import copy
 
 from landlordai.game.card import Card
+from landlordai.game.hand import Hand
 
 
 class BetMove:
@@ -24,6 +23,9 @@ class BetMove:
             return False
         return self.amount == other.amount
 
+    def __hash__(self):
+        return hash(('bet', self.amount))
+
 class KittyReveal:
     def __init__(self, cards: list):
         self.cards = cards
@@ -40,6 +42,9 @@ class KittyReveal:
 
         return self.cards == other.cards
 
+    def __hash__(self):
+        return hash(('kitty', tuple(self.cards)))
+
 class MoveType(Enum):
     SINGLE = auto(),
     PAIR = auto(),
@@ -103,30 +108,44 @@ class MoveType(Enum):
             if l == 6: return MoveType.CHAIN_TRIPLE_6
 
 
+# small integer code per move type, used by the move catalog and for cheap comparisons
+for _code, _move_type in enumerate(MoveType):
+    _move_type.type_code = _code
+
+_BOMB_CODE = MoveType.BOMB.type_code
+
+
 # rank_card is the card that gives the move it's strength, i.e. the highest card of the straight or the non-kicker card
 class RankedMoveType:
+    __slots__ = ('move_type', 'rank_card', 'type_code', 'rank_index')
+
     def __init__(self, move_type: MoveType, rank_card: Card):
         self.move_type = move_type
         self.rank_card = rank_card
+        self.type_code = move_type.type_code
+        self.rank_index = rank_card.card_index
 
     def beats(self, other):
-        if self.move_type != other.move_type:
-            if self.move_type == MoveType.BOMB:
-                return True
-        else:
-            return self.rank_card.beats(other.rank_card)
+        if self.type_code != other.type_code:
+            return self.type_code == _BOMB_CODE
+        return self.rank_index > other.rank_index
 
     def __str__(self):
         return self.move_type.name + '/' + self.rank_card.name
 
 
 class SpecificMove:
-    def __init__(self, ranked_move_type: RankedMoveType, cards: Counter):
+    # move_id is set only on the interned moves of the move catalog
+    __slots__ = ('ranked_move_type', 'cards', 'move_id')
+
+    # cards may be given as a Counter for convenience, but are stored as a Hand
+    def __init__(self, ranked_move_type: RankedMoveType, cards, move_id=None):
         self.ranked_move_type = ranked_move_type
-        self.cards = cards
+        self.cards = Hand.coerce(cards)
+        self.move_id = move_id
         # just an assert
         if ranked_move_type.move_type == MoveType.STRAIGHT_5 or ranked_move_type.move_type == MoveType.STRAIGHT_6:
-            assert ranked_move_type.rank_card == max(cards.keys())
+            assert ranked_move_type.rank_card == max(self.cards.keys())
 
     def rank(self):
         return self.ranked_move_type.rank_card
@@ -139,16 +158,23 @@ class SpecificMove:
         return self.ranked_move_type.beats(other.ranked_move_type)
 
     def is_bomb(self):
-        return self.ranked_move_type.move_type == MoveType.BOMB
+        return self.ranked_move_type.type_code == _BOMB_CODE
 
     def get_cards(self):
-        return copy(self.cards)
+        return self.cards
 
     def __str__(self):
-        return str(self.ranked_move_type) + '(' + str(dict(self.cards)) + ')'
+        return str(self.ranked_move_type) + '(' + str(dict(self.cards.items())) + ')'
+
+    def __repr__(self):
+        return self.__str__()
 
     def __eq__(self, other):
-        if other is None:
+        if self is other:
+            return True
+        if other is None or type(other) != SpecificMove:
             return False
         return self.cards == other.cards
 
+    def __hash__(self):
+        return hash(self.cards)
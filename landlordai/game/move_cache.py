@@ -0,0 +1,89 @@
+import pickle
+from collections import OrderedDict
+
+from landlordai.game.deck import CardSet
+from landlordai.game.hand import Hand
+from landlordai.game.move_catalog import get_move_catalog
+
+
+class MoveCache:
+    # hands that show up in the warm cache file by default: a fresh deal and a landlord hand with the kitty
+    WARM_HAND_SIZES = (17, 20)
+
+    # bounded LRU map from a hand's packed signature to the tuple of every move that hand can make
+    def __init__(self, max_size=2048):
+        assert max_size > 0
+        self.max_size = max_size
+        # packed hand -> [moves, hits]
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_all_moves(self, hand: Hand):
+        key = hand.get_packed()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            entry[1] += 1
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        moves = tuple(CardSet(hand).get_all_moves())
+        self._insert(key, moves, 0)
+        return moves
+
+    def _insert(self, key, moves, hits):
+        self._entries[key] = [moves, hits]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, hand: Hand):
+        return hand.get_packed() in self._entries
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.
+        return self.hits / lookups
+
+    def get_stats(self):
+        return {'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hit_rate()}
+
+    # writes the most reused entries for the given hand sizes so another process can start warm
+    def save_warm(self, path, hand_sizes=WARM_HAND_SIZES, max_entries=None):
+        candidates = [(key, moves, hits) for key, (moves, hits) in self._entries.items()
+                      if hand_sizes is None or len(Hand(key)) in hand_sizes]
+        candidates.sort(key=lambda x: -x[2])
+        if max_entries is not None:
+            candidates = candidates[:max_entries]
+        with open(path, 'wb') as f:
+            pickle.dump(dict((key, (moves, hits)) for key, moves, hits in candidates), f)
+        return len(candidates)
+
+    # loads entries written by save_warm, most reused last so they are evicted last
+    def load_warm(self, path):
+        with open(path, 'rb') as f:
+            warm_entries = pickle.load(f)
+        catalog = get_move_catalog()
+        for key, (moves, hits) in sorted(warm_entries.items(), key=lambda x: x[1][1]):
+            # unpickled moves are copies, swap them back for the shared catalog instances
+            self._insert(key, tuple(catalog.intern(move) for move in moves), hits)
+        return len(warm_entries)
@@ -0,0 +1,71 @@
+import numpy as np
+
+from landlordai.game.deck import CardSet, LandlordDeck, intern_moves
+from landlordai.game.hand import Hand, NUM_CARD_TYPES
+from landlordai.game.move import MoveType, SpecificMove
+
+
+class MoveCatalog:
+    # every distinct move a hand can make, built once; ids follow (move type, rank, cards) order so they are stable
+    def __init__(self):
+        counts = [4] * len(LandlordDeck.NORMAL_CARD_TYPES) + [1] * len(LandlordDeck.EXTRA_CARD_TYPES)
+        generated = CardSet(Hand.from_counts(counts)).get_all_moves()
+        generated.sort(key=lambda move: (move.ranked_move_type.type_code, move.ranked_move_type.rank_index,
+                                         move.cards.get_packed()))
+
+        self._moves = []
+        self._ids = {}
+        for move_id, move in enumerate(generated):
+            interned = SpecificMove(move.ranked_move_type, move.cards, move_id=move_id)
+            self._moves.append(interned)
+            self._ids[move.cards.get_packed()] = move_id
+
+        # one row of card counts per move, in Card order
+        self.count_rows = np.frombuffer(b''.join([move.cards.to_bytes() for move in self._moves]),
+                                        dtype=np.uint8).reshape(len(self._moves), NUM_CARD_TYPES).astype(np.int8)
+        self.type_codes = np.array([move.ranked_move_type.type_code for move in self._moves], dtype=np.int8)
+        self.rank_indices = np.array([move.ranked_move_type.rank_index for move in self._moves], dtype=np.int8)
+        self.bomb_mask = self.type_codes == MoveType.BOMB.type_code
+
+        intern_moves(self._moves)
+
+    def __len__(self):
+        return len(self._moves)
+
+    def get_move(self, move_id):
+        return self._moves[move_id]
+
+    def get_moves(self):
+        return self._moves
+
+    def get_id(self, move: SpecificMove):
+        if move.move_id is not None:
+            return move.move_id
+        return self._ids[move.cards.get_packed()]
+
+    def get_ids(self, moves):
+        return np.array([self.get_id(move) for move in moves], dtype=np.int32)
+
+    # returns the catalog's shared instance of an equal move
+    def intern(self, move: SpecificMove):
+        return self._moves[self.get_id(move)]
+
+    def beats(self, move_id, other_id):
+        if self.type_codes[move_id] != self.type_codes[other_id]:
+            return bool(self.bomb_mask[move_id])
+        return bool(self.rank_indices[move_id] > self.rank_indices[other_id])
+
+    # boolean mask over the whole catalog of the moves that beat move_id
+    def beating_mask(self, move_id):
+        same_type = self.type_codes == self.type_codes[move_id]
+        return (same_type & (self.rank_indices > self.rank_indices[move_id])) | (~same_type & self.bomb_mask)
+
+
+_catalog = None
+
+
+def get_move_catalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = MoveCatalog()
+    return _catalog
@@ -0,0 +1,373 @@
+import json
+from functools import partial
+
+import h5py
+import numpy as np
+
+
+def _sigmoid(x):
+    return 1. / (1. + np.exp(-x))
+
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': lambda x: np.clip(x / 6. + 0.5, 0., 1.),
+    # keras 2 gave hard_sigmoid another slope; read_keras_h5 renames it to this in files keras 2 saved
+    'hard_sigmoid_keras2': lambda x: np.clip(0.2 * x + 0.5, 0., 1.)
+}
+
+
+def get_activation(name):
+    if name not in _ACTIVATIONS:
+        raise ValueError('Unsupported activation ' + str(name))
+    return _ACTIVATIONS[name]
+
+
+# precisions weights can be kept at; computation always runs in float32
+FLOAT32 = 'float32'
+FLOAT16 = 'float16'
+INT8 = 'int8'
+PRECISIONS = (FLOAT32, FLOAT16, INT8)
+
+
+class Kernel:
+    # a weight matrix stored at reduced precision, used as the right operand of @
+    # int8 keeps one scale per output column
+    # products widen about BLOCK_BYTES of columns to float32 at a time and keep none of them, so only the reduced
+    # copy stays in memory; precision_report measures what the conversions cost
+    __array_ufunc__ = None
+    BLOCK_BYTES = 256 * 1024
+
+    def __init__(self, matrix, precision=FLOAT32):
+        assert precision in PRECISIONS
+        matrix = np.asarray(matrix, dtype=np.float32)
+        self.precision = precision
+        self.shape = matrix.shape
+        self.scale = None
+        if precision == INT8:
+            self.scale = np.abs(matrix).max(axis=0) / 127.
+            self.scale[self.scale == 0] = 1.
+            self.values = np.round(matrix / self.scale).astype(np.int8)
+            self.scale = self.scale.astype(np.float32)
+        else:
+            self.values = matrix.astype(precision)
+
+    # columns start to end as float32
+    def widen(self, start=0, end=None):
+        block = self.values[:, start:end].astype(np.float32)
+        if self.scale is not None:
+            block *= self.scale[start:end]
+        return block
+
+    def __rmatmul__(self, other):
+        other = np.asarray(other, dtype=np.float32)
+        result = np.empty(other.shape[:-1] + (self.shape[1], ), dtype=np.float32)
+        block_columns = max(1, Kernel.BLOCK_BYTES // (4 * self.shape[0]))
+        for start in range(0, self.shape[1], block_columns):
+            end = start + block_columns
+            result[..., start:end] = other @ self.widen(start, end)
+        return result
+
+    def __getitem__(self, item):
+        return Kernel.from_parts(self.values[item], None if self.scale is None else self.scale[item[1]],
+                                 self.precision)
+
+    @classmethod
+    def from_parts(cls, values, scale, precision):
+        kernel = cls.__new__(cls)
+        kernel.precision = precision
+        kernel.values = values
+        kernel.scale = scale
+        kernel.shape = values.shape
+        return kernel
+
+    def get_weights(self):
+        if self.scale is None:
+            return [self.values]
+        return [self.values, self.scale]
+
+    @property
+    def nbytes(self):
+        return _nbytes(self.get_weights())
+
+
+def make_kernel(matrix, precision=FLOAT32):
+    if precision == FLOAT32:
+        return np.asarray(matrix, dtype=np.float32)
+    return Kernel(matrix, precision)
+
+
+# the arrays of weights, with kernels and GRUs expanded into theirs
+def _weight_arrays(weights):
+    arrays = []
+    for weight in weights:
+        if type(weight) in (Kernel, GRUWeights):
+            arrays.extend(weight.get_weights())
+        else:
+            arrays.append(weight)
+    return arrays
+
+
+# memory held by arrays, kernels and GRUs
+def _nbytes(weights):
+    return sum([weight.nbytes for weight in weights])
+
+
+class GRUWeights:
+    # one GRU direction as keras saves it, gates ordered update, reset, candidate
+    def __init__(self, kernel, recurrent_kernel, bias, reset_after=False, precision=FLOAT32, activation='tanh',
+                 recurrent_activation='sigmoid'):
+        self.units = recurrent_kernel.shape[0]
+        self.reset_after = reset_after
+        self.precision = precision
+        self.activation = get_activation(activation)
+        self.recurrent_activation = get_activation(recurrent_activation)
+        self.kernel = make_kernel(kernel, precision)
+        self.recurrent_kernel = make_kernel(recurrent_kernel, precision)
+        bias = np.asarray(bias, dtype=np.float32)
+        if reset_after:
+            self.input_bias, self.recurrent_bias = bias[0], bias[1]
+        else:
+            self.input_bias, self.recurrent_bias = bias, np.zeros_like(bias)
+        self._gate_kernel = self.recurrent_kernel[:, :2 * self.units]
+        self._candidate_kernel = self.recurrent_kernel[:, 2 * self.units:]
+
+    # inputs projected through the kernel, done once per move
+    def project(self, inputs):
+        return np.asarray(inputs, dtype=np.float32) @ self.kernel + self.input_bias
+
+    def step(self, projected, state):
+        units = self.units
+        if self.reset_after:
+            recurrent = state @ self.recurrent_kernel + self.recurrent_bias
+            update = self.recurrent_activation(projected[..., :units] + recurrent[..., :units])
+            reset = self.recurrent_activation(projected[..., units:2 * units] + recurrent[..., units:2 * units])
+            candidate = self.activation(projected[..., 2 * units:] + reset * recurrent[..., 2 * units:])
+        else:
+            recurrent = state @ self._gate_kernel
+            update = self.recurrent_activation(projected[..., :units] + recurrent[..., :units])
+            reset = self.recurrent_activation(projected[..., units:2 * units] + recurrent[..., units:])
+            candidate = self.activation(projected[..., 2 * units:] + (reset * state) @ self._candidate_kernel)
+        return update * state + (1. - update) * candidate
+
+    def run(self, projected_rows, state):
+        for projected in projected_rows:
+            state = self.step(projected, state)
+        return state
+
+    # steps over all-zero padding rows, whose projection is just the bias
+    def run_padding(self, state, num_steps):
+        for _ in range(num_steps):
+            state = self.step(self.input_bias, state)
+        return state
+
+    # final states for a batch of sequences shaped (batch, timesteps, features)
+    def run_sequences(self, inputs, go_backwards=False):
+        projected = self.project(inputs)
+        if go_backwards:
+            projected = projected[:, ::-1]
+        state = np.zeros((projected.shape[0], self.units), dtype=np.float32)
+        for t in range(projected.shape[1]):
+            state = self.step(projected[:, t], state)
+        return state
+
+    def initial_state(self):
+        return np.zeros(self.units, dtype=np.float32)
+
+    def get_weights(self):
+        return _weight_arrays([self.kernel, self.recurrent_kernel, self.input_bias])
+
+    # the gate and candidate kernels are views into the recurrent kernel, so they hold nothing of their own
+    @property
+    def nbytes(self):
+        return _nbytes([self.kernel, self.recurrent_kernel, self.input_bias, self.recurrent_bias])
+
+
+# model config and {layer name: {weight path: array}} of a keras h5 model, None if it isn't one
+def read_keras_h5(path):
+    if not h5py.is_hdf5(path):
+        return None
+    with h5py.File(path, 'r') as f:
+        if 'model_config' not in f.attrs or 'model_weights' not in f:
+            return None
+        model_config = f.attrs['model_config']
+        if type(model_config) == bytes:
+            model_config = model_config.decode('utf-8')
+        model_config = json.loads(model_config)
+        keras_version = f.attrs.get('keras_version', '')
+        if type(keras_version) == bytes:
+            keras_version = keras_version.decode('utf-8')
+        if keras_version.startswith('2.'):
+            _rename_keras2_activations(model_config)
+
+        layer_weights = {}
+        for layer in model_config['config']['layers']:
+            name = layer['config']['name']
+            weights = {}
+            if name in f['model_weights']:
+                f['model_weights'][name].visititems(
+                    lambda path, obj: weights.__setitem__(path, obj[()]) if isinstance(obj, h5py.Dataset) else None)
+            layer_weights[name] = weights
+    return model_config, layer_weights
+
+
+def _rename_keras2_activations(config):
+    if type(config) == list:
+        for item in config:
+            _rename_keras2_activations(item)
+    elif type(config) == dict:
+        for key, value in config.items():
+            if key in ('activation', 'recurrent_activation') and value == 'hard_sigmoid':
+                config[key] = 'hard_sigmoid_keras2'
+            else:
+                _rename_keras2_activations(value)
+
+
+# weights whose path contains prefix, by their short name (kernel, bias, ...)
+def _find_weights(weights, prefix=''):
+    found = {}
+    for path, value in weights.items():
+        if prefix in path:
+            found[path.split('/')[-1].split(':')[0]] = value
+    return found
+
+
+def make_gru(weights, gru_config, prefix='', precision=FLOAT32):
+    found = _find_weights(weights, prefix)
+    return GRUWeights(found['kernel'], found['recurrent_kernel'], found['bias'],
+                      reset_after=gru_config.get('reset_after', False), precision=precision,
+                      activation=gru_config.get('activation', 'tanh'),
+                      recurrent_activation=gru_config.get('recurrent_activation', 'sigmoid'))
+
+
+def _inbound_names(layer):
+    if len(layer['inbound_nodes']) == 0:
+        return []
+    node = layer['inbound_nodes'][0]
+    # keras 3 stores the call arguments
+    if type(node) == dict:
+        args = node['args'][0]
+        if type(args) != list:
+            args = [args]
+        return [arg['config']['keras_history'][0] for arg in args]
+    return [inbound[0] for inbound in node]
+
+
+# keras 3 saves a single input or output as one [name, node, tensor] rather than a list of them
+def _node_list(nodes):
+    if len(nodes) > 0 and type(nodes[0]) == str:
+        return [nodes]
+    return nodes
+
+
+class NumpyModel:
+    # a saved keras model evaluated layer by layer in numpy, for the layer types the landlord nets are built from
+    SUPPORTED_LAYERS = ('InputLayer', 'Concatenate', 'Dense', 'BatchNormalization', 'Dropout', 'Activation',
+                        'GRU', 'Bidirectional')
+
+    def __init__(self, input_names, output_names, layers):
+        self.input_names = input_names
+        self.output_names = output_names
+        # (name, function of the inbound arrays, inbound names, weights) in evaluation order
+        self.layers = layers
+
+    # precision applies to the Dense and GRU kernels
+    @classmethod
+    def from_h5(cls, path, precision=FLOAT32):
+        model = read_keras_h5(path)
+        if model is None:
+            return None
+        model_config, layer_weights = model
+        config = model_config['config']
+
+        layers = []
+        for layer in config['layers']:
+            class_name = layer['class_name']
+            if class_name not in NumpyModel.SUPPORTED_LAYERS:
+                raise ValueError('Unsupported layer ' + class_name + ' in ' + path)
+            if class_name == 'InputLayer':
+                continue
+            name = layer['config']['name']
+            function, weights = cls._make_layer(class_name, layer['config'], layer_weights[name], precision)
+            layers.append((name, function, _inbound_names(layer), weights))
+
+        input_names = [inp[0] for inp in _node_list(config['input_layers'])]
+        output_names = [out[0] for out in _node_list(config['output_layers'])]
+        return cls(input_names, output_names, layers)
+
+    @staticmethod
+    def _make_layer(class_name, layer_config, weights, precision=FLOAT32):
+        activation = get_activation(layer_config.get('activation', 'linear'))
+        if class_name == 'Concatenate':
+            axis = layer_config.get('axis', -1)
+            return lambda inputs: np.concatenate(inputs, axis=axis), []
+        if class_name in ('Dropout', 'Activation'):
+            return lambda inputs: activation(inputs[0]), []
+        if class_name == 'Dense':
+            found = _find_weights(weights)
+            kernel = make_kernel(found['kernel'], precision)
+            bias = found.get('bias', np.zeros(kernel.shape[1])).astype(np.float32)
+            return lambda inputs: activation(inputs[0] @ kernel + bias), [kernel, bias]
+        if class_name == 'BatchNormalization':
+            # inference only, so the moving statistics fold into one scale and shift
+            found = _find_weights(weights)
+            moving_mean = found['moving_mean']
+            scale = 1. / np.sqrt(found['moving_variance'] + layer_config.get('epsilon', 1e-3))
+            scale = (scale * found.get('gamma', 1.)).astype(np.float32)
+            shift = (found.get('beta', 0.) - moving_mean * scale).astype(np.float32)
+            return lambda inputs: inputs[0] * scale + shift, [scale, shift]
+        if class_name == 'GRU':
+            assert not layer_config.get('return_sequences', False)
+            gru = make_gru(weights, layer_config, precision=precision)
+            go_backwards = layer_config.get('go_backwards', False)
+            return lambda inputs: gru.run_sequences(inputs[0], go_backwards=go_backwards), [gru]
+        if class_name == 'Bidirectional':
+            gru_config = layer_config['layer']['config']
+            assert layer_config['layer']['class_name'] == 'GRU' and layer_config.get('merge_mode', 'concat') == 'concat'
+            assert not gru_config.get('return_sequences', False)
+            forward = make_gru(weights, gru_config, 'forward_', precision)
+            backward = make_gru(weights, gru_config, 'backward_', precision)
+            return lambda inputs: np.concatenate([forward.run_sequences(inputs[0]),
+                                                  backward.run_sequences(inputs[0], go_backwards=True)], axis=-1), \
+                [forward, backward]
+        raise ValueError('Unsupported layer ' + class_name)
+
+    # same call as keras' Model.predict; the whole batch is evaluated at once
+    def predict(self, inputs, batch_size=None, verbose=0):
+        if type(inputs) != list:
+            inputs = [inputs]
+        assert len(inputs) == len(self.input_names)
+        values = dict((name, np.asarray(inp, dtype=np.float32)) for name, inp in zip(self.input_names, inputs))
+        for name, function, inbound_names, _ in self.layers:
+            values[name] = function([values[inbound] for inbound in inbound_names])
+        outputs = [values[name] for name in self.output_names]
+        if len(outputs) == 1:
+            return outputs[0]
+        return outputs
+
+    def get_weights(self):
+        return _weight_arrays([weights for _, _, _, layer_weights in self.layers for weights in layer_weights])
+
+    @property
+    def nbytes(self):
+        return _nbytes([weights for _, _, _, layer_weights in self.layers for weights in layer_weights])
+
+
+def load_numpy_model(path, precision=FLOAT32):
+    return NumpyModel.from_h5(path, precision)
+
+
+_loaders = {}
+
+
+# one loader object per function and precision, so the model registry keeps the precisions apart
+def get_loader(function, precision=FLOAT32):
+    if precision == FLOAT32:
+        return function
+    key = (function, precision)
+    if key not in _loaders:
+        _loaders[key] = partial(function, precision=precision)
+    return _loaders[key]
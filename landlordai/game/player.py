@@ -1,48 +1,21 @@
+import os
 import random
-from collections import Counter
-from copy import copy
-from enum import IntEnum
 
-import keras
 import numpy as np
 
+from landlordai.game.base_player import TurnPosition, Player, RandomPlayer, NoBetPlayer
 from landlordai.game.card import Card, string_to_card
 from landlordai.game.deck import CardSet
+from landlordai.game.hand import Hand, NUM_CARD_TYPES
+from landlordai.game.endgame import EndgameSolver
+from landlordai.game.history_encoder import HistoryEncoder
+from landlordai.game.model_registry import get_model_registry, load_keras_model
+from landlordai.game.mcts import MCTSSearch, most_visited_index
+from landlordai.game.montecarlo import MonteCarloSearch
 from landlordai.game.move import KittyReveal, SpecificMove, BetMove
-
-
-class TurnPosition(IntEnum):
-    FIRST = 0,
-    SECOND = 1,
-    THIRD = 2
-
-    def next(self):
-        if self == TurnPosition.FIRST:
-            return TurnPosition.SECOND
-        if self == TurnPosition.SECOND:
-            return TurnPosition.THIRD
-        if self == TurnPosition.THIRD:
-            return TurnPosition.FIRST
-
-    def previous(self):
-        return self.next().next()
-
-    def __repr__(self):
-        return self.__str__()
-
-    def __str__(self):
-        return self.name + ' Player'
-
-class Player:
-    def __init__(self, name):
-        self.name = name
-
-    # returns None for pass, otherwise returns a SpecificMove
-    def make_move(self, game):
-        pass
-
-    def get_name(self):
-        return self.name
+from landlordai.game.move_catalog import get_move_catalog
+from landlordai.game.numpy_model import load_numpy_model, get_loader, FLOAT32
+from landlordai.game.prediction_cache import PredictionCache
 
 
 class LearningPlayer(Player):
@@ -51,6 +24,19 @@ class LearningPlayer(Player):
     #estimation methods for q(s', a')
     NO_ESTIMATION = 'no_estimation'
     ACTUAL_Q = 'actualq'
+    # card play decided by rollouts over random_mc_num_explorations sampled deals, estimation_depth plies deep
+    MONTECARLO = 'montecarlo'
+    # card play decided by a batched information set MCTS over the nets
+    MCTS = 'mcts'
+    # the search modes only choose moves; like NO_ESTIMATION they record nothing to train on, so experience
+    # for the simulator's writers has to come from ACTUAL_Q players
+    SEARCH_MODES = (MONTECARLO, MCTS)
+
+    # inference backends: keras models, or the same weights evaluated in numpy without tensorflow
+    KERAS_BACKEND = 'keras'
+    NUMPY_BACKEND = 'numpy'
+    # features are built in the precision the networks evaluate in
+    FEATURE_DTYPE = np.float32
 
     # 12: number of distinct cards, each feature is the number played
     # 3: one-hot encoding for landlordai player
@@ -61,27 +47,71 @@ class LearningPlayer(Player):
     # appends the length of each player's hand
     HAND_FEATURES = len(Card) + 3
 
+    # rows of the move feature table: one per seat relative to the landlord, plus landlord not yet decided
+    NUM_SEAT_ROLES = 4
+    # (seat role, catalog move id) -> move vector, with passes in the last column; built on first use
+    _move_feature_table = None
+    # history vectors and position predictions shared by every player in the process, namespaced by model
+    prediction_cache = PredictionCache()
+
     def __init__(self, name, net_dir=None, epsilon=0.1, learning_rate=0.2, discount_factor=1,
                   estimation_mode=ACTUAL_Q,
                  random_mc_num_explorations=30,
-                 estimation_depth=1):
+                 estimation_depth=1, incremental_history=True, backend=KERAS_BACKEND, weight_precision=FLOAT32,
+                 use_prediction_cache=True, mc_num_workers=0, mc_time_budget=None,
+                 mcts_simulations=200, mcts_time_ms=None, mcts_batch_size=16,
+                 endgame_threshold=None, endgame_mode=EndgameSolver.PERFECT_INFORMATION, endgame_samples=20):
+        # the constructor arguments, enough to build the same player in another process
+        self._config = dict((key, value) for key, value in locals().items() if key not in ('self', '__class__'))
         super().__init__(name)
 
         self.epsilon = epsilon
         self.empty_nets = False
+        # carries the history_net state across turns instead of predicting over the whole padded history
+        self.incremental_history = incremental_history
+        self.history_encoder = None
+        self.backend = backend
+        # float16 or int8 weights are only available to the numpy evaluation
+        self.weight_precision = weight_precision
+        assert weight_precision == FLOAT32 or backend == LearningPlayer.NUMPY_BACKEND
         self.estimation_mode = estimation_mode
         self.random_mc_num_explorations = random_mc_num_explorations
         self.estimation_depth = estimation_depth
+        # rollouts run on a pool of this many processes, 0 runs them in this one
+        self.mc_num_workers = mc_num_workers
+        # seconds of rollouts per decision, None for no limit
+        self.mc_time_budget = mc_time_budget
+        # MCTS stops after mcts_simulations or mcts_time_ms, whichever comes first
+        self.mcts_simulations = mcts_simulations
+        self.mcts_time_ms = mcts_time_ms
+        self.mcts_batch_size = mcts_batch_size
+        self.search = None
+        # card play is solved exactly once fewer than endgame_threshold cards remain in all hands, None never does;
+        # perfect information solves the actual hands, determinized averages over endgame_samples sampled deals
+        self.endgame_threshold = endgame_threshold
+        self.endgame_mode = endgame_mode
+        self.endgame_samples = endgame_samples
+        self.endgame_solver = EndgameSolver(self.get_result_value)
+        self.net_dir = net_dir
+        # predictions are only cached for loaded nets, under a key for the model and how it is evaluated;
+        # the registry keys carry the files' modification times, so nets written over the old ones don't share it
+        self.cache_namespace = None
         if net_dir is None:
             self.empty_nets = True
         else:
             self._load_nnets(net_dir)
+            if use_prediction_cache:
+                registry = get_model_registry()
+                self.cache_namespace = (type(self).__name__, os.path.realpath(net_dir), backend, weight_precision,
+                                        registry.get_key(self.history_net), registry.get_key(self.position_net))
 
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         self.feature_index = self._make_feature_index()
 
         # elements for record
+        # a simulator writing to a trajectory store rebuilds the history matrices from the decision points instead
+        self.record_histories = True
         self._reset_records()
 
     def _reset_records(self):
@@ -89,13 +119,46 @@ class LearningPlayer(Player):
         self.record_move_vectors = []
         self._record_future_q = []
         self.record_hand_vectors = []
+        # (moves logged, landlord position) at each recorded decision, enough to rebuild its history matrix
+        self.record_decision_points = []
         # for debugging
         self._record_state_q = []
         self._recording_finalized = False
 
+    @staticmethod
+    def _load_history_encoder(path, precision=FLOAT32):
+        # None if the history net isn't a plain or bidirectional GRU
+        return HistoryEncoder.from_h5(path, LearningPlayer.TIMESTEPS, precision)
+
+    # players loading the same net_dir share the models in the registry
     def _load_nnets(self, net_dir):
-        self.history_net = keras.models.load_model(net_dir + "/history.h5")
-        self.position_net = keras.models.load_model(net_dir + '/position.h5')
+        registry = get_model_registry()
+        loader = load_keras_model
+        if self.backend == LearningPlayer.NUMPY_BACKEND:
+            loader = get_loader(load_numpy_model, self.weight_precision)
+        self.history_net = registry.acquire(net_dir + "/history.h5", loader=loader)
+        self.position_net = registry.acquire(net_dir + '/position.h5', loader=loader)
+        if self.incremental_history:
+            self.history_encoder = registry.acquire(net_dir + "/history.h5",
+                                                    loader=get_loader(LearningPlayer._load_history_encoder,
+                                                                      self.weight_precision))
+
+    # constructor arguments of this player; type(player)(**player.get_config()) loads the same nets afresh
+    def get_config(self):
+        return dict(self._config)
+
+    # lets the registry evict this player's models once no other player uses them
+    def release_nets(self):
+        if self.empty_nets:
+            return
+        registry = get_model_registry()
+        registry.release(self.history_net)
+        registry.release(self.position_net)
+        registry.release(self.history_encoder)
+        self.history_net = None
+        self.position_net = None
+        self.history_encoder = None
+        self.empty_nets = True
 
     '''
     def create_nnet(self):
@@ -147,7 +210,7 @@ class LearningPlayer(Player):
         fluff_volume = LearningPlayer.TIMESTEPS - len(move_stack)
 
         assert fluff_volume >= 0
-        fluff_stack = np.zeros((fluff_volume, LearningPlayer.TIMESTEP_FEATURES))
+        fluff_stack = np.zeros((fluff_volume, LearningPlayer.TIMESTEP_FEATURES), dtype=LearningPlayer.FEATURE_DTYPE)
 
         if len(move_stack) == 0:
             return fluff_stack
@@ -158,7 +221,7 @@ class LearningPlayer(Player):
         return self._append_padding(self._derive_move_stack(game)).astype(np.int8)
 
     def compute_move_vector(self, player: TurnPosition, landlord_position: TurnPosition, move):
-        move_vector = np.zeros(LearningPlayer.TIMESTEP_FEATURES)
+        move_vector = np.zeros(LearningPlayer.TIMESTEP_FEATURES, dtype=LearningPlayer.FEATURE_DTYPE)
         other_features = {}
         if type(move) == BetMove:
             other_features = {
@@ -178,8 +241,8 @@ class LearningPlayer(Player):
             }
 
         if type(move) == SpecificMove:
-            for card, count in move.cards.items():
-                move_vector[self.get_feature_index(card.name)] = count
+            # card features occupy the first slots, in Card order
+            move_vector[:NUM_CARD_TYPES] = move.cards.counts()
             other_features = {'I_AM_LANDLORD': 1 if player == landlord_position else 0,
                               'I_AM_BEFORE_LANDLORD': 1 if player.previous() == landlord_position else 0,
                               'I_AM_AFTER_LANDLORD': 1 if player.next() == landlord_position else 0}
@@ -188,11 +251,45 @@ class LearningPlayer(Player):
 
         return move_vector
 
+    @classmethod
+    def _seat_role(cls, player: TurnPosition, landlord_position: TurnPosition):
+        if landlord_position is None:
+            return 3
+        if player == landlord_position:
+            return 0
+        if player.previous() == landlord_position:
+            return 1
+        return 2
+
+    def _get_move_feature_table(self):
+        if LearningPlayer._move_feature_table is None:
+            catalog = get_move_catalog()
+            # a seat for each role relative to a first seat landlord, then an undecided landlord
+            seats = [(TurnPosition.FIRST, TurnPosition.FIRST), (TurnPosition.SECOND, TurnPosition.FIRST),
+                     (TurnPosition.THIRD, TurnPosition.FIRST), (TurnPosition.FIRST, None)]
+            table = np.zeros((LearningPlayer.NUM_SEAT_ROLES, len(catalog) + 1, LearningPlayer.TIMESTEP_FEATURES),
+                             dtype=LearningPlayer.FEATURE_DTYPE)
+            for role, (player, landlord_position) in enumerate(seats):
+                assert LearningPlayer._seat_role(player, landlord_position) == role
+                for move in catalog.get_moves():
+                    table[role, move.move_id] = self.compute_move_vector(player, landlord_position, move)
+                table[role, -1] = self.compute_move_vector(player, landlord_position, None)
+            LearningPlayer._move_feature_table = table
+        return LearningPlayer._move_feature_table
+
+    # same rows as stacking compute_move_vector over the moves, gathered from the precomputed table
+    def compute_move_matrix(self, player: TurnPosition, landlord_position: TurnPosition, moves):
+        if any(type(move) != SpecificMove and move is not None for move in moves):
+            return np.vstack([self.compute_move_vector(player, landlord_position, move) for move in moves])
+
+        catalog = get_move_catalog()
+        move_ids = [-1 if move is None else catalog.get_id(move) for move in moves]
+        return self._get_move_feature_table()[LearningPlayer._seat_role(player, landlord_position), move_ids]
+
     def get_hand_vector(self, game, player: TurnPosition):
         hand = game.get_hand(player)
-        vector = np.zeros(len(Card) + 3)
-        for i, card in enumerate(Card):
-            vector[i] = hand.count(card)
+        vector = np.zeros(len(Card) + 3, dtype=LearningPlayer.FEATURE_DTYPE)
+        vector[:NUM_CARD_TYPES] = hand.counts()
 
         if game.is_betting_complete():
             vector[-3] = len(game.get_hand(game.get_landlord_position()))
@@ -208,7 +305,30 @@ class LearningPlayer(Player):
         if self.empty_nets:
             return np.random.random(LearningPlayer.TIMESTEP_FEATURES) * 0.01
 
-        return self.history_net.predict(np.array([features]), batch_size=1)[0]
+        return self.history_net.predict(np.array([features], dtype=LearningPlayer.FEATURE_DTYPE), batch_size=1)[0]
+
+    def _encode_history(self, game):
+        if self.history_encoder is not None and not self.empty_nets:
+            return self.history_encoder.encode(game, self.compute_move_vector)
+        return self._get_history_vector(self._derive_features(game))
+
+    def _history_key(self, game):
+        return self.cache_namespace, game.get_log_hash(), game.get_landlord_position()
+
+    # the position net's inputs are determined by the history, the mover, their hand, the hand sizes and the move
+    def _position_key(self, game, move):
+        position = game.get_current_position()
+        hand_sizes = tuple([len(game.get_hand(player)) for player in TurnPosition])
+        return self.cache_namespace, game.get_log_hash(), game.get_landlord_position(), position, \
+            game.get_hand(position), hand_sizes, move
+
+    # one history_net call for a stack of feature matrices
+    def _get_history_vectors(self, features_batch):
+        if self.empty_nets:
+            return np.random.random((len(features_batch), LearningPlayer.TIMESTEP_FEATURES)) * 0.01
+
+        return self.history_net.predict(np.array(features_batch, dtype=LearningPlayer.FEATURE_DTYPE),
+                                        batch_size=len(features_batch))
 
     def _get_position_predictions(self, history_matrix, move_options_matrix, hand_matrix):
         if self.empty_nets:
@@ -228,51 +348,164 @@ class LearningPlayer(Player):
 
         return np.argmax(flip_predictions)
 
-    def full_move_evaluation(self, game, legal_moves):
-        history_features = self._derive_features(game)
-
-        # all the moves we make from here will not affect the history, so assess it and copy
-        history_vector = self._get_history_vector(history_features)
-        history_matrix = np.tile(history_vector, (len(legal_moves), 1))
+    # move and hand features for each of the possible moves from this position
+    def _candidate_matrices(self, game, legal_moves):
+        move_options_matrix = self.compute_move_matrix(game.get_current_position(), game.get_landlord_position(),
+                                                       legal_moves)
 
         # make the hand vector and copy it
         hand_vector = self.get_hand_vector(game, game.get_current_position())
         hand_matrix = np.tile(hand_vector, (len(legal_moves), 1))
+        return move_options_matrix, hand_matrix
 
-        # create features for each of the possible moves from this position
-        move_options_matrix = np.vstack([self.compute_move_vector(game.get_current_position(),
-                                                                  game.get_landlord_position(), move) for move in legal_moves])
+    def full_move_evaluation(self, game, legal_moves):
+        return self.batch_move_evaluation([game], [legal_moves])[0]
+
+    def _batch_history_vectors(self, games):
+        if self.history_encoder is not None and not self.empty_nets:
+            return self.history_encoder.encode_batch(games, self.compute_move_vector)
+        return list(self._get_history_vectors([self._derive_features(game) for game in games]))
+
+    # history vector of each game, only encoding the ones missing from the prediction cache
+    def _cached_history_vectors(self, games):
+        if self.cache_namespace is None:
+            return self._batch_history_vectors(games)
+
+        keys = [self._history_key(game) for game in games]
+        vectors = [LearningPlayer.prediction_cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if len(missing) > 0:
+            for i, vector in zip(missing, self._batch_history_vectors([games[i] for i in missing])):
+                vectors[i] = vector
+                LearningPlayer.prediction_cache.put(keys[i], vector)
+        return vectors
+
+    # evaluates the legal moves of several games with one call to each network, returns predictions per game
+    # with the prediction cache on, only the moves missing from it are sent to the networks
+    def batch_move_evaluation(self, games, legal_moves_list):
+        predictions = [np.zeros(len(legal_moves)) for legal_moves in legal_moves_list]
+        keys = None
+        missing_indices_list = [list(range(len(legal_moves))) for legal_moves in legal_moves_list]
+        if self.cache_namespace is not None:
+            keys = []
+            for game, legal_moves, game_predictions, missing_indices in zip(games, legal_moves_list, predictions,
+                                                                             missing_indices_list):
+                game_keys = [self._position_key(game, move) for move in legal_moves]
+                del missing_indices[:]
+                for i, key in enumerate(game_keys):
+                    prediction = LearningPlayer.prediction_cache.get(key)
+                    if prediction is None:
+                        missing_indices.append(i)
+                    else:
+                        game_predictions[i] = prediction
+                keys.append(game_keys)
+        missing_moves_list = [[legal_moves[i] for i in missing_indices]
+                              for legal_moves, missing_indices in zip(legal_moves_list, missing_indices_list)]
+
+        evaluated = [i for i, missing_moves in enumerate(missing_moves_list) if len(missing_moves) > 0]
+        if len(evaluated) == 0:
+            return predictions
+
+        # all the moves we make from here will not affect the history, so assess it and copy
+        history_vectors = self._cached_history_vectors([games[i] for i in evaluated])
+        num_options = [len(missing_moves_list[i]) for i in evaluated]
+        history_matrix = np.repeat(np.array(history_vectors), num_options, axis=0)
 
-        predictions = self._get_position_predictions(history_matrix, move_options_matrix, hand_matrix)
+        candidates = [self._candidate_matrices(games[i], missing_moves_list[i]) for i in evaluated]
+        move_options_matrix = np.vstack([move_matrix for move_matrix, _ in candidates])
+        hand_matrix = np.vstack([hand_matrix for _, hand_matrix in candidates])
 
+        evaluated_predictions = self._get_position_predictions(history_matrix, move_options_matrix, hand_matrix)
+
+        for i, game_predictions in zip(evaluated, np.split(evaluated_predictions, np.cumsum(num_options)[:-1])):
+            predictions[i][missing_indices_list[i]] = game_predictions
+            if keys is not None:
+                for j, prediction in zip(missing_indices_list[i], game_predictions):
+                    LearningPlayer.prediction_cache.put(keys[i][j], prediction)
         return predictions
 
+    # the search of the estimation mode, created on first use
+    def get_search(self):
+        if self.search is None:
+            if self.estimation_mode == LearningPlayer.MCTS:
+                self.search = MCTSSearch(self, num_simulations=self.mcts_simulations, time_budget_ms=self.mcts_time_ms,
+                                         batch_size=self.mcts_batch_size)
+            else:
+                self.search = MonteCarloSearch(self, num_samples=self.random_mc_num_explorations,
+                                               depth=self.estimation_depth, num_workers=self.mc_num_workers,
+                                               time_budget=self.mc_time_budget)
+        return self.search
+
+    # stops the rollout workers and drops the search tree, if any
+    def close_search(self):
+        if self.search is not None:
+            self.search.close()
+            self.search = None
+
+    # values of the legal moves from the search, and under MCTS the visits behind them, which pick the move
+    def search_move_evaluation(self, game, legal_moves):
+        predictions, visits = self.get_search().evaluate(game, legal_moves)
+        if self.estimation_mode != LearningPlayer.MCTS:
+            return predictions, None
+        return predictions, visits
+
+    def in_endgame(self, game):
+        if self.endgame_threshold is None or not game.is_betting_complete():
+            return False
+        return sum([game.get_hand_size(position) for position in TurnPosition]) < self.endgame_threshold
+
+    # exact values of the legal moves, None if the solver gave up
+    def endgame_move_evaluation(self, game, legal_moves):
+        if self.endgame_mode == EndgameSolver.DETERMINIZED:
+            return self.endgame_solver.solve_determinized(game, legal_moves, self.endgame_samples)
+        return self.endgame_solver.solve(game, legal_moves)
+
     def decide_best_move(self, game, debug=False):
         assert len(game.get_hand(game.get_current_position())) > 0
         legal_moves = game.get_legal_moves()
 
-        predictions = self.full_move_evaluation(game, legal_moves)
-
+        predictions = None
+        visits = None
+        if self.in_endgame(game):
+            predictions = self.endgame_move_evaluation(game, legal_moves)
+        if predictions is None:
+            if self.estimation_mode in LearningPlayer.SEARCH_MODES and game.is_betting_complete() \
+                    and len(legal_moves) > 1:
+                predictions, visits = self.search_move_evaluation(game, legal_moves)
+            else:
+                predictions = self.full_move_evaluation(game, legal_moves)
+
+        return self._choose_move(game, legal_moves, predictions, visits=visits, debug=debug)
+
+    def decide_best_moves(self, games, debug=False):
+        if self.estimation_mode in LearningPlayer.SEARCH_MODES:
+            return [self.decide_best_move(game, debug=debug) for game in games]
+        for game in games:
+            assert len(game.get_hand(game.get_current_position())) > 0
+        legal_moves_list = [game.get_legal_moves() for game in games]
+
+        predictions_list = [self.endgame_move_evaluation(game, legal_moves) if self.in_endgame(game) else None
+                            for game, legal_moves in zip(games, legal_moves_list)]
+        unsolved = [i for i, predictions in enumerate(predictions_list) if predictions is None]
+        if len(unsolved) > 0:
+            unsolved_predictions = self.batch_move_evaluation([games[i] for i in unsolved],
+                                                              [legal_moves_list[i] for i in unsolved])
+            for i, predictions in zip(unsolved, unsolved_predictions):
+                predictions_list[i] = predictions
+
+        return [self._choose_move(game, legal_moves, predictions, debug=debug)
+                for game, legal_moves, predictions in zip(games, legal_moves_list, predictions_list)]
+
+    # visits, if given, are the search's visits of each move, and the most visited move is made
+    def _choose_move(self, game, legal_moves, predictions, visits=None, debug=False):
         # for debugging
         raw_predictions = np.copy(predictions)
 
-        # if the move ends the game, then force-score the position
-        has_game_ending = False
-        for i, move in enumerate(legal_moves):
-            if game.move_ends_game(move):
-                copy_game = copy(game)
-                copy_game.play_move(move)
-                predictions[i] = self.get_game_result(copy_game)
-                has_game_ending = True
-
-        best_move_index = 0
-        if game.get_current_position() == game.get_landlord_position():
-            best_move_index = np.argmax(predictions)
-        elif game.is_betting_complete():
-            best_move_index = np.argmin(predictions)
+        has_game_ending = self._score_game_endings(game, legal_moves, predictions)
+        if visits is None:
+            best_move_index = self._best_move_index(game, legal_moves, predictions)
         else:
-            # go landlord if it's worth it, otherwise peasant
-            best_move_index = self._make_bet_decision(game, legal_moves, predictions)
+            best_move_index = most_visited_index(game, predictions, visits)
 
         if debug:
             print('(' +  game.get_position_role_name(game.get_current_position()) + ') Player', self.get_name())
@@ -295,6 +528,25 @@ class LearningPlayer(Player):
 
         return best_move, best_move_q
 
+    # if the move ends the game, then force-score the position
+    def _score_game_endings(self, game, legal_moves, predictions):
+        has_game_ending = False
+        for i, move in enumerate(legal_moves):
+            if game.move_ends_game(move):
+                game.push_move(move)
+                predictions[i] = self.get_game_result(game)
+                game.pop_move()
+                has_game_ending = True
+        return has_game_ending
+
+    def _best_move_index(self, game, legal_moves, predictions):
+        if game.get_current_position() == game.get_landlord_position():
+            return np.argmax(predictions)
+        elif game.is_betting_complete():
+            return np.argmin(predictions)
+        # go landlord if it's worth it, otherwise peasant
+        return self._make_bet_decision(game, legal_moves, predictions)
+
     def make_move(self, game, debug=False):
         best_move, best_move_q = self.decide_best_move(game, debug=debug)
 
@@ -303,14 +555,25 @@ class LearningPlayer(Player):
 
         return best_move
 
+    # batched make_move, one decision per game
+    def make_moves(self, games, debug=False):
+        decisions = self.decide_best_moves(games, debug=debug)
+
+        if self.estimation_mode == LearningPlayer.ACTUAL_Q:
+            for game, (best_move, best_move_q) in zip(games, decisions):
+                self.record_move(game, best_move, best_move_q, game.get_current_position())
+
+        return [best_move for best_move, _ in decisions]
+
     def record_move(self, game, best_move, best_move_q, player: TurnPosition):
-        history_matrix = self._derive_features(game)
+        if self.record_histories:
+            self.record_history_matrices.append(self._derive_features(game))
         move_vector = self.compute_move_vector(player, game.get_landlord_position(), best_move)
         hand_vector = self.get_hand_vector(game, player)
 
-        self.record_history_matrices.append(history_matrix)
         self.record_move_vectors.append(move_vector)
         self.record_hand_vectors.append(hand_vector)
+        self.record_decision_points.append((game.get_num_moves(), game.get_landlord_position()))
 
         self._record_state_q.append(best_move_q)
 
@@ -330,6 +593,12 @@ class LearningPlayer(Player):
     def get_game_result(self, game):
         return game.get_r()
 
+    # get_game_result of a round the landlord won or lost at bet_amount
+    def get_result_value(self, landlord_won, bet_amount):
+        if landlord_won:
+            return bet_amount * 2
+        return - bet_amount
+
     def get_record_history_matrices(self):
         return self.record_history_matrices
 
@@ -339,6 +608,9 @@ class LearningPlayer(Player):
     def get_record_hand_vectors(self):
         return self.record_hand_vectors
 
+    def get_record_decision_points(self):
+        return self.record_decision_points
+
     def get_estimated_qs(self):
         assert self._recording_finalized is True
         return self._record_future_q
@@ -355,23 +627,29 @@ class LearningPlayer_v2(LearningPlayer):
     def get_game_result(self, game):
         return game.get_winbased_r()
 
+    def get_result_value(self, landlord_won, bet_amount):
+        if landlord_won:
+            return 1
+        return -1
+
     def record_move(self, game, best_move, best_move_q, player: TurnPosition):
-        history_matrix = self._derive_features(game)
+        if self.record_histories:
+            self.record_history_matrices.append(self._derive_features(game))
 
         move_vector = self.compute_move_vector(player, game.get_landlord_position(), best_move)
         hand_vector = self.compute_remaining_hand_vector(game, move_vector, player)
 
-        self.record_history_matrices.append(history_matrix)
         self.record_move_vectors.append(move_vector)
         self.record_hand_vectors.append(hand_vector)
+        self.record_decision_points.append((game.get_num_moves(), game.get_landlord_position()))
 
         self._record_state_q.append(best_move_q)
 
     def compute_remaining_hand_vector(self, game, move_vector, player: TurnPosition):
         hand = game.get_hand(player)
-        vector = np.zeros(len(Card) + 3)
-        for i, card in enumerate(Card):
-            vector[i] = hand.count(card) - move_vector[i]
+        vector = np.zeros(len(Card) + 3, dtype=LearningPlayer.FEATURE_DTYPE)
+        vector[:NUM_CARD_TYPES] = hand.counts()
+        vector[:NUM_CARD_TYPES] -= move_vector[:NUM_CARD_TYPES]
 
         if game.is_betting_complete():
             vector[-3] = len(game.get_hand(game.get_landlord_position()))
@@ -383,33 +661,15 @@ class LearningPlayer_v2(LearningPlayer):
             vector[-1] = 17
         return vector
 
-    def full_move_evaluation(self, game, legal_moves):
-        history_features = self._derive_features(game)
-
-        # all the moves we make from here will not affect the history, so assess it and copy
-        history_vector = self._get_history_vector(history_features)
-        history_matrix = np.tile(history_vector, (len(legal_moves), 1))
-
+    def _candidate_matrices(self, game, legal_moves):
         # create features for each of the possible moves from this position
-        move_options_matrix = np.vstack([self.compute_move_vector(game.get_current_position(),
-                                game.get_landlord_position(), move) for move in legal_moves])
+        move_options_matrix = self.compute_move_matrix(game.get_current_position(), game.get_landlord_position(),
+                                                       legal_moves)
 
         # make remaining hand vectors for each of the possible moves from this position
-        hand_matrix = np.vstack([self.compute_remaining_hand_vector(game,
-                                move_vector, game.get_current_position()) for move_vector in move_options_matrix])
-
-        predictions = self._get_position_predictions(history_matrix, move_options_matrix, hand_matrix)
-
-        return predictions
-
-class RandomPlayer(Player):
-    def make_move(self, game, debug=False):
-        legal_moves = game.get_legal_moves()
-        return random.choice(legal_moves)
-
-class NoBetPlayer(Player):
-    def make_move(self, game, debug=False):
-        return None
+        hand_matrix = np.tile(self.get_hand_vector(game, game.get_current_position()), (len(legal_moves), 1))
+        hand_matrix[:, :NUM_CARD_TYPES] -= move_options_matrix[:, :NUM_CARD_TYPES]
+        return move_options_matrix, hand_matrix
 
 
 class InvalidMoveError(Exception):
@@ -487,9 +747,10 @@ class HumanPlayer(Player):
         if cards is None:
             return None
 
-        all_possible_moves = CardSet(Counter(cards)).get_all_moves()
+        played = Hand.from_cards(cards)
+        all_possible_moves = CardSet(played).get_all_moves()
         for move in all_possible_moves:
-            if move.get_cards() == Counter(cards):
+            if move.get_cards() == played:
                 return move
         raise InvalidMoveError
 
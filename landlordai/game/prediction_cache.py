@@ -0,0 +1,60 @@
+from collections import OrderedDict
+
+
+class PredictionCache:
+    # bounded LRU map from evaluation keys to network outputs; keys start with the model's namespace
+    # so players with different nets never read each other's predictions
+    def __init__(self, max_size=200000):
+        assert max_size > 0
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    # drops the entries of one namespace, or everything
+    def clear(self, namespace=None):
+        if namespace is None:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            return
+        for key in [key for key in self._entries if key[0] == namespace]:
+            del self._entries[key]
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.
+        return self.hits / lookups
+
+    def get_stats(self):
+        return {'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hit_rate()}
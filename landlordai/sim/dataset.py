@@ -0,0 +1,134 @@
+import json
+import os
+
+import numpy as np
+
+from landlordai.sim.shards import SHARD_ARRAYS, SHARD_DTYPES, SHARD_SHAPES
+
+INDEX_FILE = 'index.json'
+# the record columns plus the game each record came from, which splits are made by
+COLUMNS = SHARD_ARRAYS + ('game', )
+COLUMN_DTYPES = dict(SHARD_DTYPES, game=np.int32)
+COLUMN_SHAPES = dict(SHARD_SHAPES, game=())
+
+
+def _column_path(directory, name):
+    return os.path.join(directory, name + '.bin')
+
+
+def _read_index(directory):
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return {'num_rows': 0, 'num_games': 0}
+    with open(path) as index_file:
+        return json.load(index_file)
+
+
+class DatasetWriter:
+    # appends records to a dataset directory: one raw file per column plus index.json with the row count
+    # the index only counts rows once they are flushed, so reopening after a crash drops any half written rows
+    def __init__(self, directory, flush_rows=100000):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        os.makedirs(directory, exist_ok=True)
+        index = _read_index(directory)
+        self.num_rows = index['num_rows']
+        self.num_games = index['num_games']
+        self._files = {}
+        for name in COLUMNS:
+            path = _column_path(directory, name)
+            row_bytes = np.dtype(COLUMN_DTYPES[name]).itemsize * int(np.prod(COLUMN_SHAPES[name]))
+            with open(path, 'ab') as column_file:
+                column_file.truncate(self.num_rows * row_bytes)
+            self._files[name] = open(path, 'ab')
+        self._unflushed_rows = 0
+
+    # the records of one game
+    def add(self, history, move, hand, q):
+        if len(history) == 0:
+            return
+        games = np.full(len(history), self.num_games)
+        for name, array in zip(COLUMNS, (history, move, hand, q, games)):
+            array = np.ascontiguousarray(array, dtype=COLUMN_DTYPES[name])
+            assert array.shape == (len(history), ) + COLUMN_SHAPES[name]
+            self._files[name].write(array.tobytes())
+        self.num_rows += len(history)
+        self.num_games += 1
+        self._unflushed_rows += len(history)
+        if self._unflushed_rows >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        for column_file in self._files.values():
+            column_file.flush()
+        index = {
+            'num_rows': self.num_rows,
+            'num_games': self.num_games,
+            'columns': dict((name, {'dtype': np.dtype(COLUMN_DTYPES[name]).name,
+                                    'shape': list(COLUMN_SHAPES[name])}) for name in COLUMNS)
+        }
+        temp_path = os.path.join(self.directory, INDEX_FILE + '.tmp')
+        with open(temp_path, 'w') as index_file:
+            json.dump(index, index_file)
+        os.replace(temp_path, os.path.join(self.directory, INDEX_FILE))
+        self._unflushed_rows = 0
+
+    def close(self):
+        self.flush()
+        for column_file in self._files.values():
+            column_file.close()
+
+
+class Dataset:
+    # the flushed rows of a dataset directory, read through memory maps so only the rows asked for are loaded
+    def __init__(self, directory):
+        self.directory = directory
+        index = _read_index(directory)
+        self.num_rows = index['num_rows']
+        self.num_games = index['num_games']
+        self.columns = {}
+        for name in COLUMNS:
+            shape = (self.num_rows, ) + COLUMN_SHAPES[name]
+            if self.num_rows == 0:
+                self.columns[name] = np.zeros(shape, dtype=COLUMN_DTYPES[name])
+            else:
+                self.columns[name] = np.memmap(_column_path(directory, name), dtype=COLUMN_DTYPES[name], mode='r',
+                                               shape=shape)
+
+    def __len__(self):
+        return self.num_rows
+
+    # (history, move, hand, q) of the rows at indices, read in file order
+    def get_batch(self, indices):
+        indices = np.asarray(indices)
+        order = np.argsort(indices)
+        batch = [np.empty((len(indices), ) + COLUMN_SHAPES[name], dtype=COLUMN_DTYPES[name])
+                 for name in SHARD_ARRAYS]
+        for array, name in zip(batch, SHARD_ARRAYS):
+            array[order] = self.columns[name][indices[order]]
+        return tuple(batch)
+
+    # (train, validation) row indices, with validation_fraction of the games held out whole
+    def split_by_game(self, validation_fraction=0.1, seed=None):
+        rng = np.random.default_rng(seed)
+        validation_games = rng.random(self.num_games) < validation_fraction
+        validation_rows = validation_games[self.columns['game']]
+        return np.nonzero(~validation_rows)[0], np.nonzero(validation_rows)[0]
+
+    def num_batches(self, batch_size, indices=None):
+        num_rows = self.num_rows if indices is None else len(indices)
+        return (num_rows + batch_size - 1) // batch_size
+
+    # ((history, move, hand), q) mini-batches over indices (every row by default), as keras fit takes them;
+    # with epochs=None it repeats forever, for fit with steps_per_epoch=num_batches(batch_size, indices)
+    def iterate_batches(self, batch_size, indices=None, shuffle=True, seed=None, epochs=1):
+        if indices is None:
+            indices = np.arange(self.num_rows)
+        rng = np.random.default_rng(seed)
+        epoch = 0
+        while epochs is None or epoch < epochs:
+            order = rng.permutation(indices) if shuffle else indices
+            for start in range(0, len(order), batch_size):
+                history, move, hand, q = self.get_batch(order[start: start + batch_size])
+                yield (history, move, hand), q
+            epoch += 1
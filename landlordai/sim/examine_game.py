@@ -38,6 +38,9 @@ if __name__ == "__main__":
         if game.has_winners():
             break
 
+    for line in game.string_logs:
+        print(line)
+
     def printout_floats(array):
         print(', '.join(["%.3f" % val for val in array]))
 
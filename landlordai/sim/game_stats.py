@@ -1,37 +1,86 @@
 import numpy as np
 
 from landlordai.game.landlord import LandlordGame
-from landlordai.game.player import TurnPosition
+from landlordai.game.base_player import TurnPosition
 import math
 
 class GameStats:
     ELO_K = 10
-    def __init__(self, player_pool, game_results):
+    INITIAL_ELO = 1500
+    # rating backends: game by game elo updates in result order, or ratings fitted to all the results at once
+    SEQUENTIAL_ELO = 'sequential_elo'
+    BATCH_ELO = 'batch_elo'
+    BRADLEY_TERRY = 'bradley_terry'
+
+    # a fitted rating counts each (winner, loser) pair of a game as one pairwise game; prior_games virtual wins
+    # and as many losses against an INITIAL_ELO player keep ratings finite for players that never won or lost
+    def __init__(self, player_pool, game_results, rating=SEQUENTIAL_ELO, prior_games=1., tolerance=1e-6,
+                 max_iterations=10000):
         self.player_pool = player_pool
-
-        self.unique_player_names = set([player.get_name() for player in player_pool])
-        self.win_matrix = np.zeros((len(self.unique_player_names), len(self.unique_player_names)))
-        self.loss_matrix = np.zeros((len(self.unique_player_names), len(self.unique_player_names)))
-        self.player_map = dict([(player, i) for (i, player) in enumerate(self.unique_player_names)])
-
-        self.elos = [1500] * len(self.unique_player_names)
+        self.rating = rating
+        self.prior_games = prior_games
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+        self.unique_player_names = set()
+        self.win_matrix = np.zeros((0, 0))
+        self.loss_matrix = np.zeros((0, 0))
+        self.player_map = {}
+        self.elos = np.zeros(0)
+        self._ratings_stale = False
+        self.add_players(sorted(set([player.get_name() for player in player_pool])))
         self.process_stats(game_results)
 
+    def add_players(self, player_names):
+        new_names = [name for name in player_names if name not in self.player_map]
+        if len(new_names) == 0:
+            return
+        for name in new_names:
+            self.player_map[name] = len(self.player_map)
+        self.unique_player_names.update(new_names)
+        self.win_matrix = np.pad(self.win_matrix, (0, len(new_names)))
+        self.loss_matrix = np.pad(self.loss_matrix, (0, len(new_names)))
+        self.elos = np.concatenate([self.elos, np.full(len(new_names), float(GameStats.INITIAL_ELO))])
+        self._ratings_stale = True
+
+    # (winner index, loser index) of every pair of a winner and a loser across the games
+    def _pair_indices(self, game_results):
+        winner_counts = np.fromiter((len(winners) for winners, _ in game_results), int, len(game_results))
+        loser_counts = np.fromiter((len(losers) for _, losers in game_results), int, len(game_results))
+        winner_ids = np.fromiter((self.player_map[name] for winners, _ in game_results for name in winners), int,
+                                 np.sum(winner_counts))
+        loser_ids = np.fromiter((self.player_map[name] for _, losers in game_results for name in losers), int,
+                                np.sum(loser_counts))
+        loser_starts = np.cumsum(loser_counts) - loser_counts
+
+        # each winner is paired with every loser of its game
+        winner_games = np.repeat(np.arange(len(game_results)), winner_counts)
+        pairs_per_winner = loser_counts[winner_games]
+        pair_starts = np.cumsum(pairs_per_winner) - pairs_per_winner
+        pair_games = np.repeat(winner_games, pairs_per_winner)
+        nth_loser = np.arange(np.sum(pairs_per_winner)) - np.repeat(pair_starts, pairs_per_winner)
+        return np.repeat(winner_ids, pairs_per_winner), loser_ids[loser_starts[pair_games] + nth_loser]
+
     def process_stats(self, game_results):
-        for winners, losers in game_results:
-            for winner in winners:
-                for loser in losers:
-                    self.win_matrix[self.player_map[winner], self.player_map[loser]] += 1
-                    self.loss_matrix[self.player_map[loser], self.player_map[winner]] += 1
-            self.process_game_elo(winners, losers)
+        winner_index, loser_index = self._pair_indices(game_results)
+        wins = np.zeros_like(self.win_matrix)
+        np.add.at(wins, (winner_index, loser_index), 1)
+        self.win_matrix += wins
+        self.loss_matrix += wins.T
+
+        if self.rating == GameStats.SEQUENTIAL_ELO:
+            for winners, losers in game_results:
+                self.process_game_elo(winners, losers)
+        elif len(game_results) > 0:
+            self._ratings_stale = True
 
     @classmethod
     def elo_expected(cls, a, b):
         return 1. / (1 + math.pow(10, (b - a) / 400))
 
     def recenter_elo(self):
-        diff = 1500 - np.mean(self.elos)
-        self.elos = [elo + diff / len(self.elos) for elo in self.elos]
+        diff = GameStats.INITIAL_ELO - np.mean(self.elos)
+        self.elos += diff / len(self.elos)
 
     def process_game_elo(self, winners, losers):
         elo_winners = np.mean([self.elos[self.player_map[winner]] for winner in winners])
@@ -60,8 +109,111 @@ class GameStats:
 
         self.recenter_elo()
 
+    # wins of every player over every other; a name on both sides of a game says nothing about its rating
+    def _pairwise_wins(self):
+        wins = self.win_matrix.copy()
+        np.fill_diagonal(wins, 0)
+        return wins
+
+    # expected score of every player against every other at the given ratings
+    @staticmethod
+    def _expected_matrix(elos):
+        return 1. / (1 + np.power(10., (elos[None, :] - elos[:, None]) / 400))
+
+    # expected score of every player against the INITIAL_ELO player of the prior games
+    @staticmethod
+    def _prior_expected(elos):
+        return 1. / (1 + np.power(10., (GameStats.INITIAL_ELO - elos) / 400))
+
+    # expected score of each player over its pairwise and prior games at elos, and the matrix of its
+    # derivatives by the ratings
+    def _expected_scores(self, games, elos):
+        expected = GameStats._expected_matrix(elos)
+        prior_expected = GameStats._prior_expected(elos)
+        scores = (games * expected).sum(axis=1) + 2 * self.prior_games * prior_expected
+        variances = games * expected * (1 - expected)
+        slopes = np.diag(variances.sum(axis=1) + 2 * self.prior_games * prior_expected * (1 - prior_expected)) \
+            - variances
+        return scores, slopes * math.log(10) / 400
+
+    # minorization-maximization for the Bradley-Terry strengths, one vectorized update per iteration
+    def _fit_bradley_terry(self):
+        pairwise_wins = self._pairwise_wins()
+        games = pairwise_wins + pairwise_wins.T
+        wins = pairwise_wins.sum(axis=1) + self.prior_games
+        # strength 1 is the INITIAL_ELO player the prior games are against
+        strengths = np.ones(len(self.elos))
+        for _ in range(self.max_iterations):
+            updated = wins / ((games / (strengths[:, None] + strengths[None, :])).sum(axis=1)
+                              + 2 * self.prior_games / (strengths + 1))
+            # only the differences between ratings matter once they are recentered
+            change = np.log(updated) - np.log(strengths)
+            strengths = updated
+            if np.max(np.abs(change - np.mean(change))) < self.tolerance:
+                break
+        return GameStats.INITIAL_ELO + 400 * np.log10(strengths)
+
+    # elo updates over all the games at once, sized by newton's method so that the expected scores meet the wins;
+    # lands on the same ratings as _fit_bradley_terry in a handful of iterations
+    def _fit_batch_elo(self):
+        pairwise_wins = self._pairwise_wins()
+        games = pairwise_wins + pairwise_wins.T
+        wins = pairwise_wins.sum(axis=1) + self.prior_games
+        elos = np.full(len(self.elos), float(GameStats.INITIAL_ELO))
+        for _ in range(self.max_iterations):
+            scores, slopes = self._expected_scores(games, elos)
+            step = np.linalg.lstsq(slopes, wins - scores, rcond=None)[0]
+            # big first steps from far off are cut down to keep the expectations from saturating
+            step = np.clip(step, -400, 400)
+            elos += step
+            if np.max(np.abs(step)) < self.tolerance:
+                break
+        return elos
+
+    # fitted ratings average INITIAL_ELO, as the sequential ones do
+    def get_elos(self):
+        if self._ratings_stale and self.rating != GameStats.SEQUENTIAL_ELO:
+            if self.rating == GameStats.BRADLEY_TERRY:
+                self.elos = self._fit_bradley_terry()
+            else:
+                self.elos = self._fit_batch_elo()
+            self.elos += GameStats.INITIAL_ELO - np.mean(self.elos)
+        self._ratings_stale = False
+        return self.elos
+
     def get_elo(self, player_name: str):
-        return self.elos[self.player_map[player_name]]
+        return self.get_elos()[self.player_map[player_name]]
+
+    # standard error of every rating relative to the pool's mean, from the curvature of the pairwise results'
+    # likelihood at the ratings
+    def get_elo_errors(self):
+        pairwise_wins = self._pairwise_wins()
+        _, slopes = self._expected_scores(pairwise_wins + pairwise_wins.T, self.get_elos())
+        covariance = np.linalg.pinv(slopes * math.log(10) / 400)
+        centering = np.eye(len(covariance)) - 1. / len(covariance)
+        covariance = centering @ covariance @ centering
+        return np.sqrt(np.maximum(np.diag(covariance), 0))
+
+    # (low, high) elo bounds; z=1.96 gives a 95% interval
+    def get_confidence_interval(self, player_name: str, z=1.96):
+        elo = self.get_elo(player_name)
+        error = self.get_elo_errors()[self.player_map[player_name]]
+        return elo - z * error, elo + z * error
+
+    # stats over the results of both, e.g. from separate simulation shards; ratings are refitted
+    def merge(self, other):
+        if self.rating == GameStats.SEQUENTIAL_ELO:
+            raise ValueError('Sequential elo depends on the order of the games, so it cannot be merged')
+        merged = GameStats(self.player_pool + other.player_pool, [], self.rating, self.prior_games, self.tolerance,
+                           self.max_iterations)
+        for stats in (self, other):
+            merged.add_players(sorted(stats.player_map.keys()))
+            names = sorted(stats.player_map.keys(), key=lambda name: stats.player_map[name])
+            indices = np.array([merged.player_map[name] for name in names], dtype=int)
+            merged.win_matrix[np.ix_(indices, indices)] += stats.win_matrix
+            merged.loss_matrix[np.ix_(indices, indices)] += stats.loss_matrix
+        merged._ratings_stale = True
+        return merged
 
     def get_win_rate(self, player_name: str):
         player_index = self.player_map[player_name]
@@ -75,4 +227,4 @@ class GameStats:
         print('Player Stats:\n')
         sorted_stats = sorted([(self.get_elo(name), self.get_win_rate(name), name) for name in self.unique_player_names], key=lambda x: -x[0])
         for elo, win_rate, name in sorted_stats:
-            print(elo, win_rate, name)
\ No newline at end of file
+            print(elo, win_rate, name)
@@ -1,8 +1,22 @@
 from landlordai.game.player import LearningPlayer
+from landlordai.sim.shards import ShardWriter
 from landlordai.sim.simulate import Simulator
 
+
+# players that record their decisions, which the search modes don't
+def make_players():
+    return [LearningPlayer(name='random', estimation_mode=LearningPlayer.ACTUAL_Q) for _ in range(5)]
+
+
+# plays num_batches simulations of rounds each into writer
+def run(writer, num_batches=100, rounds=10):
+    for i in range(num_batches):
+        simulator = Simulator(rounds, make_players(), shard_writer=writer)
+        simulator.play_rounds()
+
+
 if __name__ == "__main__":
-    for i in range(100):
-        players = [LearningPlayer(name='random', use_montecarlo_random=True, random_mc_num_explorations=30) for _ in range(5)]
-        simulator = Simulator(10, players)
-        simulator.play_rounds()
\ No newline at end of file
+    # experience goes to disk a shard at a time, so memory stays flat however many rounds are played
+    writer = ShardWriter('../experience', shard_size=50000)
+    run(writer)
+    writer.close()
@@ -0,0 +1,85 @@
+import time
+
+import numpy as np
+
+from landlordai.game.base_player import Player, RandomPlayer
+from landlordai.game.event_log import EventLog
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.numpy_model import FLOAT16, FLOAT32, INT8
+from landlordai.game.player import LearningPlayer, LearningPlayer_v2
+
+
+def _models(player: LearningPlayer):
+    return [model for model in [player.history_net, player.position_net, player.history_encoder] if model is not None]
+
+
+# bytes of the weights as stored
+def model_bytes(player: LearningPlayer):
+    return sum([np.asarray(weights).nbytes for model in _models(player) for weights in model.get_weights()])
+
+
+# bytes the models hold after evaluating, which includes the history encoder's padding states
+def resident_bytes(player: LearningPlayer):
+    return sum([model.nbytes for model in _models(player)])
+
+
+class ComparingPlayer(Player):
+    # plays randomly, scoring every position it sees with both players
+    def __init__(self, reference: LearningPlayer, reduced: LearningPlayer):
+        super().__init__('comparing')
+        self.reference = reference
+        self.reduced = reduced
+        self.errors = []
+        self.num_positions = 0
+        self.num_agreements = 0
+        self.reference_seconds = 0.
+        self.reduced_seconds = 0.
+        self.random_player = RandomPlayer('random')
+
+    def make_move(self, game, debug=False):
+        legal_moves = game.get_legal_moves()
+        if game.is_betting_complete():
+            start = time.perf_counter()
+            reference_q = self.reference.full_move_evaluation(game, legal_moves)
+            self.reference_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            reduced_q = self.reduced.full_move_evaluation(game, legal_moves)
+            self.reduced_seconds += time.perf_counter() - start
+            self.errors.append(np.abs(reference_q - reduced_q))
+            choose = np.argmax if game.is_current_player_landlord() else np.argmin
+            self.num_positions += 1
+            self.num_agreements += int(choose(reference_q) == choose(reduced_q))
+        return self.random_player.make_move(game)
+
+
+# Q error, evaluation time and memory of a net with reduced precision weights against the same net at full
+# precision; predictions aren't cached so every position is timed through the nets
+def q_error_report(net_dir, weight_precision, num_games=10, player_class=LearningPlayer_v2):
+    def load(precision):
+        return player_class(name=net_dir + ' ' + precision, net_dir=net_dir, epsilon=0,
+                            estimation_mode=LearningPlayer.NO_ESTIMATION, backend=LearningPlayer.NUMPY_BACKEND,
+                            weight_precision=precision, use_prediction_cache=False)
+
+    reference = load(FLOAT32)
+    reduced = load(weight_precision)
+    comparing = ComparingPlayer(reference, reduced)
+    for _ in range(num_games):
+        LandlordGame(players=[comparing] * 3, log_level=EventLog.OFF).play_round()
+
+    errors = np.concatenate(comparing.errors) if len(comparing.errors) > 0 else np.zeros(1)
+    return {'precision': weight_precision,
+            'positions': comparing.num_positions,
+            'mean_abs_error': float(np.mean(errors)),
+            'max_abs_error': float(np.max(errors)),
+            'best_move_agreement': comparing.num_agreements / max(comparing.num_positions, 1),
+            'reference_seconds': comparing.reference_seconds,
+            'reduced_seconds': comparing.reduced_seconds,
+            'reference_bytes': model_bytes(reference),
+            'reduced_bytes': model_bytes(reduced),
+            'reference_resident_bytes': resident_bytes(reference),
+            'reduced_resident_bytes': resident_bytes(reduced)}
+
+
+if __name__ == '__main__':
+    for precision in [FLOAT16, INT8]:
+        print(q_error_report('../expert_model', precision, num_games=20))
@@ -0,0 +1,124 @@
+import glob
+import os
+
+import numpy as np
+
+from landlordai.game.player import LearningPlayer
+
+# the arrays of a shard, in the order get_game_data returns them, with the dtypes they are stored in;
+# every feature is a small count, so int8 holds them exactly
+SHARD_ARRAYS = ('history', 'move', 'hand', 'q')
+SHARD_DTYPES = {
+    'history': np.int8,
+    'move': np.int8,
+    'hand': np.int8,
+    'q': np.float32
+}
+SHARD_SHAPES = {
+    'history': (LearningPlayer.TIMESTEPS, LearningPlayer.TIMESTEP_FEATURES),
+    'move': (LearningPlayer.TIMESTEP_FEATURES, ),
+    'hand': (LearningPlayer.HAND_FEATURES, ),
+    'q': ()
+}
+
+
+# the simulator's record lists as (history, move, hand, q) arrays in the shard dtypes
+def to_arrays(record_states, move_vectors, hand_vectors, q):
+    arrays = []
+    for name, records in zip(SHARD_ARRAYS, (record_states, move_vectors, hand_vectors, q)):
+        if name == 'q':
+            records = np.hstack(records) if len(records) > 0 else []
+        arrays.append(np.array(records, dtype=SHARD_DTYPES[name]).reshape((-1, ) + SHARD_SHAPES[name]))
+    return tuple(arrays)
+
+
+class RecordBuffer:
+    # a fixed number of rows of each shard array, allocated once
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.arrays = tuple(np.zeros((capacity, ) + SHARD_SHAPES[name], dtype=SHARD_DTYPES[name])
+                            for name in SHARD_ARRAYS)
+        self.size = 0
+
+    # copies in as many rows of arrays as fit, from start on, and returns how many
+    def add(self, arrays, start=0):
+        num_rows = min(self.capacity - self.size, len(arrays[0]) - start)
+        for buffer, array in zip(self.arrays, arrays):
+            buffer[self.size: self.size + num_rows] = array[start: start + num_rows]
+        self.size += num_rows
+        return num_rows
+
+    def is_full(self):
+        return self.size == self.capacity
+
+    # copies of the filled rows; the buffer starts over empty
+    def take(self):
+        arrays = tuple(buffer[:self.size].copy() for buffer in self.arrays)
+        self.size = 0
+        return arrays
+
+
+class ShardWriter:
+    # writes records to directory as shard_00000.npz, shard_00001.npz, ... of shard_size rows each
+    # only the shard being filled is held in memory; close() writes the last, partly filled one
+    # shards already in the directory are kept, and numbering continues after them
+    def __init__(self, directory, shard_size=100000, prefix='shard'):
+        self.directory = directory
+        self.prefix = prefix
+        self.buffer = RecordBuffer(shard_size)
+        os.makedirs(directory, exist_ok=True)
+        self.paths = []
+        existing = _shard_paths(directory, prefix)
+        self.next_index = _shard_index(existing[-1], prefix) + 1 if len(existing) > 0 else 0
+        self.num_records = 0
+
+    def add(self, history, move, hand, q):
+        arrays = (history, move, hand, q)
+        start = 0
+        while start < len(history):
+            start += self.buffer.add(arrays, start)
+            if self.buffer.is_full():
+                self.flush()
+        self.num_records += len(history)
+
+    def flush(self):
+        if self.buffer.size == 0:
+            return
+        path = os.path.join(self.directory, '{}_{:05d}.npz'.format(self.prefix, self.next_index))
+        # written under another name first, so a crash never leaves a truncated shard behind
+        temp_path = path[:-len('.npz')] + '.tmp.npz'
+        np.savez(temp_path, **dict(zip(SHARD_ARRAYS, self.buffer.take())))
+        os.replace(temp_path, path)
+        self.paths.append(path)
+        self.next_index += 1
+
+    def close(self):
+        self.flush()
+
+    def get_paths(self):
+        return list(self.paths)
+
+
+# (history, move, hand, q) of one shard
+def load_shard(path):
+    with np.load(path) as shard:
+        return tuple(shard[name] for name in SHARD_ARRAYS)
+
+
+# the number of a shard written as prefix_<number>.npz, None for other files like unfinished .tmp.npz ones
+def _shard_index(path, prefix):
+    number = os.path.basename(path)[len(prefix) + 1:-len('.npz')]
+    return int(number) if number.isdigit() else None
+
+
+# paths of the complete shards of a directory, in the order they were written
+def _shard_paths(directory, prefix):
+    paths = glob.glob(os.path.join(directory, '{}_[0-9]*.npz'.format(prefix)))
+    return sorted([path for path in paths if _shard_index(path, prefix) is not None],
+                  key=lambda path: _shard_index(path, prefix))
+
+
+# the shards of a directory in the order they were written
+def iterate_shards(directory, prefix='shard'):
+    for path in _shard_paths(directory, prefix):
+        yield load_shard(path)
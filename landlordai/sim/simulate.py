@@ -1,19 +1,86 @@
 
+import multiprocessing
+import os
 import random
 
 import numpy as np
 from scipy import sparse
 
+from landlordai.game.base_player import TurnPosition
+from landlordai.game.deck import BulkDealer
+from landlordai.game.event_log import EventLog
 from landlordai.game.landlord import LandlordGame
-from landlordai.game.player import TurnPosition
+from landlordai.sim.shards import RecordBuffer, to_arrays
+from landlordai.sim.trajectory import TrajectoryStore
 from copy import copy
 
 from tqdm import tqdm
 
 
+# environment variables capping the threads of numpy's BLAS and of tensorflow
+THREAD_VARIABLES = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS',
+                    'TF_NUM_INTEROP_THREADS')
+
+
+# players with nets go to workers as their class and constructor arguments, so each worker loads the nets itself
+def _portable_player(player):
+    if hasattr(player, 'get_config'):
+        return type(player), player.get_config()
+    return player
+
+
+def _rebuild_player(portable):
+    if type(portable) == tuple:
+        player_class, config = portable
+        return player_class(**config)
+    return portable
+
+
+# the simulator each pool worker plays its share of rounds with
+_worker_simulator = None
+
+
+def _init_worker(portables, pool_indices, num_competitors, record_loser_pct, log_level, num_threads,
+                 record_trajectories):
+    global _worker_simulator
+    if any([type(portable) == tuple and portable[1].get('backend') == 'keras' and portable[1].get('net_dir')
+            for portable in portables]):
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(num_threads)
+    players = [_rebuild_player(portable) for portable in portables]
+    pool = [players[i] for i in pool_indices]
+    num_players = len(pool) - num_competitors
+    _worker_simulator = Simulator(0, pool[:num_players], pool[num_players:], record_loser_pct, log_level=log_level,
+                                  trajectory_store=TrajectoryStore() if record_trajectories else None)
+
+
+def _play_chunk_args(args):
+    return _play_chunk(*args)
+
+
+def _play_chunk(num_rounds, seed):
+    simulator = _worker_simulator
+    simulator.reset(seed)
+    game_records = []
+    for _ in range(num_rounds):
+        simulator.play_game()
+        game_records.append(simulator._take_records())
+    return game_records, simulator.results, simulator.trajectory_store
+
+
 class Simulator:
     # competitors are not used for feature extraction
-    def __init__(self, rounds, player_pool, competitor_pool=None, record_loser_pct=0.1):
+    # seed makes the sequence of deals reproducible
+    # log_level is passed to each game; nothing reads the event logs during simulation
+    # num_workers > 0 plays the rounds on that many processes, chunk_rounds at a time, each worker building its own
+    # players and capped to worker_threads threads; the records are merged back in chunk order
+    # with a shard_writer the records go to its shards on disk as games finish instead of piling up in memory
+    # with a trajectory_store the records go to it as move logs, without history matrices
+    # with a dataset_writer the records are appended to its on-disk dataset, one game at a time
+    def __init__(self, rounds, player_pool, competitor_pool=None, record_loser_pct=0.1, seed=None,
+                 log_level=EventLog.OFF, num_workers=0, worker_threads=1, chunk_rounds=None, shard_writer=None,
+                 trajectory_store=None, dataset_writer=None):
         if competitor_pool is None:
             competitor_pool = []
         self.rounds = rounds
@@ -26,21 +93,139 @@ class Simulator:
         self.q = []
 
         self.results = []
+        self.seed = seed
+        self.dealer = BulkDealer(seed)
+        self.log_level = log_level
+        self.num_workers = num_workers
+        self.worker_threads = worker_threads
+        self.chunk_rounds = chunk_rounds
+        self.shard_writer = shard_writer
+        self.trajectory_store = trajectory_store
+        self.dataset_writer = dataset_writer
+
+    # drops the records and results, and starts the deals over from seed
+    def reset(self, seed=None):
+        self.record_states = []
+        self.move_vectors = []
+        self.hand_vectors = []
+        self.q = []
+        self.results = []
+        self.dealer = BulkDealer(seed)
+        if self.trajectory_store is not None:
+            self.trajectory_store = TrajectoryStore()
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
 
     def play_rounds(self, debug=False):
+        for records in self._play_records(debug):
+            if self.shard_writer is not None:
+                self.shard_writer.add(*to_arrays(*records))
+            elif self.dataset_writer is not None:
+                self.dataset_writer.add(*to_arrays(*records))
+            else:
+                self._extend_records(records)
+
+    # (history, move, hand, q) arrays of batch_size records each, yielded as the games filling them finish;
+    # the last batch holds whatever is left over
+    def stream_batches(self, batch_size):
+        buffer = RecordBuffer(batch_size)
+        for records in self._play_records():
+            arrays = to_arrays(*records)
+            start = 0
+            while start < len(arrays[0]):
+                start += buffer.add(arrays, start)
+                if buffer.is_full():
+                    yield buffer.take()
+        if buffer.size > 0:
+            yield buffer.take()
+
+    # the (record_states, move_vectors, hand_vectors, q) lists of each round as it is played
+    def _play_records(self, debug=False):
+        if self.num_workers > 0:
+            yield from self._play_records_parallel()
+            return
         for r in tqdm(range(self.rounds)):
             if debug:
                 print('Playing Round ', r)
             self.play_game()
+            yield self._take_records()
         if debug:
             print('Done Playing')
 
+    def _take_records(self):
+        records = self.record_states, self.move_vectors, self.hand_vectors, self.q
+        self.record_states, self.move_vectors, self.hand_vectors, self.q = [], [], [], []
+        return records
+
+    def _extend_records(self, records):
+        record_states, move_vectors, hand_vectors, q = records
+        self.record_states.extend(record_states)
+        self.move_vectors.extend(move_vectors)
+        self.hand_vectors.extend(hand_vectors)
+        self.q.extend(q)
+
+    def _chunks(self):
+        chunk_rounds = self.chunk_rounds
+        if chunk_rounds is None:
+            chunk_rounds = max(1, self.rounds // (4 * self.num_workers))
+        chunks = []
+        for i, start in enumerate(range(0, self.rounds, chunk_rounds)):
+            # each chunk gets its own seed so the deals don't depend on which worker plays it
+            seed = None if self.seed is None else hash((self.seed, i)) % (2 ** 32)
+            chunks.append((min(chunk_rounds, self.rounds - start), seed))
+        return chunks
+
+    def _start_pool(self):
+        unique_players = []
+        pool_indices = []
+        for player in self.player_pool:
+            if not any([player is unique for unique in unique_players]):
+                unique_players.append(player)
+            pool_indices.append([i for i, unique in enumerate(unique_players) if unique is player][0])
+        initargs = ([_portable_player(player) for player in unique_players], pool_indices,
+                    len(self.competitor_pool), self.record_everyone_pct, self.log_level, self.worker_threads,
+                    self.trajectory_store is not None)
+
+        # workers are fresh interpreters that read the thread caps as they import numpy and tensorflow
+        saved = dict((name, os.environ.get(name)) for name in THREAD_VARIABLES)
+        os.environ.update(dict((name, str(self.worker_threads)) for name in THREAD_VARIABLES))
+        try:
+            return multiprocessing.get_context('spawn').Pool(self.num_workers, initializer=_init_worker,
+                                                             initargs=initargs)
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    del os.environ[name]
+                else:
+                    os.environ[name] = value
+
+    def _play_records_parallel(self):
+        chunks = self._chunks()
+        pool = self._start_pool()
+        try:
+            with tqdm(total=self.rounds) as progress:
+                for (num_rounds, _), chunk in zip(chunks, pool.imap(_play_chunk_args, chunks)):
+                    game_records, results, trajectory_store = chunk
+                    self.results.extend(results)
+                    if self.trajectory_store is not None:
+                        self.trajectory_store.extend(trajectory_store)
+                    progress.update(num_rounds)
+                    yield from game_records
+        finally:
+            pool.close()
+            pool.join()
+
     def record_player(self, game, player):
         # don't record any competitors
         if player in self.competitor_pool:
             return
 
         player.compute_future_q(game)
+        if self.trajectory_store is not None:
+            self.trajectory_store.add_game(game, player)
+            player._reset_records()
+            return
         self.record_states.extend(player.get_record_history_matrices())
         self.move_vectors.extend(player.get_record_move_vectors())
         self.hand_vectors.extend(player.get_record_hand_vectors())
@@ -50,7 +235,9 @@ class Simulator:
     def play_game(self):
         while True:
             players = self.pick_players()
-            game = LandlordGame(players=players)
+            for player in players:
+                player.record_histories = self.trajectory_store is None
+            game = LandlordGame(players=players, dealer=self.dealer, log_level=self.log_level)
             # play a meaningful game
             game.play_round()
             if game.has_winners():
@@ -60,6 +247,9 @@ class Simulator:
                 for pos in players_to_record:
                     player = game.get_ai(pos)
                     self.record_player(game, player)
+                # the players that weren't recorded would otherwise carry this game's moves into their next one
+                for player in players:
+                    player._reset_records()
                 self.track_stats(game)
                 break
 
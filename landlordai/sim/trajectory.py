@@ -0,0 +1,196 @@
+import numpy as np
+
+from landlordai.game.base_player import TurnPosition
+from landlordai.game.hand import Hand, NUM_CARD_TYPES
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.move import BetMove, KittyReveal, SpecificMove
+from landlordai.game.move_catalog import get_move_catalog
+from landlordai.game.player import LearningPlayer
+
+# a logged move is stored as one token: its catalog id, or one of these past the end of the catalog
+PASS_TOKEN = len(get_move_catalog())
+KITTY_TOKEN = PASS_TOKEN + 1
+BET_TOKENS = [KITTY_TOKEN + 1 + amount for amount in range(LandlordGame.MAX_BET + 1)]
+NUM_TOKENS = BET_TOKENS[-1] + 1
+# landlord position of a decision made before anyone bet
+NO_LANDLORD = -1
+
+
+def move_token(move):
+    if move is None:
+        return PASS_TOKEN
+    if type(move) == SpecificMove:
+        return get_move_catalog().get_id(move)
+    if type(move) == KittyReveal:
+        return KITTY_TOKEN
+    if type(move) == BetMove:
+        return BET_TOKENS[move.get_amount()]
+    raise ValueError('Cannot tokenize ' + str(move))
+
+
+class TokenFeatures:
+    # compute_move_vector of every token, split into the part that doesn't depend on the seats
+    # and a mask of the tokens that also carry the I_AM_* landlord features
+    def __init__(self):
+        player = LearningPlayer(name='features')
+        catalog = get_move_catalog()
+        moves = catalog.get_moves() + [None, KittyReveal([])] + [BetMove(amount) for amount in
+                                                                 range(LandlordGame.MAX_BET + 1)]
+        self.rows = np.array([player.compute_move_vector(TurnPosition.FIRST, None, move) for move in moves],
+                             dtype=np.int8)
+        self.landlord_index = player.get_feature_index('I_AM_LANDLORD')
+        self.before_index = player.get_feature_index('I_AM_BEFORE_LANDLORD')
+        self.after_index = player.get_feature_index('I_AM_AFTER_LANDLORD')
+        self.seat_relative = np.array([player.compute_move_vector(TurnPosition.FIRST, TurnPosition.FIRST, move)
+                                       [self.landlord_index] == 1 for move in moves])
+
+
+_token_features = None
+
+
+def get_token_features():
+    global _token_features
+    if _token_features is None:
+        _token_features = TokenFeatures()
+    return _token_features
+
+
+class TrajectoryStore:
+    # training records kept as each game's move log, (seat, token) per logged move, plus where in it
+    # every decision was made; history matrices are rebuilt from the logs when asked for
+    def __init__(self):
+        self.log_seats = []
+        self.log_tokens = []
+        # card counts of each game's kitty, which its KITTY_TOKEN reveals
+        self.kitties = []
+        self.decision_games = []
+        self.decision_num_logs = []
+        self.decision_landlords = []
+        self.move_vectors = []
+        self.hand_vectors = []
+        self.q = []
+        self._last_game = None
+        self._arrays = None
+
+    def __len__(self):
+        return sum([len(qs) for qs in self.q])
+
+    def num_games(self):
+        return len(self.log_tokens)
+
+    # the decisions player recorded in game, after compute_future_q; a game shared by several recorded
+    # players keeps one log
+    def add_game(self, game, player):
+        if self._last_game is not game:
+            logs = game.get_move_logs()
+            self.log_seats.append(np.array([position for position, _ in logs], dtype=np.int8))
+            self.log_tokens.append(np.array([move_token(move) for _, move in logs], dtype=np.int16))
+            kitty = [move for _, move in logs if type(move) == KittyReveal]
+            kitty_counts = Hand.coerce(kitty[0].cards).counts() if len(kitty) > 0 else [0] * NUM_CARD_TYPES
+            self.kitties.append(np.array(kitty_counts, dtype=np.int8))
+            self._last_game = game
+
+        decision_points = player.get_record_decision_points()
+        self.decision_games.append(np.full(len(decision_points), self.num_games() - 1, dtype=np.int32))
+        self.decision_num_logs.append(np.array([num_logs for num_logs, _ in decision_points], dtype=np.int16))
+        self.decision_landlords.append(np.array([NO_LANDLORD if landlord is None else landlord
+                                                 for _, landlord in decision_points], dtype=np.int8))
+        self.move_vectors.append(np.array(player.get_record_move_vectors(), dtype=np.int8)
+                                 .reshape(-1, LearningPlayer.TIMESTEP_FEATURES))
+        self.hand_vectors.append(np.array(player.get_record_hand_vectors(), dtype=np.int8)
+                                 .reshape(-1, LearningPlayer.HAND_FEATURES))
+        self.q.append(np.array(player.get_estimated_qs(), dtype=np.float32))
+        self._arrays = None
+
+    # appends the games and decisions of another store
+    def extend(self, other):
+        num_games = self.num_games()
+        self.log_seats.extend(other.log_seats)
+        self.log_tokens.extend(other.log_tokens)
+        self.kitties.extend(other.kitties)
+        self.decision_games.extend([games + num_games for games in other.decision_games])
+        self.decision_num_logs.extend(other.decision_num_logs)
+        self.decision_landlords.extend(other.decision_landlords)
+        self.move_vectors.extend(other.move_vectors)
+        self.hand_vectors.extend(other.hand_vectors)
+        self.q.extend(other.q)
+        self._last_game = None
+        self._arrays = None
+
+    # everything as flat arrays, with the logs of all games end to end
+    def get_arrays(self):
+        if self._arrays is None:
+            log_lengths = [len(tokens) for tokens in self.log_tokens]
+            self._arrays = {
+                'log_seats': np.concatenate(self.log_seats or [np.zeros(0, dtype=np.int8)]),
+                'log_tokens': np.concatenate(self.log_tokens or [np.zeros(0, dtype=np.int16)]),
+                'log_offsets': np.concatenate([[0], np.cumsum(log_lengths)]).astype(np.int64),
+                'kitties': np.array(self.kitties, dtype=np.int8).reshape(-1, NUM_CARD_TYPES),
+                'decision_games': np.concatenate(self.decision_games or [np.zeros(0, dtype=np.int32)]),
+                'decision_num_logs': np.concatenate(self.decision_num_logs or [np.zeros(0, dtype=np.int16)]),
+                'decision_landlords': np.concatenate(self.decision_landlords or [np.zeros(0, dtype=np.int8)]),
+                'move_vectors': np.concatenate(self.move_vectors or [
+                    np.zeros((0, LearningPlayer.TIMESTEP_FEATURES), dtype=np.int8)]),
+                'hand_vectors': np.concatenate(self.hand_vectors or [
+                    np.zeros((0, LearningPlayer.HAND_FEATURES), dtype=np.int8)]),
+                'q': np.concatenate(self.q or [np.zeros(0, dtype=np.float32)])
+            }
+        return self._arrays
+
+    def save(self, path):
+        np.savez(path, **self.get_arrays())
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with np.load(path) as arrays:
+            arrays = dict((name, arrays[name]) for name in arrays.files)
+        offsets = arrays['log_offsets']
+        store.log_seats = [arrays['log_seats'][start: end] for start, end in zip(offsets[:-1], offsets[1:])]
+        store.log_tokens = [arrays['log_tokens'][start: end] for start, end in zip(offsets[:-1], offsets[1:])]
+        store.kitties = list(arrays['kitties'])
+        for name in ['decision_games', 'decision_num_logs', 'decision_landlords', 'move_vectors', 'hand_vectors',
+                     'q']:
+            setattr(store, name, [arrays[name]] if len(arrays['q']) > 0 else [])
+        store._arrays = arrays
+        return store
+
+    # history matrices of the decisions at indices, the same as _derive_features at each of them
+    def history_matrices(self, indices):
+        arrays = self.get_arrays()
+        return rebuild_histories(arrays['log_seats'], arrays['log_tokens'], arrays['kitties'],
+                                 arrays['log_offsets'][arrays['decision_games'][indices]],
+                                 arrays['decision_num_logs'][indices], arrays['decision_landlords'][indices],
+                                 arrays['decision_games'][indices])
+
+    # (history, move, hand, q) of the decisions at indices, as get_game_data gives them
+    def get_batch(self, indices):
+        arrays = self.get_arrays()
+        indices = np.asarray(indices)
+        return (self.history_matrices(indices), arrays['move_vectors'][indices], arrays['hand_vectors'][indices],
+                arrays['q'][indices])
+
+
+# history matrices of decisions made after num_logs moves of the logs starting at log_starts, all at once
+def rebuild_histories(log_seats, log_tokens, kitties, log_starts, num_logs, landlords, games,
+                      timesteps=LearningPlayer.TIMESTEPS):
+    features = get_token_features()
+    steps = np.arange(timesteps)
+    logged = steps[None, :] < np.asarray(num_logs)[:, None]
+    log_index = np.where(logged, np.asarray(log_starts)[:, None] + steps[None, :], 0)
+    tokens = np.where(logged, log_tokens[log_index] if len(log_tokens) > 0 else 0, PASS_TOKEN)
+    seats = log_seats[log_index] if len(log_seats) > 0 else np.zeros_like(tokens)
+
+    histories = features.rows[tokens]
+    # the kitty reveal's cards belong to its game
+    kitty_steps = logged & (tokens == KITTY_TOKEN)
+    kitty_rows, _ = np.nonzero(kitty_steps)
+    histories[kitty_steps, :NUM_CARD_TYPES] = kitties[np.asarray(games)[kitty_rows]]
+
+    landlords = np.asarray(landlords)[:, None]
+    relative = features.seat_relative[tokens] & logged
+    histories[:, :, features.landlord_index] = relative & (seats == landlords)
+    histories[:, :, features.before_index] = relative & ((seats + 2) % len(TurnPosition) == landlords)
+    histories[:, :, features.after_index] = relative & ((seats + 1) % len(TurnPosition) == landlords)
+    histories[~logged] = 0
+    return histories
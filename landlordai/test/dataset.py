@@ -0,0 +1,91 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from landlordai.game.player import LearningPlayer
+from landlordai.sim.dataset import Dataset, DatasetWriter
+from landlordai.sim.simulate import Simulator
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def _players(self):
+        return [LearningPlayer(name='random', estimation_mode=LearningPlayer.ACTUAL_Q) for _ in range(3)]
+
+    def test_write_read(self):
+        random.seed(0)
+        np.random.seed(0)
+        simulator = Simulator(3, self._players(), seed=0)
+        simulator.play_rounds()
+        history, move, hand, q = simulator.get_game_data()
+
+        with tempfile.TemporaryDirectory() as directory:
+            random.seed(0)
+            np.random.seed(0)
+            writer = DatasetWriter(directory)
+            Simulator(3, self._players(), seed=0, dataset_writer=writer).play_rounds()
+            writer.close()
+
+            dataset = Dataset(directory)
+            self.assertEqual(len(dataset), len(history))
+            self.assertEqual(dataset.num_games, 3)
+            indices = np.array([5, 0, len(history) - 1, 3])
+            batch = dataset.get_batch(indices)
+            self.assertTrue(np.array_equal(batch[0], np.array(history)[indices]))
+            self.assertTrue(np.array_equal(batch[1], move[indices]))
+            self.assertTrue(np.array_equal(batch[2], hand[indices]))
+            self.assertTrue(np.allclose(batch[3], q[indices]))
+
+            # appending to the same directory later
+            writer = DatasetWriter(directory)
+            Simulator(1, self._players(), dataset_writer=writer).play_rounds()
+            writer.close()
+            dataset = Dataset(directory)
+            self.assertEqual(dataset.num_games, 4)
+            self.assertTrue(np.array_equal(dataset.get_batch(indices)[0], np.array(history)[indices]))
+
+    def test_unflushed_rows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer = DatasetWriter(directory)
+            Simulator(1, self._players(), dataset_writer=writer).play_rounds()
+            writer.close()
+            num_rows = len(Dataset(directory))
+
+            # rows added after the last flush aren't in the index, and a new writer drops them
+            writer = DatasetWriter(directory)
+            Simulator(1, self._players(), dataset_writer=writer).play_rounds()
+            self.assertEqual(len(Dataset(directory)), num_rows)
+            del writer
+            writer = DatasetWriter(directory)
+            writer.close()
+            self.assertEqual(os.path.getsize(os.path.join(directory, 'q.bin')), num_rows * 4)
+
+    def test_batches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer = DatasetWriter(directory)
+            Simulator(6, self._players(), dataset_writer=writer).play_rounds()
+            writer.close()
+            dataset = Dataset(directory)
+
+            train, validation = dataset.split_by_game(0.3, seed=0)
+            self.assertEqual(len(train) + len(validation), len(dataset))
+            games = dataset.columns['game']
+            self.assertEqual(set(games[train]) & set(games[validation]), set())
+
+            batches = list(dataset.iterate_batches(16, train, seed=0))
+            self.assertEqual(len(batches), dataset.num_batches(16, train))
+            (history, move, hand), q = batches[0]
+            self.assertEqual(history.shape, (16, LearningPlayer.TIMESTEPS, LearningPlayer.TIMESTEP_FEATURES))
+            self.assertEqual(len(move), len(q))
+            self.assertEqual(sum([len(q) for _, q in batches]), len(train))
+
+            # epochs=None keeps going
+            repeating = dataset.iterate_batches(16, validation, epochs=None)
+            for _ in range(2 * dataset.num_batches(16, validation) + 1):
+                next(repeating)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 from collections import Counter
 
 from landlordai.game.card import Card
-from landlordai.game.deck import CardSet
+from landlordai.game.deck import CardSet, BulkDealer, LandlordDeck
 from landlordai.game.move import RankedMoveType, MoveType, BetMove, KittyReveal
 
 
@@ -75,6 +75,43 @@ class TestLandlordMethods(unittest.TestCase):
                                 Card.LITTLE_JOKER: 1, Card.BIG_JOKER: 1}))
         self.assertEqual(len(hand.get_all_moves()), 17)
 
+    def test_moves_beating(self):
+        hand = CardSet(Counter({Card.THREE: 1, Card.FOUR: 2, Card.FIVE: 2, Card.SIX: 2, Card.SEVEN: 1,
+                                Card.NINE: 4, Card.LITTLE_JOKER: 1, Card.BIG_JOKER: 1}))
+        for last_played in hand.get_all_moves():
+            expected = [move for move in hand.get_all_moves() if move.beats(last_played)]
+            answers = list(hand.get_moves_beating(last_played.ranked_move_type))
+            self.assertEqual(len(answers), len(expected))
+            for move in answers:
+                self.assertTrue(move in expected)
+
+    def test_moves_beating_pair(self):
+        hand = CardSet(Counter({Card.THREE: 2, Card.KING: 2, Card.NINE: 4}))
+        answers = list(hand.get_moves_beating(RankedMoveType(MoveType.PAIR, Card.TEN)))
+        # king pair and the bomb
+        self.assertEqual(len(answers), 2)
+        answers = list(hand.get_moves_beating(RankedMoveType(MoveType.BOMB, Card.TEN)))
+        self.assertEqual(len(answers), 0)
+
+    def test_bulk_dealer(self):
+        kitty_counts, hand_counts, first_positions = BulkDealer(seed=5).deal_counts(50)
+        self.assertEqual(kitty_counts.shape, (50, len(Card)))
+        self.assertEqual(hand_counts.shape, (50, 3, len(Card)))
+        self.assertTrue((kitty_counts.sum(axis=1) == 3).all())
+        self.assertTrue((hand_counts.sum(axis=2) == 17).all())
+        totals = kitty_counts + hand_counts.sum(axis=1)
+        self.assertTrue((totals[:, :len(LandlordDeck.NORMAL_CARD_TYPES)] == 4).all())
+        self.assertTrue((totals[:, len(LandlordDeck.NORMAL_CARD_TYPES):] == 1).all())
+        self.assertTrue(set(first_positions) <= {0, 1, 2})
+
+    def test_bulk_dealer_seed(self):
+        dealer, same_seed = BulkDealer(seed=11, batch_size=4), BulkDealer(seed=11, batch_size=4)
+        for _ in range(10):
+            kitty, hands, first_position = dealer.next_deal()
+            self.assertEqual((kitty, hands, first_position), same_seed.next_deal())
+            self.assertEqual(len(kitty), 3)
+            self.assertEqual([len(hand) for hand in hands], [17, 17, 17])
+
     def test_equality(self):
         self.assertEqual(BetMove(3), BetMove(3))
         self.assertNotEqual(BetMove(2), BetMove(0))
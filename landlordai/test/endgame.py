@@ -0,0 +1,163 @@
+import random
+import unittest
+
+import numpy as np
+
+from landlordai.game.base_player import TurnPosition
+from landlordai.game.card import Card
+from landlordai.game.deck import LandlordDeck
+from landlordai.game.endgame import EndgameSolver, bet_key, BET_KEYS, MAX_BOMBS
+from landlordai.game.hand_sampler import HandSampler
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.player import LearningPlayer, LearningPlayer_v2, RandomPlayer
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def _endgame(self, max_cards=4, bet_amount=1, player=RandomPlayer(name='random')):
+        game = LandlordGame(players=[player] * 3)
+        deck = LandlordDeck()
+        hands = dict((position, deck.draw(random.randint(1, max_cards))) for position in TurnPosition)
+        game._betting_complete = True
+        game.force_setup(random.choice(list(TurnPosition)), hands, bet_amount)
+        game.begin_main_game()
+        return game
+
+    # a dealt round played randomly until fewer than num_cards cards are left
+    def _played_endgame(self, num_cards):
+        while True:
+            game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+            while not game.is_betting_complete():
+                game.play_move(random.choice(game.get_legal_moves()))
+            if game.is_round_over():
+                continue
+            game.begin_main_game()
+            while not game.is_round_over():
+                if sum([game.get_hand_size(position) for position in TurnPosition]) < num_cards:
+                    return game
+                game.play_move(random.choice(game.get_legal_moves()))
+
+    # plain minimax through the game engine
+    def _minimax(self, game, player):
+        if game.is_round_over():
+            return player.get_game_result(game)
+        values = []
+        for move in game.get_legal_moves():
+            game.push_move(move)
+            values.append(self._minimax(game, player))
+            game.pop_move()
+        if game.get_current_position() == game.get_landlord_position():
+            return max(values)
+        return min(values)
+
+    def test_matches_minimax(self):
+        random.seed(0)
+        for player in [LearningPlayer('v1'), LearningPlayer_v2('v2')]:
+            solver = EndgameSolver(player.get_result_value)
+            for _ in range(30):
+                game = self._endgame(max_cards=3, bet_amount=random.randint(1, 3))
+                # a couple of moves in, so the solve starts without control
+                for _ in range(random.randint(0, 2)):
+                    game.play_move(random.choice(game.get_legal_moves()))
+                    if game.is_round_over():
+                        break
+                if game.is_round_over():
+                    continue
+                legal_moves = game.get_legal_moves()
+                values = solver.solve(game, legal_moves)
+                for move, value in zip(legal_moves, values):
+                    game.push_move(move)
+                    self.assertEqual(value, self._minimax(game, player))
+                    game.pop_move()
+
+    def test_sweep(self):
+        # neither peasant has played or can beat anything the landlord holds, so the landlord sweeps them
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        hands = {
+            TurnPosition.FIRST: [Card.ACE, Card.TWO, Card.TWO, Card.BIG_JOKER],
+            TurnPosition.SECOND: [Card.THREE, Card.THREE, Card.FOUR, Card.FOUR, Card.FIVE, Card.FIVE, Card.SIX,
+                                  Card.SIX, Card.SEVEN, Card.SEVEN, Card.EIGHT, Card.EIGHT, Card.NINE, Card.NINE,
+                                  Card.TEN, Card.TEN, Card.JACK],
+            TurnPosition.THIRD: [Card.THREE, Card.FOUR, Card.FIVE, Card.SIX, Card.SEVEN, Card.EIGHT, Card.NINE,
+                                 Card.TEN, Card.JACK, Card.JACK, Card.QUEEN, Card.QUEEN, Card.QUEEN, Card.KING,
+                                 Card.KING, Card.KING, Card.ACE]
+        }
+        game._betting_complete = True
+        game.force_setup(TurnPosition.FIRST, hands, 2)
+        game.begin_main_game()
+        for player in [LearningPlayer('v1'), LearningPlayer_v2('v2')]:
+            legal_moves = game.get_legal_moves()
+            values = EndgameSolver(player.get_result_value).solve(game, legal_moves)
+            for move, value in zip(legal_moves, values):
+                game.push_move(move)
+                self.assertEqual(value, self._minimax(game, player))
+                game.pop_move()
+        self.assertTrue(np.all(values == 1))
+        self.assertEqual(EndgameSolver(LearningPlayer('v1').get_result_value).solve(game, legal_moves)[0],
+                         2 * 2 * LandlordGame.SWEEP_MULTIPLIER)
+
+    def test_transpositions(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        hands = {
+            TurnPosition.FIRST: [Card.THREE, Card.FOUR, Card.FIVE, Card.SEVEN, Card.NINE, Card.JACK],
+            TurnPosition.SECOND: [Card.SIX, Card.EIGHT, Card.TEN, Card.QUEEN, Card.KING],
+            TurnPosition.THIRD: [Card.THREE, Card.FOUR, Card.SIX, Card.EIGHT, Card.TEN, Card.ACE]
+        }
+        game._betting_complete = True
+        game.force_setup(TurnPosition.FIRST, hands, 1)
+        game.begin_main_game()
+        solver = EndgameSolver(LearningPlayer_v2('v2').get_result_value)
+        values = solver.solve(game, game.get_legal_moves())
+        self.assertTrue(set(values) <= {-1, 1})
+        self.assertTrue(solver.table_hits > 0)
+
+        # out of nodes gives up
+        self.assertIsNone(EndgameSolver(LearningPlayer_v2('v2').get_result_value, max_nodes=10)
+                          .solve(game, game.get_legal_moves()))
+
+    def test_bet_keys(self):
+        # every bet a round can reach has its own key, taken from the table built at import
+        amounts = set([bet * 2 ** bombs for bet in range(1, LandlordGame.MAX_BET + 1)
+                       for bombs in range(MAX_BOMBS + 1)])
+        keys = set([bet_key(amount) for amount in amounts])
+        self.assertEqual(len(keys), len(amounts))
+        self.assertTrue(keys <= set([key for row in BET_KEYS for key in row]))
+
+    def test_determinized(self):
+        game = self._played_endgame(12)
+        solver = EndgameSolver(LearningPlayer_v2('v2').get_result_value)
+        legal_moves = game.get_legal_moves()
+        values = solver.solve_determinized(game, legal_moves, num_samples=10, sampler=HandSampler(0))
+        self.assertEqual(values.shape, (len(legal_moves),))
+        self.assertTrue(np.all(np.abs(values) <= 1))
+
+    def test_player(self):
+        for mode in [EndgameSolver.PERFECT_INFORMATION, EndgameSolver.DETERMINIZED]:
+            player = LearningPlayer_v2('endgame', epsilon=0, endgame_threshold=14, endgame_mode=mode,
+                                       endgame_samples=5)
+            solved = []
+            original = player.endgame_move_evaluation
+
+            def endgame_move_evaluation(game, legal_moves):
+                solved.append(game.get_num_moves())
+                return original(game, legal_moves)
+
+            player.endgame_move_evaluation = endgame_move_evaluation
+            for _ in range(3):
+                game = self._played_endgame(14)
+                game._players = [player] * 3
+                while not game.is_round_over():
+                    game.play_move(game.get_current_player().make_move(game))
+            self.assertTrue(len(solved) > 0)
+
+        # with everything known, the solved side never loses a won position
+        player = LearningPlayer_v2('endgame', epsilon=0, endgame_threshold=20)
+        solver = EndgameSolver(player.get_result_value)
+        for _ in range(10):
+            game = self._endgame(max_cards=5, player=player)
+            value = max(solver.solve(game, game.get_legal_moves()))
+            game.main_game()
+            self.assertEqual(game.get_winbased_r(), value)
+
+
+if __name__ == '__main__':
+    unittest.main()
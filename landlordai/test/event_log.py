@@ -0,0 +1,85 @@
+import unittest
+from copy import copy
+
+from landlordai.game.card import Card
+from landlordai.game.event_log import EventLog
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.move import BetMove, MoveType, RankedMoveType, SpecificMove
+from landlordai.game.player import RandomPlayer, TurnPosition
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def test_render(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        game.force_current_position(TurnPosition.FIRST)
+        game.play_move(None)
+        game.play_move(BetMove(3))
+        game.begin_main_game()
+        move = game.get_legal_moves()[0]
+        game.play_move(move)
+        game.play_move(None)
+        self.assertEqual(game.string_logs, ['FIRST Player passed',
+                                            'SECOND Player bet BetMove (3)',
+                                            'SECOND Player played ' + str(move),
+                                            'THIRD Player passed.'])
+
+    def test_round_over(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        hands = {
+            TurnPosition.FIRST: [Card.ACE, Card.THREE],
+            TurnPosition.SECOND: [Card.TEN] * 2,
+            TurnPosition.THIRD: [Card.FIVE] * 2,
+        }
+        game._betting_complete = True
+        game.force_setup(TurnPosition.SECOND, hands, 1)
+        game.begin_main_game()
+        game.play_move(SpecificMove(RankedMoveType(MoveType.PAIR, Card.TEN), [Card.TEN] * 2))
+        self.assertEqual(game.string_logs[-2:], ["SECOND Player wins as Landlord!", str(game.get_scores())])
+
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        game._betting_complete = True
+        game.force_setup(TurnPosition.SECOND, hands, 1)
+        game.force_current_position(TurnPosition.THIRD)
+        game._control_position = TurnPosition.THIRD
+        game.play_move(SpecificMove(RankedMoveType(MoveType.PAIR, Card.FIVE), [Card.FIVE] * 2))
+        self.assertEqual(game.string_logs[-2], "[FIRST Player, THIRD Player] win as Peasants!")
+
+    def test_off(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3, log_level=EventLog.OFF)
+        game.play_round()
+        self.assertIsNone(game.get_event_log())
+        self.assertEqual(game.string_logs, [])
+
+    def test_undo_and_copy(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        game.play_round()
+        while not game.is_round_over():
+            game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+            game.play_round()
+        num_events = len(game.get_event_log())
+        self.assertEqual(len(game.string_logs), num_events)
+
+        copied = copy(game)
+        copied.get_event_log().truncate(2)
+        self.assertEqual(len(game.get_event_log()), num_events)
+
+    def test_push_pop(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        game.play_move(BetMove(3))
+        game.begin_main_game()
+        logs = game.string_logs
+        game.push_move(game.get_legal_moves()[0])
+        self.assertEqual(len(game.string_logs), len(logs) + 1)
+        game.pop_move()
+        self.assertEqual(game.string_logs, logs)
+
+    def test_buffer_growth(self):
+        log = EventLog(capacity=2)
+        for i in range(5):
+            log.record(EventLog.BET_PASS, i % 3)
+        self.assertEqual(len(log), 5)
+        self.assertEqual(log.render()[-1], 'SECOND Player passed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import math
+import random
+import unittest
+
+import numpy as np
+
+from landlordai.game.player import RandomPlayer
+from landlordai.sim.game_stats import GameStats
+
+
+class TestLandlordMethods(unittest.TestCase):
+    # results of games between players of the given elo strengths, a lone landlord against two peasants
+    def _results(self, strengths, num_games, seed=0):
+        rng = random.Random(seed)
+        names = list(strengths.keys())
+        results = []
+        for _ in range(num_games):
+            landlord, *peasants = rng.sample(names, 3)
+            peasant_elo = np.mean([strengths[peasant] for peasant in peasants])
+            if rng.random() < GameStats.elo_expected(strengths[landlord], peasant_elo):
+                results.append(((landlord, ), tuple(peasants)))
+            else:
+                results.append((tuple(peasants), (landlord, )))
+        return results
+
+    def _players(self, names):
+        return [RandomPlayer(name=name) for name in names]
+
+    def test_matrices(self):
+        strengths = dict(('p' + str(i), 1500 + 50 * i) for i in range(5))
+        results = self._results(strengths, 300)
+        stats = GameStats(self._players(strengths), results)
+        win_matrix = np.zeros((5, 5))
+        for winners, losers in results:
+            for winner in winners:
+                for loser in losers:
+                    win_matrix[stats.player_map[winner], stats.player_map[loser]] += 1
+        self.assertTrue(np.array_equal(stats.win_matrix, win_matrix))
+        self.assertTrue(np.array_equal(stats.loss_matrix, win_matrix.T))
+
+        # game by game elo is unchanged
+        elos = [1500] * 5
+        for winners, losers in results:
+            winner_expected = GameStats.elo_expected(np.mean([elos[stats.player_map[name]] for name in winners]),
+                                                     np.mean([elos[stats.player_map[name]] for name in losers]))
+            for winner in winners:
+                elos[stats.player_map[winner]] += GameStats.ELO_K * (1 - winner_expected)
+            for loser in losers:
+                elos[stats.player_map[loser]] -= GameStats.ELO_K * (1 - winner_expected)
+            diff = 1500 - np.mean(elos)
+            elos = [elo + diff / len(elos) for elo in elos]
+        self.assertTrue(np.allclose(stats.get_elos(), elos))
+
+    def test_fitted(self):
+        strengths = dict(('p' + str(i), 1300 + 100 * i) for i in range(5))
+        results = self._results(strengths, 5000)
+        bradley_terry = GameStats(self._players(strengths), results, rating=GameStats.BRADLEY_TERRY)
+        batch_elo = GameStats(self._players(strengths), results, rating=GameStats.BATCH_ELO)
+        self.assertTrue(np.allclose(bradley_terry.get_elos(), batch_elo.get_elos(), atol=1e-2))
+
+        # ordered as the strengths, with intervals that narrow with more games
+        elos = [bradley_terry.get_elo(name) for name in sorted(strengths, key=strengths.get)]
+        self.assertEqual(elos, sorted(elos))
+        low, high = bradley_terry.get_confidence_interval('p0')
+        self.assertTrue(low < bradley_terry.get_elo('p0') < high)
+        fewer = GameStats(self._players(strengths), results[:500], rating=GameStats.BRADLEY_TERRY)
+        low_fewer, high_fewer = fewer.get_confidence_interval('p0')
+        self.assertTrue(high - low < high_fewer - low_fewer)
+
+        # a player that never won still gets a finite rating
+        stats = GameStats(self._players(['a', 'b', 'c']), [(('a', ), ('b', 'c'))] * 10,
+                          rating=GameStats.BRADLEY_TERRY)
+        self.assertTrue(all([math.isfinite(stats.get_elo(name)) for name in ['a', 'b', 'c']]))
+        self.assertTrue(stats.get_elo('a') > stats.get_elo('b'))
+
+    def test_merge(self):
+        strengths = dict(('p' + str(i), 1500 + 40 * i) for i in range(6))
+        results = self._results(strengths, 1000)
+        # shards that have seen different players
+        first = [result for result in results[:500] if 'p5' not in sum(result, ())]
+        second = results[500:]
+        names = sorted(strengths)
+        whole = GameStats(self._players(names), first + second, rating=GameStats.BATCH_ELO)
+        merged = GameStats(self._players(names[:5]), first, rating=GameStats.BATCH_ELO) \
+            .merge(GameStats(self._players(reversed(names)), second, rating=GameStats.BATCH_ELO))
+        for name in names:
+            self.assertAlmostEqual(merged.get_elo(name), whole.get_elo(name))
+            self.assertAlmostEqual(merged.get_win_rate(name), whole.get_win_rate(name))
+
+        self.assertRaises(ValueError, GameStats(self._players(names), first).merge, GameStats(self._players(names), second))
+
+
+if __name__ == '__main__':
+    unittest.main()
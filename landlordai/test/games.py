@@ -0,0 +1,21 @@
+import random
+
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.player import RandomPlayer
+
+
+# a game num_moves random card plays past betting that isn't over and offers at least min_legal_moves moves
+def game_in_progress(num_moves=8, min_legal_moves=1):
+    while True:
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        while not game.is_betting_complete():
+            game.play_move(random.choice(game.get_legal_moves()))
+        if game.is_round_over():
+            continue
+        game.begin_main_game()
+        for _ in range(num_moves):
+            if game.is_round_over():
+                break
+            game.play_move(random.choice(game.get_legal_moves()))
+        if not game.is_round_over() and len(game.get_legal_moves()) >= min_legal_moves:
+            return game
@@ -0,0 +1,44 @@
+import unittest
+from collections import Counter
+
+from landlordai.game.card import Card
+from landlordai.game.hand import Hand
+
+
+class TestLandlordMethods(unittest.TestCase):
+
+    def test_construction(self):
+        from_cards = Hand.from_cards([Card.THREE, Card.THREE, Card.BIG_JOKER])
+        from_counter = Hand.from_counter(Counter({Card.THREE: 2, Card.BIG_JOKER: 1}))
+        self.assertEqual(from_cards, from_counter)
+        self.assertEqual(len(from_cards), 3)
+        self.assertEqual(from_cards.count(Card.THREE), 2)
+        self.assertEqual(from_cards.count(Card.FOUR), 0)
+        self.assertEqual(from_cards.counts()[-1], 1)
+        self.assertEqual(Hand.from_counts(from_cards.counts()), from_cards)
+        self.assertEqual(from_cards.to_list(), [Card.THREE, Card.THREE, Card.BIG_JOKER])
+
+    def test_remove(self):
+        hand = Hand.from_cards([Card.ACE] * 4 + [Card.TWO, Card.THREE])
+        remaining = hand.remove(Hand.of(Card.ACE, 3))
+        self.assertEqual(remaining, Hand.from_cards([Card.THREE, Card.ACE, Card.TWO]))
+        self.assertEqual(len(remaining), 3)
+        # the original is untouched
+        self.assertEqual(len(hand), 6)
+        self.assertTrue(hand.contains(Hand.of(Card.ACE, 4)))
+        self.assertFalse(hand.contains(Hand.of(Card.TWO, 2)))
+        self.assertRaises(AssertionError, hand.remove, Hand.of(Card.KING))
+
+    def test_large_counts(self):
+        hand = Hand.from_cards([Card.ACE] * 17)
+        self.assertEqual(hand.count(Card.ACE), 17)
+        self.assertEqual(len(hand.add(hand)), 34)
+        self.assertTrue(hand.contains(Hand.of(Card.ACE, 16)))
+
+    def test_drop_lowest(self):
+        hand = Hand.from_cards([Card.THREE, Card.FIVE, Card.KING])
+        self.assertEqual(hand.drop_lowest(2), Hand.of(Card.KING))
+
+
+if __name__ == '__main__':
+    unittest.main()
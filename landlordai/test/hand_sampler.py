@@ -0,0 +1,85 @@
+import random
+import unittest
+
+import numpy as np
+
+from landlordai.game.base_player import TurnPosition
+from landlordai.game.card import Card
+from landlordai.game.hand import Hand
+from landlordai.game.hand_sampler import HandSampler, kitty_remainder
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.player import RandomPlayer
+from landlordai.test.games import game_in_progress
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def test_consistent(self):
+        sampler = HandSampler(0)
+        for _ in range(20):
+            game = game_in_progress(random.randint(0, 20))
+            for position in TurnPosition:
+                deals = sampler.sample_counts(game, position, 100)
+                self.assertEqual(deals.shape, (100, 3, len(Card)))
+                self.assertTrue(np.all(deals[:, position] == game.get_hand(position).counts()))
+                for other in TurnPosition:
+                    self.assertTrue(np.all(deals[:, other].sum(axis=1) == game.get_hand_size(other)))
+                unseen = np.array(game.get_unseen_cards(position).counts())
+                self.assertTrue(np.all(deals.sum(axis=1) - deals[:, position] == unseen))
+                landlord = game.get_landlord_position()
+                self.assertTrue(np.all(deals[:, landlord] >= np.array(kitty_remainder(game).counts())))
+
+    def test_betting(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        position = game.get_current_position()
+        deals = HandSampler(0).sample_counts(game, position, 100)
+        for other in TurnPosition:
+            self.assertTrue(np.all(deals[:, other].sum(axis=1) == LandlordGame.DEAL_SIZE))
+        # the kitty's cards are held back from the opponents
+        unseen = np.array(game.get_unseen_cards(position).counts())
+        kitty = unseen - (deals.sum(axis=1) - deals[:, position])
+        self.assertTrue(np.all(kitty >= 0))
+        self.assertTrue(np.all(kitty.sum(axis=1) == LandlordGame.KITTY_SIZE))
+
+    def test_kitty_remainder(self):
+        game = game_in_progress(0)
+        self.assertEqual(kitty_remainder(game), Hand.from_cards(game.kitty))
+        self.assertTrue(game.get_hand(game.get_landlord_position()).contains(kitty_remainder(game)))
+
+    def test_seeded(self):
+        game = game_in_progress()
+        position = game.get_current_position()
+        self.assertTrue(np.array_equal(HandSampler(5).sample_counts(game, position, 50),
+                                       HandSampler(5).sample_counts(game, position, 50)))
+        # deals vary
+        deals = HandSampler(5).sample_counts(game, position, 50)
+        self.assertTrue(len(set([deal.tobytes() for deal in deals])) > 1)
+
+    def test_likelihood(self):
+        game = game_in_progress()
+        position = game.get_current_position()
+        opponent = position.next()
+        sampler = HandSampler(0)
+
+        # only the deals where the next seat holds a two
+        def holds_two(deals):
+            return (deals[:, opponent, Card.TWO.card_index] > 0).astype(float)
+
+        if game.get_unseen_cards(position)[Card.TWO] == 0:
+            return
+        deals, weights = sampler.sample_weighted(game, position, 200, holds_two)
+        self.assertAlmostEqual(np.sum(weights), 1.)
+        self.assertTrue(np.all(weights[deals[:, opponent, Card.TWO.card_index] == 0] == 0))
+        resampled = sampler.sample_resampled(game, position, 50, holds_two)
+        self.assertTrue(np.all(resampled[:, opponent, Card.TWO.card_index] > 0))
+
+    def test_force_setup(self):
+        game = game_in_progress()
+        position = game.get_current_position()
+        deal = HandSampler(0).sample_counts(game, position, 1)[0]
+        game.force_setup(game.get_landlord_position(), HandSampler.to_hands(deal), game.get_bet_amount())
+        for other in TurnPosition:
+            self.assertEqual(game.get_hand(other).counts(), tuple(deal[other]))
+
+
+if __name__ == '__main__':
+    unittest.main()
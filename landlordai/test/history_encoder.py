@@ -0,0 +1,75 @@
+import os
+import unittest
+
+import keras
+import numpy as np
+
+from landlordai.game.history_encoder import HistoryEncoder
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.player import LearningPlayer, RandomPlayer
+
+EXPERT_HISTORY = os.path.join(os.path.dirname(__file__), '..', 'expert_model', 'history.h5')
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def setUp(self):
+        self.encoder = HistoryEncoder.from_h5(EXPERT_HISTORY, LearningPlayer.TIMESTEPS)
+        self.player = LearningPlayer(name='features')
+
+    def _play_random_game(self, encoder):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        vectors = []
+        while not game.is_round_over() and game.get_num_moves() < LandlordGame.TURN_LIMIT:
+            vectors.append(encoder.encode(game, self.player.compute_move_vector))
+            move = game.get_current_player().make_move(game)
+            game.play_move(move)
+            if game.is_betting_complete() and game.get_control_position() is None and not game.is_round_over():
+                game.begin_main_game()
+        return game, vectors
+
+    def test_matches_keras(self):
+        self.assertEqual(self.encoder.get_output_size(), 320)
+        forward, backward = self.encoder.forward, self.encoder.backward
+        gru = keras.layers.GRU(forward.units, reset_after=False)
+        inp = keras.layers.Input((None, LearningPlayer.TIMESTEP_FEATURES))
+        model = keras.models.Model(inputs=inp, outputs=keras.layers.Bidirectional(gru)(inp))
+        model.set_weights([forward.kernel, forward.recurrent_kernel, forward.input_bias,
+                           backward.kernel, backward.recurrent_kernel, backward.input_bias])
+
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        game.play_round()
+        features = self.player._derive_features(game)
+        expected = model.predict(np.array([features]), verbose=0)[0]
+        actual = self.encoder.encode_moves(features[:game.get_num_moves()])
+        self.assertTrue(np.allclose(expected, actual, atol=1e-4))
+
+    def test_incremental_matches_full(self):
+        game, vectors = self._play_random_game(self.encoder)
+        full_encoder = HistoryEncoder(self.encoder.forward, self.encoder.backward, LearningPlayer.TIMESTEPS)
+        # encoding only the final history from scratch gives the same vector as the incremental updates
+        self.assertTrue(np.allclose(full_encoder.encode(game, self.player.compute_move_vector),
+                                    self.encoder.encode(game, self.player.compute_move_vector), atol=1e-5))
+        features = self.player._derive_features(game)
+        self.assertTrue(np.allclose(self.encoder.encode_moves(features[:game.get_num_moves()]),
+                                    self.encoder.encode(game, self.player.compute_move_vector), atol=1e-5))
+
+    def test_batch_matches_single(self):
+        games = [self._play_random_game(self.encoder)[0] for _ in range(3)]
+        games.append(LandlordGame(players=[RandomPlayer(name='random')] * 3))
+        batch_encoder = HistoryEncoder(self.encoder.forward, self.encoder.backward, LearningPlayer.TIMESTEPS)
+        for game, vector in zip(games, batch_encoder.encode_batch(games, self.player.compute_move_vector)):
+            self.assertTrue(np.allclose(vector, self.encoder.encode(game, self.player.compute_move_vector), atol=1e-5))
+
+    def test_push_pop(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        before = self.encoder.encode(game, self.player.compute_move_vector)
+        for _ in range(3):
+            game.push_move(game.get_legal_moves()[0])
+            self.encoder.encode(game, self.player.compute_move_vector)
+        for _ in range(3):
+            game.pop_move()
+        self.assertTrue(np.allclose(before, self.encoder.encode(game, self.player.compute_move_vector)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import subprocess
+import sys
 import unittest
 from collections import Counter
 from copy import copy
@@ -34,6 +36,71 @@ class TestLandlordMethods(unittest.TestCase):
         self.assertFalse(game.get_hand(TurnPosition.SECOND) == game2.get_hand(TurnPosition.SECOND))
         self.assertFalse(game.get_last_played() == game2.get_last_played())
 
+    def test_incremental_state(self):
+        for i in range(5):
+            game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+            game._setup()
+            game._bet_rounds()
+            if game.is_round_over():
+                continue
+            game._control_position = game.get_landlord_position()
+            while not game.is_round_over() and game.get_num_moves() < LandlordGame.TURN_LIMIT:
+                game.play_move(game.get_current_player().make_move(game))
+                played = [move for _, move in game.get_move_logs() if move is not None]
+                self.assertIs(game.get_last_played(), played[-1])
+                for position in TurnPosition:
+                    self.assertEqual(game.get_hand_size(position), len(game.get_hand(position)))
+                # every card is either played, in the current hand or unseen from it
+                position = game.get_current_position()
+                self.assertEqual(len(game.get_played_cards()) + game.get_hand_size(position) +
+                                 len(game.get_unseen_cards(position)), 54)
+
+    def test_push_pop(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        history = []
+        while not game.is_round_over() and game.get_num_moves() < LandlordGame.TURN_LIMIT:
+            move = game.get_current_player().make_move(game)
+            history.append((game.snapshot(), game._capture_state(), list(game.get_move_logs())))
+            game.push_move(move)
+
+        final_snapshot = game.snapshot()
+        for snapshot, state, logs in reversed(history):
+            game.pop_move()
+            self.assertEqual(game._capture_state(), state)
+            self.assertEqual(game.get_move_logs(), logs)
+
+        # snapshots can be restored in any order
+        game.restore(final_snapshot)
+        for snapshot, state, logs in history[::3] + history[1::3]:
+            game.restore(snapshot)
+            self.assertEqual(game._capture_state(), state)
+            self.assertEqual(game.get_move_logs(), logs)
+            self.assertEqual(snapshot.get_move_logs(), logs)
+
+    def test_snapshot_sharing(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        game.push_move(BetMove(3))
+        first = game.snapshot()
+        game.push_move(game.get_legal_moves()[0])
+        second = game.snapshot()
+        self.assertIs(second.log_chain[0], first.log_chain)
+        game.restore(first)
+        self.assertEqual(game.get_hand(game.get_current_position()), first.get_hand(first.get_current_position()))
+        self.assertEqual(len(game.get_move_logs()), first.num_moves)
+
+    def test_unknown_hand(self):
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        game.push_move(BetMove(3))
+        position = game.get_current_position()
+        game.push_move(game.get_legal_moves()[0], hand_known=False)
+        self.assertFalse(game.is_hand_known(position))
+        self.assertRaises(ValueError, game.get_unseen_cards, position)
+        self.assertEqual(len(game.get_unseen_cards(game.get_current_position())) +
+                         game.get_hand_size(game.get_current_position()) + len(game.get_played_cards()), 54)
+        game.pop_move()
+        self.assertTrue(game.is_hand_known(position))
+        self.assertEqual(len(game.get_unseen_cards(position)) + game.get_hand_size(position), 54)
+
     def test_nobet_game(self):
         game = LandlordGame(players=[NoBetPlayer(name='random')] * 3)
         game.play_round()
@@ -175,6 +242,16 @@ class TestLandlordMethods(unittest.TestCase):
         self.assertEqual(game.get_r(), 24)
         self.assertEqual(game.get_winbased_r(), 1)
 
+    def test_engine_without_keras(self):
+        script = 'import sys\n' \
+                 'from landlordai.game.landlord import LandlordGame\n' \
+                 'from landlordai.game.player import LearningPlayer, RandomPlayer\n' \
+                 'LandlordGame(players=[RandomPlayer(name="random")] * 3).play_round()\n' \
+                 'LandlordGame(players=[LearningPlayer(name="empty")] * 3).play_round()\n' \
+                 'print("keras" in sys.modules or "tensorflow" in sys.modules)'
+        output = subprocess.check_output([sys.executable, '-c', script])
+        self.assertEqual(output.decode().strip(), 'False')
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from landlordai.game.deck import BulkDealer
+from landlordai.game.landlord_batch import LandlordGameBatch
+from landlordai.game.player import LearningPlayer, LearningPlayer_v2, RandomPlayer
+
+
+# deterministic stand-ins for the keras networks
+class SumHistoryNet:
+    def predict(self, features, batch_size=None):
+        return features.sum(axis=1)
+
+
+class LinearPositionNet:
+    def predict(self, inputs, batch_size=None):
+        history_matrix, move_matrix, hand_matrix = inputs
+        scores = history_matrix.sum(axis=1) * 0.01 + move_matrix @ np.arange(move_matrix.shape[1]) \
+            - hand_matrix.sum(axis=1) * 0.1
+        return scores.reshape(-1, 1)
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def test_play_rounds(self):
+        learners = [LearningPlayer(name='learner' + str(i), estimation_mode=LearningPlayer.NO_ESTIMATION)
+                    for i in range(2)]
+        random_player = RandomPlayer('random')
+        player_groups = [[learners[0], learners[1], random_player] for _ in range(12)]
+        batch = LandlordGameBatch(player_groups, dealer=BulkDealer(seed=3))
+        self.assertEqual(len(batch), 12)
+        self.assertLessEqual(len(batch.collect_decisions()), 3)
+
+        batch.play_rounds()
+        self.assertTrue(batch.is_done())
+        games_with_winners = [game for game in batch.get_games() if game.has_winners()]
+        self.assertEqual(len(batch.get_results()), len(games_with_winners))
+        for game in games_with_winners:
+            self.assertTrue(game.is_round_over())
+
+    def test_batch_matches_single(self):
+        player = LearningPlayer_v2(name='linear', estimation_mode=LearningPlayer.NO_ESTIMATION)
+        player.empty_nets = False
+        player.history_net = SumHistoryNet()
+        player.position_net = LinearPositionNet()
+
+        batch = LandlordGameBatch([[player] * 3 for _ in range(6)], dealer=BulkDealer(seed=5))
+        for _ in range(10):
+            games = batch.get_active_games()
+            legal_moves_list = [game.get_legal_moves() for game in games]
+            batched = player.batch_move_evaluation(games, legal_moves_list)
+            for game, legal_moves, predictions in zip(games, legal_moves_list, batched):
+                self.assertTrue(np.allclose(predictions, player.full_move_evaluation(game, legal_moves)))
+            batch.step()
+
+    def test_recording_seats(self):
+        recorder = LearningPlayer(name='recorder', estimation_mode=LearningPlayer.ACTUAL_Q)
+        others = [RandomPlayer('random' + str(i)) for i in range(4)]
+        # the same player in every seat of one game is fine
+        LandlordGameBatch([[recorder] * 3, others[:3]], record=True)
+        self.assertRaises(AssertionError, LandlordGameBatch,
+                          [[recorder] + others[:2], [recorder] + others[2:]], record=True)
+        # without recording the player can sit anywhere
+        LandlordGameBatch([[recorder] + others[:2], [recorder] + others[2:]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import random
+import unittest
+
+import numpy as np
+
+from landlordai.game.base_player import TurnPosition
+from landlordai.game.card import Card
+from landlordai.game.endgame import EndgameSolver
+from landlordai.game.hand import Hand
+from landlordai.game.landlord import LandlordGame, FULL_DECK
+from landlordai.game.mcts import MCTSSearch, most_visited_index
+from landlordai.game.player import LearningPlayer, LearningPlayer_v2, RandomPlayer
+from landlordai.test.games import game_in_progress
+
+EXPERT_MODEL = os.path.join(os.path.dirname(__file__), '..', 'expert_model')
+
+
+class CountingPlayer(LearningPlayer):
+    def __init__(self, name, **kwargs):
+        super().__init__(name, **kwargs)
+        self.num_evaluations = 0
+
+    def batch_move_evaluation(self, games, legal_moves_list):
+        self.num_evaluations += 1
+        return super().batch_move_evaluation(games, legal_moves_list)
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def _virtual_visits(self, node):
+        return node.virtual_visits + sum([self._virtual_visits(child) for child in node.children.values()])
+
+    def test_search(self):
+        player = CountingPlayer(name='counting')
+        search = MCTSSearch(player, num_simulations=64, batch_size=16, seed=0)
+        game = game_in_progress(min_legal_moves=2)
+        root = search.search(game)
+        self.assertEqual(root.visits, 64)
+        self.assertEqual(sum([child.visits for child in root.children.values()]), 64)
+        self.assertEqual(self._virtual_visits(root), 0)
+        # the root, then one evaluation per batch
+        self.assertEqual(player.num_evaluations, 1 + 64 // 16)
+        self.assertTrue(root.size() > len(game.get_legal_moves()))
+
+    def test_time_budget(self):
+        search = MCTSSearch(LearningPlayer(name='empty'), num_simulations=10000, time_budget_ms=0, batch_size=8)
+        root = search.search(game_in_progress(min_legal_moves=2))
+        self.assertEqual(root.visits, 8)
+
+    def test_subtree_reuse(self):
+        random.seed(0)
+        np.random.seed(0)
+        search = MCTSSearch(LearningPlayer(name='empty'), num_simulations=400, seed=0)
+        game = game_in_progress(min_legal_moves=2)
+        position = game.get_current_position()
+        root = search.search(game)
+        self.assertIs(search._find_root(game), root)
+
+        # the position after the most searched line of moves continues from the same tree
+        node = root
+        while True:
+            legal_moves = [move for move in game.get_legal_moves() if move in node.children]
+            move = max(legal_moves, key=lambda move: node.children[move].visits)
+            node = node.children[move]
+            game.play_move(move)
+            if game.get_current_position() == position:
+                break
+        self.assertTrue(node.visits > 0)
+        self.assertIs(search._find_root(game), node)
+
+        # a game that diverged from the searched one starts over
+        other = game_in_progress(min_legal_moves=2)
+        while other.get_current_position() != position:
+            other.play_move(random.choice(other.get_legal_moves()))
+        self.assertEqual(search._find_root(other).visits, 0)
+
+    def test_forced_win(self):
+        # the landlord wins only by leading the pair of aces: any single lets the two through and the peasant out
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        hands = {
+            TurnPosition.FIRST: [Card.THREE, Card.ACE, Card.ACE],
+            TurnPosition.SECOND: [Card.TWO],
+            TurnPosition.THIRD: [Card.KING, Card.KING]
+        }
+        game._betting_complete = True
+        game.force_setup(TurnPosition.FIRST, hands, 1)
+        game.begin_main_game()
+        # every other card is out, so the opponents' hands are known too
+        game._played_cards = FULL_DECK.remove(Hand.from_cards([card for hand in hands.values() for card in hand]))
+        legal_moves = game.get_legal_moves()
+        winning_move = [move for move in legal_moves if move.get_cards() == Hand.from_cards([Card.ACE, Card.ACE])][0]
+        player = LearningPlayer_v2(name='mcts', estimation_mode=LearningPlayer.MCTS, mcts_simulations=200,
+                                   epsilon=0)
+        values = EndgameSolver(player.get_result_value).solve(game, legal_moves)
+        self.assertEqual([move for move, value in zip(legal_moves, values) if value == 1], [winning_move])
+        self.assertEqual(player.decide_best_move(game)[0], winning_move)
+        self.assertEqual(player.get_search().simulations_run, 200)
+
+        # the most visited move is made over a better valued one, with the value only breaking ties
+        self.assertEqual(most_visited_index(game, np.array([1., 0., -1.]), np.array([3, 9, 9])), 1)
+        self.assertEqual(most_visited_index(game, np.array([1., 0., -1.]), np.array([3, 9, 5])), 1)
+        game.force_current_position(TurnPosition.SECOND)
+        self.assertEqual(most_visited_index(game, np.array([1., 0., -1.]), np.array([3, 9, 9])), 2)
+
+    def test_mcts_game(self):
+        player = LearningPlayer_v2(name='expert', net_dir=EXPERT_MODEL, backend=LearningPlayer.NUMPY_BACKEND,
+                                   estimation_mode=LearningPlayer.MCTS, mcts_simulations=32, epsilon=0)
+        game = LandlordGame(players=[player, RandomPlayer(name='random'), RandomPlayer(name='random')])
+        game.play_round()
+        self.assertTrue(player.get_record_history_matrices() == [])
+        if game.is_betting_complete() and not game.is_round_over():
+            self.assertTrue(player.get_search().simulations_run > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
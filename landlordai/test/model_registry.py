@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from landlordai.game.model_registry import ModelRegistry, get_model_registry
+from landlordai.game.numpy_model import load_numpy_model, get_loader, INT8
+from landlordai.game.player import LearningPlayer
+
+EXPERT_MODEL = os.path.join(os.path.dirname(__file__), '..', 'expert_model')
+
+
+class FakeModel:
+    def __init__(self, path, num_values):
+        self.path = path
+        self.weights = [np.zeros(num_values, dtype=np.float32)]
+
+    def get_weights(self):
+        return self.weights
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.directory.name, 'model' + str(i) + '.h5')
+            with open(path, 'w') as f:
+                f.write(str(i))
+            self.paths.append(path)
+        self.num_loads = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load(self, path):
+        self.num_loads += 1
+        # 400 bytes per model
+        return FakeModel(path, 100)
+
+    def test_sharing(self):
+        registry = ModelRegistry()
+        first = registry.acquire(self.paths[0], loader=self.load)
+        # the same file through a different path is the same model
+        second = registry.acquire(os.path.join(self.directory.name, '.', 'model0.h5'), loader=self.load)
+        self.assertIs(first, second)
+        self.assertEqual(self.num_loads, 1)
+        self.assertEqual(registry.get_references(self.paths[0], loader=self.load), 2)
+        registry.release(first)
+        self.assertEqual(registry.get_references(self.paths[0], loader=self.load), 1)
+
+    def test_reload_after_change(self):
+        registry = ModelRegistry()
+        first = registry.acquire(self.paths[0], loader=self.load)
+        modified = os.path.getmtime(self.paths[0]) + 10
+        os.utime(self.paths[0], (modified, modified))
+        second = registry.acquire(self.paths[0], loader=self.load)
+        self.assertIsNot(first, second)
+        self.assertEqual(self.num_loads, 2)
+
+    def test_memory_cap(self):
+        registry = ModelRegistry(max_bytes=800)
+        registry.preload(self.paths[:2], loader=self.load)
+        self.assertEqual(len(registry), 2)
+        in_use = registry.acquire(self.paths[0], loader=self.load)
+        self.assertEqual(self.num_loads, 2)
+
+        # the least recently used model that nobody holds is evicted
+        registry.acquire(self.paths[2], loader=self.load)
+        self.assertEqual(len(registry), 2)
+        self.assertTrue(self.paths[0] in registry)
+        self.assertFalse(self.paths[1] in registry)
+        self.assertEqual(registry.evictions, 1)
+
+        # models in use stay loaded even over the cap
+        registry.max_bytes = 0
+        registry.release(registry.acquire(self.paths[1], loader=self.load))
+        self.assertTrue(self.paths[0] in registry)
+        registry.release(in_use)
+        self.assertFalse(self.paths[0] in registry)
+
+    def test_numpy_model_bytes(self):
+        registry = ModelRegistry()
+        history_path = os.path.join(EXPERT_MODEL, 'history.h5')
+        model = registry.acquire(history_path, loader=load_numpy_model)
+        encoder = registry.acquire(history_path, loader=LearningPlayer._load_history_encoder)
+        self.assertGreaterEqual(model.nbytes, sum([weights.nbytes for weights in model.get_weights()]))
+        # the encoder also keeps the backward padding states
+        self.assertGreater(encoder.nbytes, sum([weights.nbytes for weights in encoder.get_weights()]))
+        self.assertEqual(registry.get_num_bytes(), model.nbytes + encoder.nbytes)
+
+        reduced = registry.acquire(history_path, loader=get_loader(load_numpy_model, INT8))
+        self.assertLess(reduced.nbytes, model.nbytes / 3)
+
+        # the size is read when asked for, not kept from the load
+        model.layers[0][3].append(np.zeros(1000, dtype=np.float32))
+        self.assertEqual(registry.get_num_bytes(), model.nbytes + encoder.nbytes + reduced.nbytes)
+
+    def test_players_share_models(self):
+        import keras
+        history_inp = keras.layers.Input((None, LearningPlayer.TIMESTEP_FEATURES))
+        history_net = keras.models.Model(inputs=history_inp, outputs=keras.layers.GRU(4)(history_inp))
+        history_net.save(os.path.join(self.directory.name, 'history.h5'))
+        position_inp = keras.layers.Input((4,))
+        position_net = keras.models.Model(inputs=position_inp, outputs=keras.layers.Dense(1)(position_inp))
+        position_net.save(os.path.join(self.directory.name, 'position.h5'))
+
+        registry = get_model_registry()
+        loads = registry.loads
+        players = [LearningPlayer(name='shared' + str(i), net_dir=self.directory.name) for i in range(3)]
+        # a keras model each for history and position, and the history encoder
+        self.assertEqual(registry.loads - loads, 3)
+        self.assertIs(players[0].position_net, players[2].position_net)
+        self.assertIs(players[0].history_encoder, players[1].history_encoder)
+        history_path = os.path.join(self.directory.name, 'history.h5')
+        self.assertEqual(registry.get_references(history_path), 3)
+        for player in players:
+            player.release_nets()
+        self.assertEqual(registry.get_references(history_path), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
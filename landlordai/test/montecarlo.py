@@ -0,0 +1,97 @@
+import os
+import pickle
+import unittest
+
+import numpy as np
+
+from landlordai.game.deck import BulkDealer
+from landlordai.game.hand_sampler import HandSampler
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.montecarlo import determinize
+from landlordai.game.player import LearningPlayer, LearningPlayer_v2, RandomPlayer
+from landlordai.test.games import game_in_progress
+
+EXPERT_MODEL = os.path.join(os.path.dirname(__file__), '..', 'expert_model')
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def test_determinize(self):
+        game = game_in_progress()
+        position = game.get_current_position()
+        hands = HandSampler.to_hands(HandSampler().sample_counts(game, position, 1)[0])
+        sample = determinize(game, hands)
+        self.assertEqual(sample.get_hand(position), game.get_hand(position))
+        for other, hand in hands.items():
+            self.assertEqual(sample.get_hand(other), hand)
+        self.assertEqual(sample.get_log_hash(), game.get_log_hash())
+        sample.play_move(sample.get_legal_moves()[0])
+        self.assertEqual(len(game.get_move_logs()) + 1, len(sample.get_move_logs()))
+
+        # the samples sent to rollout workers leave the dealer's pre-dealt rounds behind
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3, dealer=BulkDealer(seed=3))
+        position = game.get_current_position()
+        sample = determinize(game, HandSampler.to_hands(HandSampler().sample_counts(game, position, 1)[0]))
+        self.assertIsNone(sample._dealer)
+        self.assertLess(len(pickle.dumps(sample)), len(pickle.dumps(game._dealer)))
+
+    def test_montecarlo_game(self):
+        player = LearningPlayer(name='mc', estimation_mode=LearningPlayer.MONTECARLO, random_mc_num_explorations=3,
+                                estimation_depth=2, epsilon=0)
+        game = LandlordGame(players=[player, RandomPlayer(name='random'), RandomPlayer(name='random')])
+        game.play_round()
+        # search modes don't record their decisions
+        self.assertTrue(player.get_record_history_matrices() == [])
+
+    def test_pooled_move(self):
+        player = LearningPlayer_v2(name='expert', net_dir=EXPERT_MODEL, backend=LearningPlayer.NUMPY_BACKEND,
+                                   estimation_mode=LearningPlayer.MONTECARLO, random_mc_num_explorations=6,
+                                   estimation_depth=2, mc_num_workers=2, epsilon=0)
+        try:
+            game = game_in_progress(min_legal_moves=3)
+            legal_moves = game.get_legal_moves()
+            search = player.get_search()
+            search.sampler = HandSampler(3)
+            move = player.make_move(game)
+
+            # the move the pooled search made is the best one by the values of the same deals played out here
+            search.sampler = HandSampler(3)
+            search.num_workers = 0
+            values, num_samples = search.evaluate(game, legal_moves)
+            self.assertEqual(num_samples, 6)
+            player._score_game_endings(game, legal_moves, values)
+            self.assertEqual(move, legal_moves[player._best_move_index(game, legal_moves, values)])
+        finally:
+            player.close_search()
+
+    def test_time_budget(self):
+        player = LearningPlayer(name='mc', estimation_mode=LearningPlayer.MONTECARLO, random_mc_num_explorations=50,
+                                estimation_depth=3, mc_time_budget=0)
+        game = game_in_progress()
+        legal_moves = game.get_legal_moves()
+        predictions, num_samples = player.get_search().evaluate(game, legal_moves)
+        self.assertEqual(num_samples, 1)
+        self.assertEqual(predictions.shape, (len(legal_moves),))
+
+    def test_process_pool(self):
+        player = LearningPlayer_v2(name='expert', net_dir=EXPERT_MODEL, backend=LearningPlayer.NUMPY_BACKEND,
+                                   estimation_mode=LearningPlayer.MONTECARLO, random_mc_num_explorations=4,
+                                   estimation_depth=2, mc_num_workers=2, epsilon=0)
+        try:
+            game = game_in_progress()
+            legal_moves = game.get_legal_moves()
+            search = player.get_search()
+            search.sampler = HandSampler(1)
+            pooled, num_samples = search.evaluate(game, legal_moves)
+            self.assertEqual(num_samples, 4)
+
+            # the same deals evaluated in this process give the same values
+            search.sampler = HandSampler(1)
+            search.num_workers = 0
+            local, _ = search.evaluate(game, legal_moves)
+            self.assertTrue(np.allclose(pooled, local, atol=1e-4))
+        finally:
+            player.close_search()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from landlordai.game.card import Card
+from landlordai.game.deck import CardSet
+from landlordai.game.hand import Hand
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.move_cache import MoveCache
+from landlordai.game.player import RandomPlayer
+
+
+class TestLandlordMethods(unittest.TestCase):
+
+    def test_hits_and_misses(self):
+        cache = MoveCache(max_size=4)
+        hand = Hand.from_cards([Card.THREE] * 3 + [Card.FOUR, Card.FIVE])
+        moves = cache.get_all_moves(hand)
+        self.assertEqual(len(moves), len(CardSet(hand).get_all_moves()))
+        self.assertIs(cache.get_all_moves(Hand.from_cards([Card.FIVE, Card.FOUR] + [Card.THREE] * 3)), moves)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hit_rate(), 0.5)
+
+    def test_eviction(self):
+        cache = MoveCache(max_size=2)
+        first = Hand.of(Card.THREE)
+        cache.get_all_moves(first)
+        cache.get_all_moves(Hand.of(Card.FOUR))
+        # touching the first hand makes the second one the oldest
+        cache.get_all_moves(first)
+        cache.get_all_moves(Hand.of(Card.FIVE))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertTrue(first in cache)
+        self.assertFalse(Hand.of(Card.FOUR) in cache)
+
+    def test_warm_file(self):
+        cache = MoveCache()
+        game = LandlordGame(players=[RandomPlayer('random')] * 3)
+        for position in game._hands:
+            cache.get_all_moves(game.get_hand(position))
+        cache.get_all_moves(Hand.of(Card.THREE))
+
+        path = os.path.join(tempfile.mkdtemp(), 'warm.pkl')
+        self.assertEqual(cache.save_warm(path), 3)
+
+        warm = MoveCache()
+        self.assertEqual(warm.load_warm(path), 3)
+        moves = warm.get_all_moves(game.get_hand(game.get_current_position()))
+        self.assertEqual(warm.hits, 1)
+        self.assertEqual(len(moves), len(cache.get_all_moves(game.get_hand(game.get_current_position()))))
+
+
+if __name__ == '__main__':
+    unittest.main()
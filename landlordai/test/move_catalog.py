@@ -0,0 +1,48 @@
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from landlordai.game.card import Card
+from landlordai.game.deck import CardSet
+from landlordai.game.move import SpecificMove, RankedMoveType, MoveType
+from landlordai.game.move_catalog import get_move_catalog
+
+
+class TestLandlordMethods(unittest.TestCase):
+
+    def test_catalog(self):
+        catalog = get_move_catalog()
+        ids = [catalog.get_id(move) for move in catalog.get_moves()]
+        self.assertEqual(ids, list(range(len(catalog))))
+        self.assertEqual(catalog.count_rows.shape, (len(catalog), len(Card)))
+        self.assertTrue(np.all(catalog.count_rows.sum(axis=1) > 0))
+
+    def test_interned_generation(self):
+        catalog = get_move_catalog()
+        hand = CardSet(Counter({Card.THREE: 3, Card.FOUR: 3, Card.FIVE: 2, Card.LITTLE_JOKER: 1, Card.BIG_JOKER: 1}))
+        for move in hand.get_all_moves():
+            self.assertIs(catalog.get_move(move.move_id), move)
+            self.assertTrue(np.array_equal(catalog.count_rows[move.move_id], move.cards.counts()))
+
+    def test_lookup(self):
+        catalog = get_move_catalog()
+        move = SpecificMove(RankedMoveType(MoveType.TRIPLE_PAIR_KICKER, Card.NINE), Counter({Card.NINE: 3, Card.SIX: 2}))
+        self.assertIsNone(move.move_id)
+        interned = catalog.intern(move)
+        self.assertEqual(interned, move)
+        self.assertEqual(hash(interned), hash(move))
+        self.assertEqual(interned.move_id, catalog.get_id(move))
+
+    def test_beats(self):
+        catalog = get_move_catalog()
+        moves = catalog.get_moves()
+        pair_ten = catalog.get_id(SpecificMove(RankedMoveType(MoveType.PAIR, Card.TEN), Counter({Card.TEN: 2})))
+        mask = catalog.beating_mask(pair_ten)
+        for move_id in range(len(catalog)):
+            self.assertEqual(bool(mask[move_id]), bool(moves[move_id].beats(moves[pair_ten])))
+            self.assertEqual(catalog.beats(move_id, pair_ten), bool(moves[move_id].beats(moves[pair_ten])))
+
+
+if __name__ == '__main__':
+    unittest.main()
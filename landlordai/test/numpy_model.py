@@ -0,0 +1,148 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import h5py
+
+import keras
+import numpy as np
+
+from landlordai.game.history_encoder import HistoryEncoder
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.numpy_model import NumpyModel, read_keras_h5, _find_weights, Kernel, FLOAT16, INT8
+from landlordai.game.player import LearningPlayer, LearningPlayer_v2, RandomPlayer
+from landlordai.sim.precision_report import q_error_report
+
+EXPERT_MODEL = os.path.join(os.path.dirname(__file__), '..', 'expert_model')
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def _expert_position_keras(self):
+        _, layer_weights = read_keras_h5(os.path.join(EXPERT_MODEL, 'position.h5'))
+        history_inp = keras.layers.Input((320,))
+        move_inp = keras.layers.Input((LearningPlayer.TIMESTEP_FEATURES,))
+        hand_inp = keras.layers.Input((LearningPlayer.HAND_FEATURES,))
+        x = keras.layers.Concatenate()([history_inp, move_inp, hand_inp])
+        layers = []
+        for units, activation in [(384, 'relu'), (128, 'relu'), (64, 'relu')]:
+            dense = keras.layers.Dense(units, activation=activation)
+            batch_norm = keras.layers.BatchNormalization(epsilon=1e-3)
+            x = batch_norm(dense(x))
+            layers.extend([dense, batch_norm])
+        output = keras.layers.Dense(1)
+        x = output(x)
+        layers.append(output)
+        model = keras.models.Model(inputs=[history_inp, move_inp, hand_inp], outputs=x)
+
+        names = ['hidden1', 'bn1', 'hidden2', 'bn2', 'hidden3', 'bn3', 'output']
+        for name, layer in zip(names, layers):
+            found = _find_weights(layer_weights[name])
+            if name.startswith('bn'):
+                layer.set_weights([found['gamma'], found['beta'], found['moving_mean'], found['moving_variance']])
+            else:
+                layer.set_weights([found['kernel'], found['bias']])
+        return model
+
+    def test_position_parity(self):
+        model = NumpyModel.from_h5(os.path.join(EXPERT_MODEL, 'position.h5'))
+        self.assertEqual(model.input_names, ['vector_history_inp', 'move_inp', 'hand_inp'])
+        inputs = [np.random.random((50, 320)), np.random.randint(0, 4, (50, LearningPlayer.TIMESTEP_FEATURES)),
+                  np.random.randint(0, 5, (50, LearningPlayer.HAND_FEATURES))]
+        expected = self._expert_position_keras().predict(inputs, verbose=0)
+        actual = model.predict(inputs)
+        self.assertEqual(actual.shape, (50, 1))
+        self.assertTrue(np.allclose(expected, actual, atol=1e-3))
+
+    def test_history_parity(self):
+        model = NumpyModel.from_h5(os.path.join(EXPERT_MODEL, 'history.h5'))
+        encoder = HistoryEncoder.from_h5(os.path.join(EXPERT_MODEL, 'history.h5'), LearningPlayer.TIMESTEPS)
+        player = LearningPlayer(name='features')
+        features = []
+        for _ in range(4):
+            game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+            game.play_round()
+            features.append(player._derive_features(game))
+            expected = encoder.encode_moves(features[-1][:game.get_num_moves()])
+        actual = model.predict(np.array(features))
+        self.assertEqual(actual.shape, (4, 320))
+        self.assertTrue(np.allclose(expected, actual[-1], atol=1e-5))
+
+    def test_numpy_player_without_keras(self):
+        script = 'import sys\n' \
+                 'from landlordai.game.landlord import LandlordGame\n' \
+                 'from landlordai.game.player import LearningPlayer_v2\n' \
+                 'player = LearningPlayer_v2(name="expert", net_dir="' + EXPERT_MODEL + '",\n' \
+                 '                           backend=LearningPlayer_v2.NUMPY_BACKEND)\n' \
+                 'LandlordGame(players=[player] * 3).play_round()\n' \
+                 'print("keras" in sys.modules or "tensorflow" in sys.modules)'
+        output = subprocess.check_output([sys.executable, '-c', script])
+        self.assertEqual(output.decode().strip().split('\n')[-1], 'False')
+
+    def test_backends_agree(self):
+        player = LearningPlayer_v2(name='expert', net_dir=EXPERT_MODEL, backend=LearningPlayer.NUMPY_BACKEND,
+                                   use_prediction_cache=False)
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        for _ in range(6):
+            game.play_move(game.get_current_player().make_move(game))
+        legal_moves = game.get_legal_moves()
+        incremental = player.full_move_evaluation(game, legal_moves)
+        player.history_encoder = None
+        self.assertTrue(np.allclose(incremental, player.full_move_evaluation(game, legal_moves), atol=1e-4))
+
+    def test_gru_activations(self):
+        inputs = np.random.randint(0, 3, (4, 5, LearningPlayer.TIMESTEP_FEATURES)).astype(np.float32)
+        inputs[:, 3:] = 0
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'history.h5')
+            inp = keras.layers.Input((None, LearningPlayer.TIMESTEP_FEATURES))
+            gru = keras.layers.GRU(6, activation='relu', recurrent_activation='hard_sigmoid')
+            model = keras.models.Model(inputs=inp, outputs=keras.layers.Bidirectional(gru)(inp))
+            model.save(path)
+            expected = model.predict(inputs, verbose=0)
+            self.assertTrue(np.allclose(NumpyModel.from_h5(path).predict(inputs), expected, atol=1e-5))
+            encoder = HistoryEncoder.from_h5(path, timesteps=5)
+            self.assertTrue(np.allclose(encoder.encode_moves(inputs[0, :3]), expected[0], atol=1e-5))
+
+            # keras 2 files mean its own hard_sigmoid
+            with h5py.File(path, 'a') as f:
+                f.attrs['keras_version'] = '2.3.1'
+            encoder = HistoryEncoder.from_h5(path, timesteps=5)
+            self.assertAlmostEqual(float(encoder.forward.recurrent_activation(np.float32(1.))), 0.7, places=6)
+
+            gru = keras.layers.GRU(6, activation='elu')
+            keras.models.Model(inputs=inp, outputs=gru(inp)).save(path)
+            self.assertIsNone(HistoryEncoder.from_h5(path, timesteps=5))
+            self.assertRaises(ValueError, NumpyModel.from_h5, path)
+
+    def test_kernel(self):
+        matrix = np.random.normal(size=(30, 12)).astype(np.float32)
+        inputs = np.random.normal(size=(5, 30)).astype(np.float32)
+        for precision, tolerance in [(FLOAT16, 1e-2), (INT8, 5e-2)]:
+            kernel = Kernel(matrix, precision)
+            self.assertEqual(kernel.values.dtype, np.dtype(precision))
+            self.assertTrue(np.allclose(inputs @ kernel, inputs @ matrix, atol=tolerance * np.abs(matrix).max() * 30))
+            self.assertTrue(np.allclose(inputs @ kernel[:, 4:], (inputs @ kernel)[:, 4:]))
+            self.assertTrue(np.allclose(inputs[0] @ kernel, (inputs @ kernel)[0]))
+            # products keep no float32 copy around
+            self.assertEqual(kernel.nbytes, sum([weights.nbytes for weights in kernel.get_weights()]))
+            self.assertLess(kernel.nbytes, matrix.nbytes)
+
+        # wider than a block
+        matrix = np.random.normal(size=(30, Kernel.BLOCK_BYTES // (4 * 30) * 2 + 5)).astype(np.float32)
+        self.assertTrue(np.allclose(inputs @ Kernel(matrix, FLOAT16), inputs @ matrix, atol=1e-2 * 30))
+
+    def test_reduced_precision(self):
+        report = q_error_report(EXPERT_MODEL, INT8, num_games=3)
+        self.assertTrue(report['positions'] > 0)
+        self.assertLess(report['reduced_bytes'], report['reference_bytes'] / 3)
+        # evaluating doesn't keep float32 kernels next to the int8 ones
+        self.assertLess(report['reduced_resident_bytes'], report['reference_resident_bytes'] / 3)
+        self.assertGreater(report['reduced_seconds'], 0)
+        self.assertLess(report['mean_abs_error'], 0.1)
+        self.assertRaises(AssertionError, LearningPlayer, 'keras', weight_precision=INT8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -172,6 +172,22 @@ class TestLandlordMethods(unittest.TestCase):
 
         self.assertTrue(players[0].record_history_matrices[0][0].dtype == np.int8)
 
+    def test_move_matrix(self):
+        players = [LearningPlayer_v2(name='random', estimation_mode=LearningPlayer.ACTUAL_Q) for _ in range(3)]
+        game = LandlordGame(players=players)
+        while not game.is_round_over():
+            curr_player = game.get_current_player()
+            position = game.get_current_position()
+            legal_moves = game.get_legal_moves()
+            move_matrix = curr_player.compute_move_matrix(position, game.get_landlord_position(), legal_moves)
+            for move, move_vector in zip(legal_moves, move_matrix):
+                expected = curr_player.compute_move_vector(position, game.get_landlord_position(), move)
+                self.assertTrue(np.array_equal(expected, move_vector))
+                self.assertTrue(np.array_equal(curr_player.compute_remaining_hand_vector(game, expected, position),
+                                               curr_player.get_hand_vector(game, position) -
+                                               np.concatenate([move_vector[:len(Card)], np.zeros(3)])))
+            game.play_move(curr_player.make_move(game))
+
     def load_v2_net(self, net):
         return LearningPlayer_v2(name=net, net_dir='../models/' + net,
                                  estimation_mode=LearningPlayer.ACTUAL_Q,
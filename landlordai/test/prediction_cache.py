@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from landlordai.game.deck import BulkDealer
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.player import LearningPlayer, LearningPlayer_v2, RandomPlayer
+from landlordai.game.prediction_cache import PredictionCache
+
+EXPERT_MODEL = os.path.join(os.path.dirname(__file__), '..', 'expert_model')
+
+
+# counts the rows sent to the wrapped network
+class CountingNet:
+    def __init__(self, net):
+        self.net = net
+        self.rows = 0
+
+    def predict(self, inputs, batch_size=None):
+        self.rows += len(inputs[0])
+        return self.net.predict(inputs, batch_size=batch_size)
+
+
+class TestLandlordMethods(unittest.TestCase):
+    def test_lru(self):
+        cache = PredictionCache(max_size=2)
+        cache.put(('a', 1), 1.)
+        cache.put(('a', 2), 2.)
+        self.assertEqual(cache.get(('a', 1)), 1.)
+        cache.put(('b', 3), 3.)
+        self.assertFalse(('a', 2) in cache)
+        self.assertIsNone(cache.get(('a', 2)))
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+        self.assertEqual(cache.hit_rate(), 0.5)
+        cache.clear('a')
+        self.assertEqual(len(cache), 1)
+
+    def test_player_cache(self):
+        LearningPlayer.prediction_cache.clear()
+        player = LearningPlayer_v2(name='expert', net_dir=EXPERT_MODEL, backend=LearningPlayer.NUMPY_BACKEND)
+        uncached = LearningPlayer_v2(name='expert', net_dir=EXPERT_MODEL, backend=LearningPlayer.NUMPY_BACKEND,
+                                     use_prediction_cache=False)
+        player.position_net = CountingNet(player.position_net)
+
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3, dealer=BulkDealer(seed=11))
+        moves = []
+        for _ in range(8):
+            moves.append(game.get_current_player().make_move(game))
+            game.play_move(moves[-1])
+        legal_moves = game.get_legal_moves()
+        first = player.full_move_evaluation(game, legal_moves)
+        self.assertEqual(player.position_net.rows, len(legal_moves))
+        self.assertTrue(np.allclose(first, uncached.full_move_evaluation(game, legal_moves), atol=1e-5))
+
+        # the same position again is answered from the cache
+        second = player.full_move_evaluation(game, legal_moves)
+        self.assertEqual(player.position_net.rows, len(legal_moves))
+        self.assertTrue(np.array_equal(first, second))
+        self.assertTrue(LearningPlayer.prediction_cache.hits >= len(legal_moves))
+
+        # so is a replay of the same deal and moves
+        replay = LandlordGame(players=[RandomPlayer(name='random')] * 3, dealer=BulkDealer(seed=11))
+        for move in moves:
+            replay.play_move(move)
+        self.assertEqual(replay.get_log_hash(), game.get_log_hash())
+        self.assertTrue(np.array_equal(first, player.full_move_evaluation(replay, replay.get_legal_moves())))
+        self.assertEqual(player.position_net.rows, len(legal_moves))
+
+        # other nets don't read these predictions
+        other = LearningPlayer_v2(name='expert', net_dir=EXPERT_MODEL, backend=LearningPlayer.NUMPY_BACKEND,
+                                  weight_precision='int8')
+        self.assertNotEqual(other.cache_namespace, player.cache_namespace)
+
+    def test_replaced_net(self):
+        with tempfile.TemporaryDirectory() as directory:
+            net_dir = os.path.join(directory, 'model')
+            shutil.copytree(EXPERT_MODEL, net_dir)
+            player = LearningPlayer_v2(name='expert', net_dir=net_dir, backend=LearningPlayer.NUMPY_BACKEND)
+            same = LearningPlayer_v2(name='expert', net_dir=net_dir, backend=LearningPlayer.NUMPY_BACKEND)
+            self.assertEqual(same.cache_namespace, player.cache_namespace)
+
+            # a net saved over the old one is loaded afresh and doesn't read the old net's predictions
+            position_path = os.path.join(net_dir, 'position.h5')
+            modified = os.path.getmtime(position_path) + 10
+            os.utime(position_path, (modified, modified))
+            retrained = LearningPlayer_v2(name='expert', net_dir=net_dir, backend=LearningPlayer.NUMPY_BACKEND)
+            self.assertIsNot(retrained.position_net, player.position_net)
+            self.assertNotEqual(retrained.cache_namespace, player.cache_namespace)
+            for learner in (player, same, retrained):
+                learner.release_nets()
+
+    def test_only_misses_evaluated(self):
+        LearningPlayer.prediction_cache.clear()
+        player = LearningPlayer_v2(name='expert', net_dir=EXPERT_MODEL, backend=LearningPlayer.NUMPY_BACKEND)
+        player.position_net = CountingNet(player.position_net)
+        game = LandlordGame(players=[RandomPlayer(name='random')] * 3)
+        legal_moves = game.get_legal_moves()
+        player.full_move_evaluation(game, legal_moves[:2])
+        player.full_move_evaluation(game, legal_moves)
+        self.assertEqual(player.position_net.rows, len(legal_moves))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,12 @@
+import os
+import random
+import tempfile
 import unittest
 
 from landlordai.game.landlord import LandlordGame
 from landlordai.game.player import LearningPlayer
+from landlordai.sim import long_sim
+from landlordai.sim.shards import ShardWriter, iterate_shards, load_shard
 from landlordai.sim.simulate import Simulator, NoRecordsException
 
 import numpy as np
@@ -27,6 +32,88 @@ class TestLandlordMethods(unittest.TestCase):
         simulator.play_rounds()
         self.assertRaises(NoRecordsException, simulator.get_game_data)
 
+    def test_unrecorded_players_reset(self):
+        players = [LearningPlayer(name='random', estimation_mode=LearningPlayer.ACTUAL_Q) for _ in range(3)]
+        simulator = Simulator(3, players, record_loser_pct=0)
+        simulator.play_rounds()
+        # only winners are recorded, and the losers don't carry their moves into their next game
+        self.assertEqual(len(simulator.q), sum([len(winners) for winners, _ in simulator.get_results()]))
+        for player in players:
+            self.assertEqual(player.get_record_move_vectors(), [])
+            self.assertEqual(player.get_record_history_matrices(), [])
+
+    def test_parallel(self):
+        players = [LearningPlayer(name='random', estimation_mode=LearningPlayer.ACTUAL_Q) for _ in range(4)]
+        competitors = [LearningPlayer(name='competitor', estimation_mode=LearningPlayer.ACTUAL_Q)]
+        simulator = Simulator(6, players, competitors, seed=3, num_workers=2, chunk_rounds=2)
+        simulator.play_rounds()
+
+        history_matrices, move_vectors, hand_vectors, qs = simulator.get_game_data()
+        self.assertEqual(len(simulator.get_results()), 6)
+        self.assertEqual(len(history_matrices), qs.shape[0])
+        self.assertEqual(move_vectors.shape[0], len(history_matrices))
+        self.assertEqual(hand_vectors.shape[0], len(history_matrices))
+        self.assertEqual(history_matrices[0].shape[0], LearningPlayer.TIMESTEPS)
+
+    def test_stream_batches(self):
+        players = [LearningPlayer(name='random', estimation_mode=LearningPlayer.ACTUAL_Q) for _ in range(3)]
+        random.seed(0)
+        np.random.seed(0)
+        batches = list(Simulator(3, players, seed=0).stream_batches(16))
+        self.assertTrue(all([len(batch[0]) == 16 for batch in batches[:-1]]))
+        self.assertTrue(0 < len(batches[-1][0]) <= 16)
+
+        # the same records get_game_data returns
+        history_matrices, move_vectors, hand_vectors, qs = [np.concatenate(arrays) for arrays in zip(*batches)]
+        random.seed(0)
+        np.random.seed(0)
+        simulator = Simulator(3, players, seed=0)
+        simulator.play_rounds()
+        expected = simulator.get_game_data()
+        self.assertTrue(np.array_equal(history_matrices, np.array(expected[0])))
+        self.assertTrue(np.array_equal(move_vectors, expected[1]))
+        self.assertTrue(np.array_equal(hand_vectors, expected[2]))
+        self.assertTrue(np.allclose(qs, expected[3]))
+
+    def test_shards(self):
+        players = [LearningPlayer(name='random', estimation_mode=LearningPlayer.ACTUAL_Q) for _ in range(3)]
+        with tempfile.TemporaryDirectory() as directory:
+            writer = ShardWriter(directory, shard_size=32)
+            for seed in range(2):
+                Simulator(2, players, seed=seed, shard_writer=writer).play_rounds()
+            writer.close()
+
+            self.assertEqual(len(writer.get_paths()), (writer.num_records + 31) // 32)
+            self.assertEqual(sorted(os.listdir(directory)), [os.path.basename(path) for path in writer.get_paths()])
+            history, move, hand, q = load_shard(writer.get_paths()[0])
+            self.assertEqual(history.shape, (32, LearningPlayer.TIMESTEPS, LearningPlayer.TIMESTEP_FEATURES))
+            self.assertEqual((history.dtype, move.dtype, hand.dtype, q.dtype),
+                             (np.int8, np.int8, np.int8, np.float32))
+            self.assertEqual(sum([len(shard[0]) for shard in iterate_shards(directory)]), writer.num_records)
+
+            # a writer on the same directory adds shards after the existing ones
+            reopened = ShardWriter(directory, shard_size=32)
+            Simulator(1, players, shard_writer=reopened).play_rounds()
+            reopened.close()
+            self.assertEqual(len(set(writer.get_paths()) & set(reopened.get_paths())), 0)
+            self.assertEqual(sum([len(shard[0]) for shard in iterate_shards(directory)]),
+                             writer.num_records + reopened.num_records)
+            self.assertTrue(np.array_equal(load_shard(writer.get_paths()[0])[0], history))
+
+            # streamed records aren't kept around
+            simulator = Simulator(1, players, shard_writer=ShardWriter(directory, prefix='other'))
+            simulator.play_rounds()
+            self.assertRaises(NoRecordsException, simulator.get_game_data)
+
+    def test_long_sim(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer = ShardWriter(directory, shard_size=64)
+            long_sim.run(writer, num_batches=2, rounds=2)
+            writer.close()
+            self.assertTrue(writer.num_records > 0)
+            self.assertTrue(len(writer.get_paths()) > 0)
+            self.assertEqual(sum([len(shard[0]) for shard in iterate_shards(directory)]), writer.num_records)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,103 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from landlordai.game.base_player import TurnPosition
+from landlordai.game.landlord import LandlordGame
+from landlordai.game.player import LearningPlayer, LearningPlayer_v2
+from landlordai.sim.simulate import Simulator
+from landlordai.sim.trajectory import TrajectoryStore
+
+
+class TestLandlordMethods(unittest.TestCase):
+    # a store holding every decision of a few games, with the history matrices the players recorded
+    def _recorded_games(self, num_games=4):
+        store = TrajectoryStore()
+        history, move, hand, q = [], [], [], []
+        while store.num_games() < num_games:
+            players = [LearningPlayer_v2(name='v2', estimation_mode=LearningPlayer.ACTUAL_Q) for _ in range(3)]
+            game = LandlordGame(players=players)
+            game.play_round()
+            if not game.has_winners():
+                continue
+            for position in TurnPosition:
+                player = game.get_ai(position)
+                player.compute_future_q(game)
+                history.extend(player.get_record_history_matrices())
+                move.extend(player.get_record_move_vectors())
+                hand.extend(player.get_record_hand_vectors())
+                q.extend(player.get_estimated_qs())
+                store.add_game(game, player)
+        return store, (np.array(history), np.array(move), np.array(hand), np.array(q))
+
+    def test_rebuild(self):
+        random.seed(0)
+        store, (history, move, hand, q) = self._recorded_games()
+        self.assertEqual(store.num_games(), 4)
+        self.assertEqual(len(store), len(history))
+
+        indices = np.arange(len(store))
+        rebuilt = store.get_batch(indices)
+        self.assertTrue(np.array_equal(rebuilt[0], history))
+        self.assertTrue(np.array_equal(rebuilt[1], move))
+        self.assertTrue(np.array_equal(rebuilt[2], hand))
+        self.assertTrue(np.allclose(rebuilt[3], q))
+
+        # any subset, in any order
+        subset = np.random.RandomState(0).permutation(len(store))[:7]
+        self.assertTrue(np.array_equal(store.history_matrices(subset), history[subset]))
+
+    def test_save(self):
+        random.seed(1)
+        store, (history, _, _, _) = self._recorded_games(2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trajectories.npz')
+            store.save(path)
+            loaded = TrajectoryStore.load(path)
+            # the logs take a fraction of the space of the matrices
+            self.assertTrue(os.path.getsize(path) * 10 < history.nbytes)
+
+        self.assertEqual(len(loaded), len(store))
+        loaded.extend(store)
+        self.assertEqual(loaded.num_games(), 4)
+        indices = np.arange(len(store))
+        self.assertTrue(np.array_equal(loaded.history_matrices(indices + len(store)), history))
+        self.assertTrue(np.array_equal(loaded.history_matrices(indices), history))
+
+    def test_simulator(self):
+        players = [LearningPlayer(name='random', estimation_mode=LearningPlayer.ACTUAL_Q) for _ in range(3)]
+        simulator = Simulator(3, players, trajectory_store=TrajectoryStore())
+        simulator.play_rounds()
+        store = simulator.trajectory_store
+        self.assertEqual(store.num_games(), 3)
+        history, move, hand, q = store.get_batch(np.arange(len(store)))
+        self.assertEqual(history.shape, (len(store), LearningPlayer.TIMESTEPS, LearningPlayer.TIMESTEP_FEATURES))
+        self.assertEqual(len(simulator.record_states), 0)
+
+    def test_simulator_skips_histories(self):
+        players = [LearningPlayer(name='random', estimation_mode=LearningPlayer.ACTUAL_Q) for _ in range(3)]
+        # number of history matrices each player holds right after recording a move
+        held = []
+        for player in players:
+            def record_move(*args, player=player, record_move=player.record_move):
+                record_move(*args)
+                held.append(len(player.get_record_history_matrices()))
+            player.record_move = record_move
+
+        Simulator(2, players, trajectory_store=TrajectoryStore()).play_rounds()
+        self.assertTrue(len(held) > 0)
+        self.assertEqual(set(held), {0})
+
+        # without a store the same players build them again
+        held.clear()
+        simulator = Simulator(2, players)
+        simulator.play_rounds()
+        self.assertTrue(max(held) > 0)
+        self.assertTrue(len(simulator.record_states) > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,5 +6,7 @@ setup(name='landlord_ai',
       license='GNU',
       packages=['landlordai.game', 'landlordai.sim'],
       author_email='seokhohong02@gmail.com',
-      install_requires=[],
+      install_requires=['numpy', 'scipy', 'tqdm', 'h5py'],
+      # only needed to load and run the keras models of LearningPlayer
+      extras_require={'nn': ['keras', 'tensorflow']},
       zip_safe=False)